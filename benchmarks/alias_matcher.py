@@ -0,0 +1,36 @@
+# Micro-benchmark : remplacement des alias de jeux, ancienne boucle re.sub par alias vs expression compilée.
+# Usage : python -m benchmarks.alias_matcher
+import re
+import timeit
+
+# l'application doit être chargée avant les modules qui dépendent de la base
+from webapp import webapp
+from protondb.aliases import GameAliasMatcher
+
+QUERIES = ['elden ring', 'er nightreign', 'bg3', 'counter strike 2', 'un jeu sans alias du tout']
+
+def _aliases(count: int) -> list[tuple[str, str]]:
+	aliases = [('er', 'elden ring'), ('bg3', 'baldur\'s gate 3'), ('cs2', 'counter-strike 2')]
+	aliases += [(f'alias{i:05d}', f'Jeu numéro {i}') for i in range(count - len(aliases))]
+	return sorted(aliases, key=lambda alias: len(alias[0]), reverse=True)
+
+def _sequential(aliases: list[tuple[str, str]], search_name: str) -> str:
+	for alias, name in aliases:
+		search_name = re.sub(re.escape(alias), name, search_name, flags=re.IGNORECASE)
+	return search_name
+
+def main():
+	print(f'{"alias":>8} {"boucle re.sub (µs)":>20} {"compilé (µs)":>14} {"compilation (ms)":>18}')
+	for count in [10, 100, 1000, 10000]:
+		aliases = _aliases(count)
+		matcher = GameAliasMatcher(aliases)
+		for query in QUERIES:
+			assert matcher.apply(query) == _sequential(aliases, query), query
+		runs = max(1, 2000 // count)
+		sequential = timeit.timeit(lambda: [_sequential(aliases, query) for query in QUERIES], number=runs) / runs / len(QUERIES)
+		compiled = timeit.timeit(lambda: [matcher.apply(query) for query in QUERIES], number=2000) / 2000 / len(QUERIES)
+		build = timeit.timeit(lambda: GameAliasMatcher(aliases), number=3) / 3
+		print(f'{count:>8} {sequential * 1e6:>20.1f} {compiled * 1e6:>14.2f} {build * 1e3:>18.1f}')
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,41 @@
+# Micro-benchmark : recherche dans l'index local des jeux (FTS5 trigrammes) vs requête Algolia distante.
+# Utilise la base de l'instance : reconstruire l'index depuis le panel ProtonDB avant de lancer.
+# Usage : python -m benchmarks.game_index [recherche ...]
+import asyncio
+import sys
+import time
+
+# l'application doit être chargée avant les modules qui dépendent de la base
+from webapp import webapp
+from database.helpers import ConfigurationHelper
+from database.models import GameName
+from protondb import _call_algoliasearch
+from protondb.game_index import searchLocalGames
+
+QUERIES = ['elden ring', 'counter strike', 'baldur', 'portal', 'the witcher 3']
+
+def _local_us(query: str, runs: int = 200) -> tuple[float, int]:
+	start = time.perf_counter()
+	for _ in range(runs):
+		matches = searchLocalGames(query)
+	return (time.perf_counter() - start) / runs * 1e6, None if matches == None else len(matches)
+
+def _remote_ms(query: str, runs: int = 3) -> float:
+	start = time.perf_counter()
+	for _ in range(runs):
+		asyncio.run(_call_algoliasearch(query))
+	return (time.perf_counter() - start) / runs * 1e3
+
+def main():
+	queries = sys.argv[1:] or QUERIES
+	with webapp.app_context():
+		print(f'{GameName.query.count()} jeux dans l\'index local')
+		remote = ConfigurationHelper().getValue('proton_db_api_id') and ConfigurationHelper().getValue('proton_db_api_key')
+		print(f'{"recherche":<20} {"local (µs)":>12} {"résultats":>10} {"algolia (ms)":>14}')
+		for query in queries:
+			local_us, count = _local_us(query)
+			remote_ms = f'{_remote_ms(query):.1f}' if remote else 'non configuré'
+			print(f'{query:<20} {local_us:>12.1f} {"repli" if count == None else count:>10} {remote_ms:>14}')
+
+if __name__ == '__main__':
+	main()
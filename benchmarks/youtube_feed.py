@@ -0,0 +1,112 @@
+# Micro-benchmark : lecture d'un flux RSS YouTube, ancien arbre ElementTree complet + tri vs lecture incrémentale
+# qui s'arrête à la dernière vidéo notifiée. Sans argument, un flux de 15 vidéos au format YouTube est généré ;
+# on peut aussi passer des flux enregistrés (curl -o flux.xml "https://www.youtube.com/feeds/videos.xml?channel_id=...").
+# Usage : python -m benchmarks.youtube_feed [flux.xml ...]
+import sys
+import timeit
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+# l'application doit être chargée avant les modules qui dépendent de la base
+from webapp import webapp
+from discordbot.youtube import _parseFeed
+
+ENTRY = '''
+ <entry>
+  <id>yt:video:{video_id}</id>
+  <yt:videoId>{video_id}</yt:videoId>
+  <yt:channelId>UCaaaaaaaaaaaaaaaaaaaaaa</yt:channelId>
+  <title>Vidéo numéro {index} {short}</title>
+  <link rel="alternate" href="https://www.youtube.com/watch?v={video_id}"/>
+  <author>
+   <name>Chaîne de test</name>
+   <uri>https://www.youtube.com/channel/UCaaaaaaaaaaaaaaaaaaaaaa</uri>
+  </author>
+  <published>2026-10-{day:02d}T10:00:00+00:00</published>
+  <updated>2026-10-{day:02d}T12:00:00+00:00</updated>
+  <media:group>
+   <media:title>Vidéo numéro {index} {short}</media:title>
+   <media:content url="https://www.youtube.com/v/{video_id}?version=3" type="application/x-shockwave-flash" width="640" height="390"/>
+   <media:thumbnail url="https://i1.ytimg.com/vi/{video_id}/hqdefault.jpg" width="480" height="360"/>
+   <media:description>{description}</media:description>
+   <media:community>
+    <media:starRating count="{index}42" average="5.00" min="1" max="5"/>
+    <media:statistics views="{index}1234"/>
+   </media:community>
+  </media:group>
+ </entry>'''
+
+def _sampleFeed(count: int = 15) -> bytes:
+	entries = ''.join(ENTRY.format(video_id=f'vid{index:08d}', index=index, day=28 - index, short='#shorts' if index % 4 == 0 else '',
+									description='Une description de vidéo assez longue. ' * 20) for index in range(count))
+	return f'''<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns:yt="http://www.youtube.com/xml/schemas/2015" xmlns:media="http://search.yahoo.com/mrss/" xmlns="http://www.w3.org/2005/Atom">
+ <link rel="self" href="http://www.youtube.com/feeds/videos.xml?channel_id=UCaaaaaaaaaaaaaaaaaaaaaa"/>
+ <id>yt:channel:aaaaaaaaaaaaaaaaaaaaaa</id>
+ <yt:channelId>aaaaaaaaaaaaaaaaaaaaaa</yt:channelId>
+ <title>Chaîne de test</title>
+ <author>
+  <name>Chaîne de test</name>
+  <uri>https://www.youtube.com/channel/UCaaaaaaaaaaaaaaaaaaaaaa</uri>
+ </author>
+ <published>2020-01-01T00:00:00+00:00</published>{entries}
+</feed>'''.encode()
+
+def _legacy(content: bytes) -> list[tuple[str, dict]]:
+	# lecture d'avant : arbre complet, un dictionnaire par vidéo, puis tri de toutes les vidéos
+	root = ET.fromstring(content)
+	ns = {'atom': 'http://www.w3.org/2005/Atom', 'yt': 'http://www.youtube.com/xml/schemas/2015', 'media': 'http://search.yahoo.com/mrss/'}
+	videos = []
+	for entry in root.findall('atom:entry', ns):
+		video_id = entry.find('yt:videoId', ns)
+		if video_id is None:
+			continue
+		video_id = video_id.text
+		title_elem = entry.find('atom:title', ns)
+		video_title = title_elem.text if title_elem is not None else 'Sans titre'
+		link_elem = entry.find('atom:link', ns)
+		published_elem = entry.find('atom:published', ns)
+		author_elem = entry.find('atom:author/atom:name', ns)
+		media_thumbnail = entry.find('media:group/media:thumbnail', ns)
+		videos.append((video_id, {
+			'title': video_title,
+			'url': link_elem.get('href') if link_elem is not None else f"https://www.youtube.com/watch?v={video_id}",
+			'published': published_elem.text if published_elem is not None else '',
+			'channel_name': author_elem.text if author_elem is not None else 'Inconnu',
+			'thumbnail': media_thumbnail.get('url') if media_thumbnail is not None else None,
+			'is_short': bool(video_title) and '#short' in video_title.lower(),
+		}))
+	videos.sort(key=lambda x: x[1]['published'], reverse=True)
+	return videos
+
+def _peak_kb(parse) -> float:
+	tracemalloc.start()
+	parse()
+	peak = tracemalloc.get_traced_memory()[1]
+	tracemalloc.stop()
+	return peak / 1024
+
+def _measure(parse, runs: int = 500) -> tuple[float, float]:
+	return timeit.timeit(parse, number=runs) / runs * 1e6, _peak_kb(parse)
+
+def main():
+	feeds = [(path, open(path, 'rb').read()) for path in sys.argv[1:]] or [('flux généré', _sampleFeed())]
+	print(f'{"flux":<20} {"cas":<24} {"vidéos":>7} {"temps (µs)":>11} {"pic mémoire (Ko)":>17}')
+	for name, content in feeds:
+		legacy = _legacy(content)
+		ids = [video_id for video_id, video in legacy]
+		assert [video.video_id for video in _parseFeed(content)] == ids, name
+		cases = [
+			('ancien (arbre + tri)', lambda: _legacy(content), len(legacy)),
+			('complet', lambda: _parseFeed(content), len(ids)),
+		]
+		if ids:
+			cases.append(('aucune nouvelle vidéo', lambda: _parseFeed(content, {ids[0]}), 1))
+		if len(ids) > 3:
+			cases.append(('3 nouvelles vidéos', lambda: _parseFeed(content, {ids[3]}), 4))
+		for case, parse, count in cases:
+			elapsed_us, peak_kb = _measure(parse)
+			print(f'{name[:20]:<20} {case:<24} {count:>7} {elapsed_us:>11.1f} {peak_kb:>17.1f}')
+
+if __name__ == '__main__':
+	main()
@@ -1,6 +1,7 @@
 import logging
 import json
 import os
+import re
 from sqlalchemy import event
 from sqlalchemy.engine import Engine
 
@@ -10,7 +11,8 @@ from webapp import webapp
 
 
 basedir = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
-webapp.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{os.path.join(basedir, "instance", "database.db")}'
+# DATABASE_PATH permet de travailler sur une autre base (tests)
+webapp.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{os.environ.get("DATABASE_PATH") or os.path.join(basedir, "instance", "database.db")}'
 # Options moteur pour améliorer la concurrence SQLite
 webapp.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
 	'connect_args': {
@@ -59,7 +61,12 @@ def _doPreImportMigration(cursor:Cursor):
 		_renameTable('game_bundle', 'game_bundle_old', cursor)
 
 def _doPostImportMigration(cursor:Cursor):
-	if _tableEmpty('game_bundle', cursor) :
+	if _tableEmpty('game_name', cursor) and not _tableEmpty('anticheat_cache', cursor):
+		logging.info("remplir game_name avec les jeux de anticheat_cache")
+		games = cursor.execute("SELECT steam_id, game_name FROM anticheat_cache WHERE game_name IS NOT NULL AND game_name != ''").fetchall()
+		cursor.executemany('INSERT OR IGNORE INTO game_name(steam_id, name, normalized) VALUES (?, ?, ?)', [(steam_id, name, re.sub("[^a-z0-9]", "", name.lower())) for steam_id, name in games])
+
+	if _tableEmpty('game_bundle', cursor) and _tableExists('game_bundle_old', cursor) :
 		logging.info("remplir game_bundle avec game_bundle_old")
 		bundles = cursor.execute(f'SELECT * FROM game_bundle_old').fetchall()
 		for bundle in bundles : 
@@ -72,7 +79,7 @@ def _doPostImportMigration(cursor:Cursor):
 		_dropTable('game_bundle_old', cursor)
 
 	if _tableExists('youtube_notification', cursor):
-		embed_columns = [
+		columns = [
 			('embed_title', 'VARCHAR(256)'),
 			('embed_description', 'VARCHAR(2000)'),
 			('embed_color', 'VARCHAR(8) DEFAULT "FF0000"'),
@@ -81,8 +88,12 @@ def _doPostImportMigration(cursor:Cursor):
 			('embed_author_icon', 'VARCHAR(512)'),
 			('embed_thumbnail', 'BOOLEAN DEFAULT 1'),
 			('embed_image', 'BOOLEAN DEFAULT 1'),
+			('feed_etag', 'VARCHAR(256)'),
+			('feed_last_modified', 'VARCHAR(64)'),
+			('last_published_at', 'DATETIME'),
+			('next_check_at', 'DATETIME'),
 		]
-		for col_name, col_type in embed_columns:
+		for col_name, col_type in columns:
 			if not _tableHaveColumn('youtube_notification', col_name, cursor):
 				try:
 					cursor.execute(f'ALTER TABLE youtube_notification ADD COLUMN {col_name} {col_type}')
@@ -0,0 +1,26 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from database import db
+from database.writer import databaseWriter
+from webapp import webapp
+
+# Les bots asyncio ne touchent plus SQLite depuis leur boucle : les lectures passent par ces threads dédiés.
+# Chaque appel pousse son propre app_context, donc sa propre session (retirée au teardown).
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='database')
+
+def _runInAppContext(function, args):
+	with webapp.app_context():
+		return function(*args)
+
+async def runInSession(function, *args):
+	loop = asyncio.get_running_loop()
+	return await loop.run_in_executor(_executor, partial(_runInAppContext, function, args))
+
+# Les écritures passent par l'écrivain unique, qui les regroupe par transaction
+async def commitInSession(function, *args):
+	return await databaseWriter.write(function, *args)
+
+async def addAll(*instances):
+	await commitInSession(db.session.add_all, instances)
@@ -1,32 +1,164 @@
 
+import json
+import threading
+
+from sqlalchemy import event
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
 from database import db
-from database.models import Configuration
+from database.models import AntiCheatCache, Commande, Configuration, GameAlias
+
+_TRUE_VALUES = ['true', '1', 'yes', 'on']
+
+# Invalidation des caches mémoire après commit : modèle surveillé -> fonctions d'invalidation
+_watched_models = {}
+
+def watchModel(model, invalidate):
+	_watched_models.setdefault(model, []).append(invalidate)
+
+def markChanged(session, model):
+	session.info.setdefault('invalidate', set()).update(_watched_models[model])
+
+@event.listens_for(Session, 'after_flush')
+def _detectWatchedChanges(session, flush_context):
+	for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+		if type(instance) in _watched_models:
+			markChanged(session, type(instance))
+
+@event.listens_for(Session, 'after_commit')
+def _invalidateWatchedCaches(session):
+	for invalidate in session.info.pop('invalidate', set()):
+		invalidate()
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _forgetWatchedChanges(session, previous_transaction):
+	session.info.pop('invalidate', None)
+
+
+class _TableSnapshot:
+	# Instantané d'une table chargé à la demande et partagé par tous les threads (web, Discord, Twitch)
+	def __init__(self, load):
+		self._load = load
+		self._snapshot = None
+		self._generation = 0
+		self._lock = threading.Lock()
+
+	def invalidate(self):
+		with self._lock:
+			self._generation += 1
+			self._snapshot = None
+
+	def get(self):
+		snapshot = self._snapshot
+		if snapshot != None:
+			return snapshot
+		generation = self._generation
+		snapshot = self._load()
+		with self._lock:
+			# une écriture a pu être commitée pendant le chargement : on ne garde pas un instantané périmé
+			if generation == self._generation:
+				self._snapshot = snapshot
+		return snapshot
+
+
+def _normalize(key:str, value):
+	if (key.endswith('_enable')) :
+		return value in _TRUE_VALUES
+	return value
+
+def _loadConfigurations() -> dict:
+	values = {}
+	for conf in Configuration.query.all():
+		if (conf.key.endswith('_enable')) :
+			values[conf.key] = conf.value in _TRUE_VALUES
+		else :
+			values[conf.key] = conf.value
+	return values
+
+_configurations = _TableSnapshot(_loadConfigurations)
+watchModel(Configuration, _configurations.invalidate)
 
 class ConfigurationHelper:
 	def getValue(self, key:str) :
-		conf = Configuration.query.filter_by(key=key).first()
-		if conf == None:
-			return None
-		if (key.endswith('_enable')) :
-			return conf.value in ['true', '1', 'yes', 'on']
-		return conf.value
-	
+		return _configurations.get().get(key)
+
 	def getIntValue(self, key:str) :
-		conf = Configuration.query.filter_by(key=key).first()
-		if conf == None:
+		value = _configurations.get().get(key)
+		if value == None:
 			return 0
-		return int(conf.value)
+		return int(value)
 
 	def createOrUpdate(self, key:str, value) :
 		conf = Configuration.query.filter_by(key=key).first()
-		if (key.endswith('_enable')) :
-			value = value in ['true', '1', 'yes', 'on']
+		value = _normalize(key, value)
 		if conf :
 			conf.value = value
 		else :
 			conf = Configuration(key = key, value = value)
 			db.session.add(conf)
 
+	def createOrUpdateAll(self, values:dict) :
+		rows = [{'key': key, 'value': _normalize(key, value)} for key, value in values.items()]
+		if not rows:
+			return
+		statement = insert(Configuration).values(rows)
+		db.session.execute(statement.on_conflict_do_update(index_elements=[Configuration.key], set_={'value': statement.excluded.value}))
+		markChanged(db.session, Configuration)
+
+
+def _loadDiscordCommandes() -> dict:
+	# à déclencheur égal, la première commande créée l'emporte
+	commandes = {}
+	for commande in Commande.query.filter_by(discord_enable=True).order_by(Commande.id).all():
+		commandes.setdefault(commande.trigger, commande.response)
+	return commandes
+
+_discord_commandes = _TableSnapshot(_loadDiscordCommandes)
+watchModel(Commande, _discord_commandes.invalidate)
+
+class CommandeHelper:
+	def getDiscordCommandes(self) -> dict :
+		return _discord_commandes.get()
+
+	def getDiscordResponse(self, trigger:str) :
+		return _discord_commandes.get().get(trigger)
+
+
+
+def _loadGameAliases() -> list[tuple[str, str]]:
+	# les alias les plus longs d'abord, pour qu'un alias court ne morde pas sur un plus long
+	aliases = sorted(GameAlias.query.all(), key=lambda alias: len(alias.alias), reverse=True)
+	return [(alias.alias, alias.name) for alias in aliases]
+
+_game_aliases = _TableSnapshot(_loadGameAliases)
+watchModel(GameAlias, _game_aliases.invalidate)
+
+class GameAliasHelper:
+	def getAliases(self) -> list[tuple[str, str]] :
+		return _game_aliases.get()
+
 
+def _loadAntiCheats() -> dict:
+	# listes d'anti-cheats décodées une fois au chargement plutôt qu'à chaque recherche
+	infos = {}
+	for entry in AntiCheatCache.query.all():
+		try:
+			anticheats = json.loads(entry.anticheats) if entry.anticheats else []
+		except:
+			anticheats = []
+		infos[entry.steam_id] = {
+			'status': entry.status,
+			'anticheats': anticheats,
+			'reference': entry.reference,
+			'notes': entry.notes
+		}
+	return infos
 
+_anticheats = _TableSnapshot(_loadAntiCheats)
+watchModel(AntiCheatCache, _anticheats.invalidate)
 
+class AntiCheatHelper:
+	def getInfos(self, steam_ids:list[str]) -> dict :
+		anticheats = _anticheats.get()
+		return {steam_id: anticheats.get(steam_id) for steam_id in steam_ids}
@@ -61,6 +61,42 @@ class AntiCheatCache(db.Model):
 	notes = db.Column(db.String(1024))
 	updated_at = db.Column(db.DateTime)
 
+class ProtonDbSummaryCache(db.Model):
+	__tablename__ = 'protondb_summary_cache'
+	steam_id = db.Column(db.String(32), primary_key=True)
+	summary = db.Column(db.String(2048))
+	fetched_at = db.Column(db.DateTime)
+
+class GameName(db.Model):
+	__tablename__ = 'game_name'
+	steam_id = db.Column(db.String(32), primary_key=True)
+	name = db.Column(db.String(256))
+	normalized = db.Column(db.String(256))
+
+class GameNameQuery(db.Model):
+	__tablename__ = 'game_name_query'
+	search_name = db.Column(db.String(256), primary_key=True)
+	searched_at = db.Column(db.DateTime)
+
+class ProtonDbQueryStat(db.Model):
+	__tablename__ = 'protondb_query_stats'
+	search_name = db.Column(db.String(256), primary_key=True)
+	searches = db.Column(db.Integer)
+	warm_hits = db.Column(db.Integer)
+	last_searched = db.Column(db.DateTime)
+
+
+class YouTubeSubscription(db.Model):
+	__tablename__ = 'youtube_subscription'
+	channel_id = db.Column(db.String(128), primary_key=True)
+	requested_at = db.Column(db.DateTime)
+	lease_expires_at = db.Column(db.DateTime)
+
+class YouTubeHandle(db.Model):
+	__tablename__ = 'youtube_handle'
+	handle = db.Column(db.String(128), primary_key=True)
+	channel_id = db.Column(db.String(128))
+	resolved_at = db.Column(db.DateTime)
 
 class YouTubeNotification(db.Model):
 	__tablename__ = 'youtube_notification'
@@ -71,6 +107,10 @@ class YouTubeNotification(db.Model):
 	message = db.Column(db.String(2000))
 	video_type = db.Column(db.String(16), default='all')
 	last_video_id = db.Column(db.String(128))
+	feed_etag = db.Column(db.String(256))
+	feed_last_modified = db.Column(db.String(64))
+	last_published_at = db.Column(db.DateTime)
+	next_check_at = db.Column(db.DateTime)
 	embed_title = db.Column(db.String(256))
 	embed_description = db.Column(db.String(2000))
 	embed_color = db.Column(db.String(8), default='FF0000')
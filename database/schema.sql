@@ -68,6 +68,50 @@ CREATE TABLE IF NOT EXISTS `anticheat_cache` (
 	updated_at DATETIME NOT NULL
 );
 
+CREATE TABLE IF NOT EXISTS `protondb_summary_cache` (
+	steam_id VARCHAR(32) PRIMARY KEY,
+	summary VARCHAR(2048),
+	fetched_at DATETIME NOT NULL
+);
+
+-- noms de jeux connus (AreWeAntiCheatYet, résultats Algolia) indexés en trigrammes pour la recherche locale
+CREATE TABLE IF NOT EXISTS `game_name` (
+	steam_id VARCHAR(32) PRIMARY KEY,
+	`name` VARCHAR(256) NOT NULL,
+	`normalized` VARCHAR(256) NOT NULL
+);
+
+-- recherche d'un nom exact, pour les titres contenant une virgule
+CREATE INDEX IF NOT EXISTS `game_name_normalized` ON `game_name` (`normalized`);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS `game_name_index` USING fts5(normalized, content='game_name', tokenize='trigram');
+
+CREATE TRIGGER IF NOT EXISTS `game_name_ai` AFTER INSERT ON `game_name` BEGIN
+	INSERT INTO game_name_index(rowid, normalized) VALUES (new.rowid, new.normalized);
+END;
+
+CREATE TRIGGER IF NOT EXISTS `game_name_ad` AFTER DELETE ON `game_name` BEGIN
+	INSERT INTO game_name_index(game_name_index, rowid, normalized) VALUES ('delete', old.rowid, old.normalized);
+END;
+
+CREATE TRIGGER IF NOT EXISTS `game_name_au` AFTER UPDATE ON `game_name` BEGIN
+	INSERT INTO game_name_index(game_name_index, rowid, normalized) VALUES ('delete', old.rowid, old.normalized);
+	INSERT INTO game_name_index(rowid, normalized) VALUES (new.rowid, new.normalized);
+END;
+
+-- recherches déjà envoyées à Algolia : leurs résultats sont tous dans game_name
+CREATE TABLE IF NOT EXISTS `game_name_query` (
+	`search_name` VARCHAR(256) PRIMARY KEY,
+	searched_at DATETIME NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS `protondb_query_stats` (
+	`search_name` VARCHAR(256) PRIMARY KEY,
+	searches INTEGER NOT NULL DEFAULT 0,
+	warm_hits INTEGER NOT NULL DEFAULT 0,
+	last_searched DATETIME NOT NULL
+);
+
 CREATE TABLE IF NOT EXISTS `member_invites` (
 	id INTEGER PRIMARY KEY AUTOINCREMENT,
 	`user_id` VARCHAR(64) NOT NULL,
@@ -77,6 +121,18 @@ CREATE TABLE IF NOT EXISTS `member_invites` (
 	`join_date` DATETIME NOT NULL
 );
 
+CREATE TABLE IF NOT EXISTS `youtube_subscription` (
+	`channel_id` VARCHAR(128) PRIMARY KEY,
+	requested_at DATETIME,
+	lease_expires_at DATETIME
+);
+
+CREATE TABLE IF NOT EXISTS `youtube_handle` (
+	`handle` VARCHAR(128) PRIMARY KEY,
+	channel_id VARCHAR(128),
+	resolved_at DATETIME
+);
+
 CREATE TABLE IF NOT EXISTS `youtube_notification` (
 	id INTEGER PRIMARY KEY AUTOINCREMENT,
 	`enable` BOOLEAN NOT NULL DEFAULT TRUE,
@@ -85,6 +141,10 @@ CREATE TABLE IF NOT EXISTS `youtube_notification` (
 	`message` VARCHAR(2000) NOT NULL,
 	`video_type` VARCHAR(16) NOT NULL DEFAULT 'all',
 	`last_video_id` VARCHAR(128),
+	`feed_etag` VARCHAR(256),
+	`feed_last_modified` VARCHAR(64),
+	`last_published_at` DATETIME,
+	`next_check_at` DATETIME,
 	`embed_title` VARCHAR(256),
 	`embed_description` VARCHAR(2000),
 	`embed_color` VARCHAR(8) NOT NULL DEFAULT 'FF0000',
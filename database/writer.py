@@ -0,0 +1,106 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from sqlalchemy.exc import OperationalError
+
+from database import db
+from webapp import webapp
+
+logger = logging.getLogger('database-writer')
+
+class DatabaseWriter:
+	# Écrivain unique côté bots : les intentions d'écriture de tous les sous-systèmes sont regroupées
+	# dans une seule transaction (toutes les max_delay secondes ou dès max_batch intentions).
+	def __init__(self, max_batch: int = 64, max_delay: float = 0.005, max_retries: int = 5, base_delay: float = 0.1):
+		self.max_batch = max_batch
+		self.max_delay = max_delay
+		self.max_retries = max_retries
+		self.base_delay = base_delay
+		self._queue = queue.Queue()
+		self._thread = None
+		self._lock = threading.Lock()
+
+	def submit(self, function, *args) -> Future:
+		future = Future()
+		self._queue.put((function, args, future))
+		self._ensureStarted()
+		return future
+
+	async def write(self, function, *args):
+		return await asyncio.wrap_future(self.submit(function, *args))
+
+	def _ensureStarted(self):
+		if self._thread != None:
+			return
+		with self._lock:
+			if self._thread == None:
+				self._thread = threading.Thread(target=self._run, name='database-writer', daemon=True)
+				self._thread.start()
+
+	def _run(self):
+		with webapp.app_context():
+			while True:
+				batch = self._nextBatch()
+				try:
+					self._commitBatch(batch)
+				except Exception as e:
+					logger.error(f'Erreur inattendue lors de l\'écriture groupée : {e}')
+				finally:
+					db.session.close()
+
+	def _nextBatch(self) -> list:
+		batch = [self._queue.get()]
+		deadline = time.monotonic() + self.max_delay
+		while len(batch) < self.max_batch:
+			timeout = deadline - time.monotonic()
+			if timeout <= 0:
+				break
+			try:
+				batch.append(self._queue.get(timeout=timeout))
+			except queue.Empty:
+				break
+		return batch
+
+	def _commitBatch(self, batch: list):
+		attempt = 0
+		while True:
+			try:
+				results = [function(*args) for function, args, future in batch]
+				db.session.commit()
+				break
+			except OperationalError as e:
+				db.session.rollback()
+				if 'database is locked' not in str(e).lower():
+					self._failOrSplit(batch, e)
+					return
+				if attempt >= self.max_retries:
+					self._fail(batch, e)
+					return
+				time.sleep(self.base_delay * (2 ** attempt))
+				attempt += 1
+			except Exception as e:
+				db.session.rollback()
+				self._failOrSplit(batch, e)
+				return
+		for (function, args, future), result in zip(batch, results):
+			if not future.done():
+				future.set_result(result)
+
+	def _fail(self, batch: list, error: Exception):
+		for function, args, future in batch:
+			if not future.done():
+				future.set_exception(error)
+
+	def _failOrSplit(self, batch: list, error: Exception):
+		if len(batch) == 1:
+			self._fail(batch, error)
+			return
+		# on rejoue les intentions une par une pour que seule celle en erreur échoue
+		for intent in batch:
+			self._commitBatch([intent])
+
+databaseWriter = DatabaseWriter()
@@ -4,9 +4,9 @@ import logging
 import random
 
 from webapp import webapp
-from database import db
-from database.helpers import ConfigurationHelper
-from database.models import Configuration, Humeur, Commande
+from database.executor import runInSession
+from database.helpers import CommandeHelper, ConfigurationHelper
+from database.models import Configuration, Humeur
 from discord import Message, TextChannel, Member
 from discordbot.humblebundle import checkHumbleBundleAndNotify
 from discordbot.moderation import (
@@ -22,9 +22,15 @@ from discordbot.moderation import (
 	handle_timeout_command,
 	handle_say_command
 )
+from discordbot.protondb import handle_protondb_command, handle_protondb_library_command
 from discordbot.welcome import sendWelcomeMessage, sendLeaveMessage, updateInviteCache
-from discordbot.youtube import checkYouTubeVideos
-from protondb import searhProtonDb
+from discordbot.websub import RENEW_INTERVAL, renewSubscriptions
+from discordbot.youtube import POLL_TICK, checkYouTubeVideos
+from protondb.anticheat import refreshAntiCheatIfNeeded
+from protondb.prewarm import PREWARM_INTERVAL, prewarmPopularGames
+
+def _loadHumeurs() -> list[Humeur]:
+	return Humeur.query.all()
 
 class DiscordBot(discord.Client):
 	async def on_ready(self):
@@ -40,13 +46,16 @@ class DiscordBot(discord.Client):
 		self.loop.create_task(self.updateStatus())
 		self.loop.create_task(self.updateHumbleBundle())
 		self.loop.create_task(self.updateYouTube())
+		self.loop.create_task(self.updateYouTubeSubscriptions())
+		self.loop.create_task(self.updateAntiCheat())
+		self.loop.create_task(self.updateProtonDbPrewarm())
 
 	async def on_disconnect(self):
 		webapp.config["BOT_STATUS"]["discord_connected"] = False
 	
 	async def updateStatus(self):
 		while not self.is_closed():
-			humeurs = Humeur.query.all()
+			humeurs = await runInSession(_loadHumeurs)
 			if len(humeurs)>0 :
 				humeur = random.choice(humeurs)
 				if humeur != None: 
@@ -62,7 +71,24 @@ class DiscordBot(discord.Client):
 	async def updateYouTube(self):
 		while not self.is_closed():
 			await checkYouTubeVideos()
-			await asyncio.sleep(5*60)
+			await asyncio.sleep(POLL_TICK)
+
+	async def updateYouTubeSubscriptions(self):
+		while not self.is_closed():
+			await renewSubscriptions()
+			await asyncio.sleep(RENEW_INTERVAL)
+
+	async def updateAntiCheat(self):
+		while not self.is_closed():
+			if ConfigurationHelper().getValue('proton_db_enable_enable'):
+				await refreshAntiCheatIfNeeded()
+			await asyncio.sleep(60*60)
+
+	async def updateProtonDbPrewarm(self):
+		while not self.is_closed():
+			if ConfigurationHelper().getValue('proton_db_enable_enable'):
+				await prewarmPopularGames()
+			await asyncio.sleep(PREWARM_INTERVAL)
 
 	def getAllTextChannel(self) -> list[TextChannel]:
 		channels = []
@@ -100,6 +126,50 @@ intents.members = True
 intents.invites = True
 bot = DiscordBot(intents=intents)
 
+# Tables de dispatch : déclencheur ou alias -> (handler, clé de configuration qui l'active).
+# Les commandes intégrées passent avant les commandes personnalisées, les commandes ProtonDB après,
+# et !pdb / !protondb restent reconnus en préfixe (!pdbElden Ring).
+_commands = {}
+_late_commands = {}
+_prefix_commands = []
+
+def _registerCommand(triggers: list[str], handler, enable_key: str = None):
+	for trigger in triggers:
+		_commands[trigger] = (handler, enable_key)
+
+def _registerLateCommand(triggers: list[str], handler, enable_key: str = None, prefix: bool = False):
+	for trigger in triggers:
+		_late_commands[trigger] = (handler, enable_key)
+		if prefix:
+			_prefix_commands.append((trigger, handler, enable_key))
+
+_registerCommand(['!averto', '!av', '!avertissement', '!warn'], handle_warning_command, 'moderation_enable')
+_registerCommand(['!to', '!timeout'], handle_timeout_command, 'moderation_enable')
+_registerCommand(['!delaverto', '!removewarn', '!unwarn'], handle_remove_warning_command, 'moderation_enable')
+_registerCommand(['!listevent', '!listwarn', '!warnings'], handle_list_warnings_command, 'moderation_enable')
+_registerCommand(['!inspect'], handle_inspect_command, 'moderation_enable')
+_registerCommand(['!ban'], handle_ban_command, 'moderation_ban_enable')
+_registerCommand(['!unban'], handle_unban_command, 'moderation_ban_enable')
+_registerCommand(['!banlist'], handle_ban_list_command, 'moderation_ban_enable')
+_registerCommand(['!kick'], handle_kick_command, 'moderation_kick_enable')
+_registerCommand(['!say'], handle_say_command)
+_registerCommand(['!aide', '!help'], handle_staff_help_command)
+_registerLateCommand(['!pdbsteam', '!pdblib'], handle_protondb_library_command, 'proton_db_enable_enable')
+_registerLateCommand(['!protondb', '!pdb'], handle_protondb_command, 'proton_db_enable_enable', prefix=True)
+
+def _enabledHandler(command: tuple):
+	if command:
+		handler, enable_key = command
+		if enable_key == None or ConfigurationHelper().getValue(enable_key):
+			return handler
+	return None
+
+def _lateHandler(message: Message, command_name: str):
+	command = _late_commands.get(command_name)
+	if command == None:
+		command = next(((handler, enable_key) for trigger, handler, enable_key in _prefix_commands if message.content.startswith(trigger)), None)
+	return _enabledHandler(command)
+
 # https://discordpy.readthedocs.io/en/stable/quickstart.html
 @bot.event
 async def on_message(message: Message):
@@ -109,157 +179,22 @@ async def on_message(message: Message):
 		return
 	command_name = message.content.split()[0]
 	
-	if ConfigurationHelper().getValue('moderation_enable'):
-		if command_name in ['!averto', '!av', '!avertissement', '!warn']:
-			await handle_warning_command(message, bot)
-			return
-
-		if command_name in ['!to', '!timeout']:
-			await handle_timeout_command(message, bot)
-			return
-
-		if command_name in ['!delaverto', '!removewarn', '!unwarn']:
-			await handle_remove_warning_command(message, bot)
-			return
-
-		if command_name in ['!listevent', '!listwarn', '!warnings']:
-			await handle_list_warnings_command(message, bot)
-			return
-	
-	if ConfigurationHelper().getValue('moderation_ban_enable'):
-		if command_name == '!ban':
-			await handle_ban_command(message, bot)
-			return
-		
-		if command_name == '!unban':
-			await handle_unban_command(message, bot)
-			return
-		if command_name == '!banlist':
-			await handle_ban_list_command(message, bot)
-			return
-	
-	if ConfigurationHelper().getValue('moderation_kick_enable'):
-		if command_name == '!kick':
-			await handle_kick_command(message, bot)
-			return
-	
-	if ConfigurationHelper().getValue('moderation_enable'):
-		if command_name == '!inspect':
-			await handle_inspect_command(message, bot)
-			return
-	
-	if command_name == '!say':
-		await handle_say_command(message, bot)
+	handler = _enabledHandler(_commands.get(command_name))
+	if handler:
+		await handler(message, bot)
 		return
 	
-	if command_name in ['!aide', '!help']:
-		await handle_staff_help_command(message, bot)
-		return
-	
-	commande = Commande.query.filter_by(discord_enable=True, trigger=command_name).first()
-	if commande:
+	response = CommandeHelper().getDiscordResponse(command_name)
+	if response:
 		try:
-			await message.channel.send(commande.response, suppress_embeds=True)
+			await message.channel.send(response, suppress_embeds=True)
 			return
 		except Exception as e:
 			logging.error(f'Échec de l\'exécution de la commande Discord : {e}')
-
-	if (ConfigurationHelper().getValue('proton_db_enable_enable') and (message.content.startswith('!protondb') or message.content.startswith('!pdb'))):
-		if (message.content.find('<@')>0) :
-			mention = message.content[message.content.find('<@'):]
-		else :
-			mention = message.author.mention
-		name = message.content
-		if name.startswith('!protondb'):
-			name = name.replace('!protondb', '', 1)
-		elif name.startswith('!pdb'):
-			name = name.replace('!pdb', '', 1)
-		name = name.replace(f'{mention}', '').strip();
-		
-		if not name or len(name) == 0:
-			try:
-				await message.delete()
-				delete_time = ConfigurationHelper().getIntValue('proton_db_delete_time') or 10
-				help_msg = await message.channel.send(
-					f"{mention} ⚠️ Utilisation: `!pdb nom du jeu` ou `!protondb nom du jeu`\n"
-					f"Exemple: `!pdb Elden Ring`",
-					suppress_embeds=True
-				)
-				await asyncio.sleep(delete_time)
-				await help_msg.delete()
-			except Exception as e:
-				logging.error(f"Échec de la gestion du message d'aide ProtonDB : {e}")
-			return
-		
-		try:
-			searching_msg = await message.channel.send(f"🔍 Recherche en cours pour **{name}**...")
-			games = searhProtonDb(name)
-			await searching_msg.delete()
-		except:
-			games = searhProtonDb(name)
-		
-		if (len(games)==0) :
-			msg = f'{mention} Je n\'ai pas trouvé de jeux correspondant à **{name}**. Es-tu sûr que le jeu est disponible sur Steam ?'
-			try:
-				await message.channel.send(msg, suppress_embeds=True)
-			except Exception as e:
-				logging.error(f"Échec de l'envoi du message ProtonDB : {e}")
-			return
-		total_games = len(games)
-		tier_colors = {'platinum': '🟣', 'gold': '🟡', 'silver': '⚪', 'bronze': '🟤', 'borked': '🔴'}
-		content = ""
-		max_games = 15
-		
-		for count, game in enumerate(games[:max_games]):
-			g_name = str(game.get('name'))
-			g_id = str(game.get('id'))
-			tier = str(game.get('tier') or 'N/A').lower()
-			tier_icon = tier_colors.get(tier, '⚫')
-			
-			new_entry = f"**[{g_name}](<https://www.protondb.com/app/{g_id}>)**\n{tier_icon} Classé **{tier.capitalize()}**"
-			
-			ac_status = game.get('anticheat_status')
-			if ac_status:
-				status_lower = str(ac_status).lower()
-				ac_map = {
-					'supported': ('✅', 'Supporté'),
-					'running': ('⚠️', 'Fonctionne'),
-					'broken': ('❌', 'Cassé'),
-					'denied': ('🚫', 'Refusé'),
-					'planned': ('📅', 'Planifié')
-				}
-				ac_emoji, ac_label = ac_map.get(status_lower, ('❔', str(ac_status)))
-				acs = game.get('anticheats') or []
-				ac_list = ', '.join([str(ac) for ac in acs if ac])
-				new_entry += f" • [Anti-cheat {ac_emoji} {ac_label}"
-				if ac_list:
-					new_entry += f" ({ac_list})"
-				new_entry += f"](<https://areweanticheatyet.com/game/{g_id}>)"
-			
-			new_entry += "\n\n"
-			
-			# Vérifier la limite avant d'ajouter
-			if len(content) + len(new_entry) > 3900:
-				rest = len(games) - count
-				content += f"*... et {rest} autre{'s' if rest > 1 else ''} jeu{'x' if rest > 1 else ''}*"
-				break
-			
-			content += new_entry
-		else:
-			rest = max(0, len(games) - max_games)
-			if rest > 0:
-				content += f"*... et {rest} autre{'s' if rest > 1 else ''} jeu{'x' if rest > 1 else ''}*"
-		
-		embed = discord.Embed(
-			title=f"🎮 Résultats ProtonDB - **{total_games} jeu{'x' if total_games > 1 else ''} trouvé{'s' if total_games > 1 else ''}**",
-			description=content,
-			color=0x5865F2
-		)
-		
-		try : 
-			await message.channel.send(embed=embed)
-		except Exception as e:
-			logging.error(f"Échec de l'envoi de l'embed ProtonDB : {e}")
+	
+	handler = _lateHandler(message, command_name)
+	if handler:
+		await handler(message, bot)
 
 @bot.event
 async def on_member_join(member: Member):
@@ -1,23 +1,23 @@
 import datetime
 import logging
 import json
-import requests
 
-from database import db
+from database.executor import addAll, runInSession
 from database.helpers import ConfigurationHelper
 from database.models import  GameBundle
 from discord import Client
+from httpclient import httpGet
 
 
 def _isEnable():
 	helper = ConfigurationHelper()
 	return helper.getValue('humble_bundle_enable') and helper.getIntValue('humble_bundle_channel') != 0 
 
-def _callGithub(): 
-	response = requests.get("https://raw.githubusercontent.com/shionn/HumbleBundleGamePack/refs/heads/master/data/game-bundles.json")
-	if response.status_code == 200:
+async def _callGithub(): 
+	response = await httpGet("https://raw.githubusercontent.com/shionn/HumbleBundleGamePack/refs/heads/master/data/game-bundles.json")
+	if response.status == 200:
 		return response.json()
-	logging.error(f"Échec de la connexion à la ressource Humble Bundle. Code de statut HTTP : {response.status_code}")
+	logging.error(f"Échec de la connexion à la ressource Humble Bundle. Code de statut HTTP : {response.status}")
 	return None
 
 def _isNotAlreadyNotified(bundle):
@@ -42,13 +42,12 @@ def _formatMessage(bundle):
 async def checkHumbleBundleAndNotify(bot: Client):
 	if _isEnable() :
 		try : 
-			bundles = _callGithub()
-			bundle = _findFirstNotNotified(bundles)
+			bundles = await _callGithub()
+			bundle = await runInSession(_findFirstNotNotified, bundles)
 			if bundle != None :
 				message = _formatMessage(bundle)
 				await bot.get_channel(ConfigurationHelper().getIntValue('humble_bundle_channel')).send(message)
-				db.session.add(GameBundle(url=bundle['url'], name=bundle['name'], json = json.dumps(bundle)))
-				db.session.commit()
+				await addAll(GameBundle(url=bundle['url'], name=bundle['name'], json = json.dumps(bundle)))
 		except Exception as e:
 			logging.error(f"Échec de la vérification des offres Humble Bundle : {e}")
 	else: 
@@ -1,13 +1,13 @@
 import asyncio
 import logging
-import time
 import os
 import re
 import discord
 from datetime import datetime, timezone, timedelta
 from zoneinfo import ZoneInfo
 from database import db
-from database.helpers import ConfigurationHelper
+from database.executor import addAll, commitInSession, runInSession
+from database.helpers import CommandeHelper, ConfigurationHelper
 from database.models import ModerationEvent
 from discord import Message
 
@@ -163,7 +163,7 @@ async def send_warning_usage(channel):
 	msg = await channel.send(embed=embed)
 	asyncio.create_task(delete_after_delay(msg))
 
-def create_warning_event(target_user, reason: str, staff_member):
+async def create_warning_event(target_user, reason: str, staff_member):
 	event = ModerationEvent(
 		type='warning',
 		username=target_user.name,
@@ -173,25 +173,7 @@ def create_warning_event(target_user, reason: str, staff_member):
 		staff_id=str(staff_member.id),
 		staff_name=staff_member.name
 	)
-	db.session.add(event)
-	_commit_with_retry()
-
-def _commit_with_retry(max_retries: int = 5, base_delay: float = 0.1):
-	attempt = 0
-	while True:
-		try:
-			db.session.commit()
-			return
-		except Exception as e:
-			msg = str(e)
-			if 'database is locked' in msg.lower() and attempt < max_retries:
-				db.session.rollback()
-				delay = base_delay * (2 ** attempt)
-				time.sleep(delay)
-				attempt += 1
-				continue
-			db.session.rollback()
-			raise
+	await addAll(event)
 
 async def send_dm_to_warned_user(target_user, reason: str, guild_name: str):
 	try:
@@ -261,7 +243,7 @@ async def handle_warning_command(message: Message, bot):
 			await _process_warning_success(message, target_user, reason, bot, timeout_seconds)
 
 async def _process_warning_success(message: Message, target_user, reason: str, bot, timeout_seconds: int = None):
-	create_warning_event(target_user, reason, message.author)
+	await create_warning_event(target_user, reason, message.author)
 	
 	timeout_info = None
 	if timeout_seconds:
@@ -282,8 +264,7 @@ async def _process_warning_success(message: Message, target_user, reason: str, b
 					staff_name=message.author.name,
 					duration=timeout_seconds
 				)
-				db.session.add(timeout_event)
-				_commit_with_retry()
+				await addAll(timeout_event)
 			except discord.Forbidden:
 				logging.error(f"Permissions insuffisantes pour timeout {target_user.name}")
 			except Exception as e:
@@ -411,8 +392,7 @@ async def _process_timeout_success(message: Message, target_user, reason: str, t
 			staff_name=message.author.name,
 			duration=timeout_seconds
 		)
-		db.session.add(timeout_event)
-		_commit_with_retry()
+		await addAll(timeout_event)
 		
 		await send_timeout_confirmation(message.channel, target_user, reason, timeout_seconds, message, bot)
 	except discord.Forbidden:
@@ -462,9 +442,14 @@ async def send_event_not_found(channel, event_id: int):
 	msg = await channel.send(embed=embed)
 	asyncio.create_task(delete_after_delay(msg))
 
-def delete_moderation_event(event: ModerationEvent):
-	db.session.delete(event)
-	db.session.commit()
+def get_moderation_event(event_id: int):
+	return ModerationEvent.query.filter_by(id=event_id).first()
+
+def _delete_moderation_event(event_id: int):
+	ModerationEvent.query.filter_by(id=event_id).delete()
+
+async def delete_moderation_event(event: ModerationEvent):
+	await commitInSession(_delete_moderation_event, event.id)
 
 async def send_event_deleted_confirmation(channel, event: ModerationEvent, moderator, original_message: Message):
 	embed = discord.Embed(
@@ -497,13 +482,13 @@ async def handle_remove_warning_command(message: Message, bot):
 		await send_invalid_event_id(message.channel)
 		return
 	
-	event = ModerationEvent.query.filter_by(id=event_id).first()
+	event = await runInSession(get_moderation_event, event_id)
 	
 	if not event:
 		await send_event_not_found(message.channel, event_id)
 		return
 	
-	delete_moderation_event(event)
+	await delete_moderation_event(event)
 	await send_event_deleted_confirmation(message.channel, event, message.author, message)
 
 def get_moderation_events(user_filter: str = None):
@@ -589,7 +574,7 @@ async def handle_list_warnings_command(message: Message, bot):
 	parts = message.content.split(maxsplit=1)
 	user_filter = str(message.mentions[0].id) if len(parts) > 1 and message.mentions else None
 	
-	events = get_moderation_events(user_filter)
+	events = await runInSession(get_moderation_events, user_filter)
 	
 	if not events:
 		await send_no_events_found(message.channel)
@@ -645,7 +630,7 @@ async def _send_user_not_found_for_ban(channel):
 	msg = await channel.send(embed=embed)
 	asyncio.create_task(delete_after_delay(msg))
 
-def _create_ban_event(target_user, reason: str, staff_member):
+async def _create_ban_event(target_user, reason: str, staff_member):
 	event = ModerationEvent(
 		type='ban',
 		username=target_user.name,
@@ -655,8 +640,7 @@ def _create_ban_event(target_user, reason: str, staff_member):
 		staff_id=str(staff_member.id),
 		staff_name=staff_member.name
 	)
-	db.session.add(event)
-	_commit_with_retry()
+	await addAll(event)
 	return event
 
 async def _process_ban_success(message: Message, target_user, reason: str, bot):
@@ -677,7 +661,7 @@ async def _process_ban_success(message: Message, target_user, reason: str, bot):
 		asyncio.create_task(delete_after_delay(msg))
 		return
 
-	event = _create_ban_event(target_user, reason, message.author)
+	event = await _create_ban_event(target_user, reason, message.author)
 	
 	local_now = _to_local(datetime.now(timezone.utc))
 	embed = discord.Embed(
@@ -720,6 +704,9 @@ async def _send_unban_usage(channel):
 	msg = await channel.send(embed=embed)
 	asyncio.create_task(delete_after_delay(msg))
 
+def _get_ban_event(sanction_id: int):
+	return ModerationEvent.query.filter_by(id=sanction_id, type='ban').first()
+
 async def _parse_unban_target_and_reason(message: Message, bot, parts: list):
 	reason = parts[2] if len(parts) > 2 else "Sans raison"
 	target_user = None
@@ -727,7 +714,7 @@ async def _parse_unban_target_and_reason(message: Message, bot, parts: list):
 	if parts[1].startswith('#'):
 		try:
 			sanction_id = int(parts[1][1:])
-			evt = ModerationEvent.query.filter_by(id=sanction_id, type='ban').first()
+			evt = await runInSession(_get_ban_event, sanction_id)
 			if not evt:
 				return None, None, reason
 			discord_id = evt.discord_id
@@ -786,8 +773,7 @@ async def _process_unban_success(message: Message, bot, target_user, discord_id:
 		staff_id=str(message.author.id),
 		staff_name=message.author.name
 	)
-	db.session.add(create)
-	_commit_with_retry()
+	await addAll(create)
 
 	try:
 		asyncio.create_task(_send_unban_invite(message, bot, target_user, discord_id))
@@ -968,12 +954,11 @@ async def handle_staff_help_command(message: Message, bot):
 			"Ex: `!pdb Elden Ring`"
 		)
 	
-	from database.models import Commande
-	custom_commands = Commande.query.filter_by(discord_enable=True).all()
+	custom_commands = list(CommandeHelper().getDiscordCommandes())
 	if custom_commands:
 		commands_list = []
-		for cmd in custom_commands:
-			commands_list.append(f"• `{cmd.trigger}`")
+		for trigger in custom_commands:
+			commands_list.append(f"• `{trigger}`")
 		custom_text = "\n".join(commands_list[:10])
 		if len(custom_commands) > 10:
 			custom_text += f"\n*... et {len(custom_commands) - 10} autres*"
@@ -1145,8 +1130,7 @@ async def _process_kick_success(message: Message, target_member, reason: str, bo
 		staff_id=str(message.author.id),
 		staff_name=message.author.name
 	)
-	db.session.add(create)
-	_commit_with_retry()
+	await addAll(create)
 	
 	local_now = _to_local(datetime.now(timezone.utc))
 	embed = discord.Embed(
@@ -1284,15 +1268,16 @@ def create_inspect_embed(user, member, join_date, days_on_server, account_age, w
 	embed.set_footer(text="Mamie Henriette")
 	return embed
 
+def _find_member_invite(user_id: str, guild_id: str):
+	from sqlalchemy import text
+	return db.session.execute(
+		text("SELECT invite_code, inviter_name FROM member_invites WHERE user_id = :user_id AND guild_id = :guild_id ORDER BY join_date DESC LIMIT 1"),
+		{'user_id': user_id, 'guild_id': guild_id}
+	).fetchone()
+
 async def get_invite_info_for_user(bot, guild, user_id: int):
 	try:
-		from database import db
-		from sqlalchemy import text
-		
-		result = db.session.execute(
-			text("SELECT invite_code, inviter_name FROM member_invites WHERE user_id = :user_id AND guild_id = :guild_id ORDER BY join_date DESC LIMIT 1"),
-			{'user_id': str(user_id), 'guild_id': str(guild.id)}
-		).fetchone()
+		result = await runInSession(_find_member_invite, str(user_id), str(guild.id))
 		
 		if result and result[0]:
 			invite_code = result[0]
@@ -1327,7 +1312,7 @@ async def handle_inspect_command(message: Message, bot):
 	member = message.guild.get_member(target_user.id)
 	join_date, days_on_server = await get_member_join_info(message.guild, target_user.id)
 	account_age = get_account_age(target_user)
-	warnings, kicks, bans = get_user_moderation_history(str(target_user.id))
+	warnings, kicks, bans = await runInSession(get_user_moderation_history, str(target_user.id))
 	invite_info = await get_invite_info_for_user(bot, message.guild, target_user.id)
 	
 	embed = create_inspect_embed(
@@ -0,0 +1,318 @@
+import asyncio
+import discord
+import logging
+import math
+import time
+from collections import OrderedDict
+
+from database.helpers import ConfigurationHelper
+from discord import Interaction, Message
+from httpclient import setDeadline
+from protondb import findProtonDbGames, getProtonDbResults, isKnownProtonDbTitle, lookupProtonDbTitles, recordProtonDbQuery, streamProtonDbResults, traceProtonDbSearch
+from protondb.steam_library import SteamLibraryError, fetchSteamLibrary, getAppGames, parseAppIds
+
+# Délai minimal entre deux modifications du message de résultats (secondes)
+EDIT_INTERVAL = 1.5
+# Jeux par page, et durée pendant laquelle les boutons de pagination restent actifs (secondes)
+PAGE_SIZE = 10
+PAGES_TIMEOUT = 15 * 60
+# Nombre maximal de recherches paginées gardées en mémoire
+MAX_PAGED_SEARCHES = 100
+# Nombre maximal de titres dans une recherche multiple (!pdb jeu 1, jeu 2, ...)
+MAX_BATCH_TITLES = 10
+# Temps accordé à l'ensemble des appels externes d'une commande ou d'un changement de page (secondes) ;
+# passé ce délai, la réponse est affichée avec ce qui est déjà en cache
+COMMAND_DEADLINE = 15
+LIBRARY_DEADLINE = 30
+
+_TIER_COLORS = {'platinum': '🟣', 'gold': '🟡', 'silver': '⚪', 'bronze': '🟤', 'borked': '🔴'}
+_ANTICHEAT_LABELS = {
+	'supported': ('✅', 'Supporté'),
+	'running': ('⚠️', 'Fonctionne'),
+	'broken': ('❌', 'Cassé'),
+	'denied': ('🚫', 'Refusé'),
+	'planned': ('📅', 'Planifié')
+}
+
+def _build_embed(games: list, total_games: int, searching: bool, page: int = 0, page_count: int = 1, title: str = None) -> discord.Embed:
+	content = ""
+	max_games = 15
+	
+	for count, game in enumerate(games[:max_games]):
+		g_name = str(game.get('name'))
+		g_id = str(game.get('id'))
+		tier = str(game.get('tier') or 'N/A').lower()
+		tier_icon = _TIER_COLORS.get(tier, '⚫')
+		
+		new_entry = f"**[{g_name}](<https://www.protondb.com/app/{g_id}>)**\n{tier_icon} Classé **{tier.capitalize()}**"
+		
+		ac_status = game.get('anticheat_status')
+		if ac_status:
+			status_lower = str(ac_status).lower()
+			ac_emoji, ac_label = _ANTICHEAT_LABELS.get(status_lower, ('❔', str(ac_status)))
+			acs = game.get('anticheats') or []
+			ac_list = ', '.join([str(ac) for ac in acs if ac])
+			new_entry += f" • [Anti-cheat {ac_emoji} {ac_label}"
+			if ac_list:
+				new_entry += f" ({ac_list})"
+			new_entry += f"](<https://areweanticheatyet.com/game/{g_id}>)"
+		
+		new_entry += "\n\n"
+		
+		# Vérifier la limite avant d'ajouter
+		if len(content) + len(new_entry) > 3900:
+			rest = len(games) - count
+			content += f"*... et {rest} autre{'s' if rest > 1 else ''} jeu{'x' if rest > 1 else ''}*"
+			break
+		
+		content += new_entry
+	else:
+		rest = max(0, len(games) - max_games)
+		if rest > 0:
+			content += f"*... et {rest} autre{'s' if rest > 1 else ''} jeu{'x' if rest > 1 else ''}*"
+	
+	if not content and not searching:
+		content = "*Aucun rapport ProtonDB pour les jeux de cette page.*"
+	
+	if title == None:
+		title = f"🎮 Résultats ProtonDB - **{total_games} jeu{'x' if total_games > 1 else ''} trouvé{'s' if total_games > 1 else ''}**"
+	if searching:
+		title += " - 🔍 recherche en cours..."
+	embed = discord.Embed(title=title, description=content, color=0x5865F2)
+	if page_count > 1:
+		embed.set_footer(text=f"Page {page + 1}/{page_count}")
+	return embed
+
+class ProtonDbPagesView(discord.ui.View):
+	# Pagination des résultats : chaque page n'est rendue, et ses résumés récupérés, qu'à la première demande
+	def __init__(self, matches: list, first_page: list, title: str = None):
+		super().__init__(timeout=PAGES_TIMEOUT)
+		self.matches = matches
+		self.title = title
+		self.pages = {0: first_page}
+		self.page = 0
+		self.message = None
+		self._lock = asyncio.Lock()
+		self._updateButtons()
+
+	@property
+	def page_count(self) -> int:
+		return math.ceil(len(self.matches) / PAGE_SIZE)
+
+	def embed(self) -> discord.Embed:
+		return _build_embed(self.pages[self.page], len(self.matches), False, self.page, self.page_count, self.title)
+
+	def _updateButtons(self):
+		self.previous.disabled = self.page == 0
+		self.next.disabled = self.page >= self.page_count - 1
+
+	@discord.ui.button(label='◀', style=discord.ButtonStyle.secondary)
+	async def previous(self, interaction: Interaction, button: discord.ui.Button):
+		await self._show(interaction, self.page - 1)
+
+	@discord.ui.button(label='▶', style=discord.ButtonStyle.secondary)
+	async def next(self, interaction: Interaction, button: discord.ui.Button):
+		await self._show(interaction, self.page + 1)
+
+	async def _show(self, interaction: Interaction, page: int):
+		setDeadline(COMMAND_DEADLINE)
+		await interaction.response.defer()
+		async with self._lock:
+			page = max(0, min(page, self.page_count - 1))
+			if page not in self.pages:
+				self.pages[page] = await getProtonDbResults(self.matches[page * PAGE_SIZE:(page + 1) * PAGE_SIZE])
+			self.page = page
+			self._updateButtons()
+			try:
+				await interaction.edit_original_response(embed=self.embed(), view=self)
+			except Exception as e:
+				logging.error(f"Échec du changement de page ProtonDB : {e}")
+
+	async def on_timeout(self):
+		_paged_searches.pop(self.message.id if self.message else None, None)
+		await self.close()
+
+	async def close(self):
+		self.stop()
+		if self.message:
+			try:
+				await self.message.edit(view=None)
+			except Exception:
+				pass
+
+# recherches paginées encore actives, par message : les plus anciennes sont fermées au-delà de la limite
+_paged_searches = OrderedDict()
+
+def _keepPagedSearch(view: ProtonDbPagesView):
+	_paged_searches[view.message.id] = view
+	while len(_paged_searches) > MAX_PAGED_SEARCHES:
+		message_id, oldest = _paged_searches.popitem(last=False)
+		asyncio.create_task(oldest.close())
+
+async def _showReply(message: Message, reply: Message, content: str, embed: discord.Embed, suppress: bool = False, view: discord.ui.View = None) -> Message:
+	if reply:
+		try:
+			return await reply.edit(content=content, embed=embed, suppress=suppress, view=view)
+		except Exception as e:
+			logging.error(f"Échec de la mise à jour du message ProtonDB : {e}")
+	try:
+		if embed:
+			return await message.channel.send(content=content, embed=embed, view=view)
+		return await message.channel.send(content, suppress_embeds=suppress)
+	except Exception as e:
+		logging.error(f"Échec de l'envoi du message ProtonDB : {e}")
+	return None
+
+def _build_batch_line(lookup: dict) -> str:
+	line = f"**{lookup['title']}** → "
+	status = lookup['status']
+	if status == 'not_found':
+		return line + "❌ introuvable"
+	if status == 'timeout' and not lookup['game']:
+		return line + "❔ inconnu (recherche trop longue)"
+	g_id, g_name = lookup['game']
+	line += f"[{g_name}](<https://www.protondb.com/app/{g_id}>) "
+	if status == 'timeout':
+		return line + "❔ inconnu (recherche trop longue)"
+	if status == 'no_reports':
+		return line + "⚫ aucun rapport"
+	game = lookup['result']
+	tier = str(game.get('tier') or 'N/A').lower()
+	line += f"{_TIER_COLORS.get(tier, '⚫')} **{tier.capitalize()}**"
+	ac_status = game.get('anticheat_status')
+	if ac_status:
+		ac_emoji, ac_label = _ANTICHEAT_LABELS.get(str(ac_status).lower(), ('❔', str(ac_status)))
+		line += f" • Anti-cheat {ac_emoji} {ac_label}"
+	return line
+
+async def _handle_batch(message: Message, reply: Message, titles: list[str]):
+	ignored = len(titles) - MAX_BATCH_TITLES
+	titles = titles[:MAX_BATCH_TITLES]
+	lookups = await lookupProtonDbTitles(titles)
+	content = '\n'.join([_build_batch_line(lookup) for lookup in lookups])
+	if ignored > 0:
+		content += f"\n\n*{ignored} titre{'s' if ignored > 1 else ''} ignoré{'s' if ignored > 1 else ''} (maximum {MAX_BATCH_TITLES} par recherche)*"
+	embed = discord.Embed(title=f"🎮 Résultats ProtonDB - **{len(titles)} titres**", description=content[:4000], color=0x5865F2)
+	await _showReply(message, reply, content=None, embed=embed)
+
+async def _show_paged_results(message: Message, reply: Message, matches: list, title: str = None) -> bool:
+	# la première page est modifiée au fil des résumés reçus, sans dépasser le rythme autorisé par Discord
+	games = []
+	page_count = math.ceil(len(matches) / PAGE_SIZE)
+	total_games = lambda: len(matches) if page_count > 1 else len(games)
+	last_edit = 0
+	try:
+		async for games, done in streamProtonDbResults(matches[:PAGE_SIZE]):
+			if reply and games and not done and time.monotonic() - last_edit >= EDIT_INTERVAL:
+				last_edit = time.monotonic()
+				try:
+					await reply.edit(content=None, embed=_build_embed(games, total_games(), True, 0, page_count, title))
+				except Exception as e:
+					logging.error(f"Échec de la mise à jour du message ProtonDB : {e}")
+	except Exception as e:
+		logging.error(f"Échec de la récupération des résumés ProtonDB : {e}")
+	
+	if len(games) == 0 and page_count <= 1:
+		return False
+	if page_count <= 1:
+		await _showReply(message, reply, content=None, embed=_build_embed(games, total_games(), False, title=title))
+		return True
+	view = ProtonDbPagesView(matches, games, title)
+	view.message = await _showReply(message, reply, content=None, embed=view.embed(), view=view)
+	if view.message:
+		_keepPagedSearch(view)
+	else:
+		view.stop()
+	return True
+
+async def handle_protondb_command(message: Message, bot):
+	if (message.content.find('<@')>0) :
+		mention = message.content[message.content.find('<@'):]
+	else :
+		mention = message.author.mention
+	name = message.content
+	if name.startswith('!protondb'):
+		name = name.replace('!protondb', '', 1)
+	elif name.startswith('!pdb'):
+		name = name.replace('!pdb', '', 1)
+	name = name.replace(f'{mention}', '').strip();
+	
+	if not name or len(name) == 0:
+		try:
+			await message.delete()
+			delete_time = ConfigurationHelper().getIntValue('proton_db_delete_time') or 10
+			help_msg = await message.channel.send(
+				f"{mention} ⚠️ Utilisation: `!pdb nom du jeu` ou `!protondb nom du jeu`\n"
+				f"Exemple: `!pdb Elden Ring`",
+				suppress_embeds=True
+			)
+			await asyncio.sleep(delete_time)
+			await help_msg.delete()
+		except Exception as e:
+			logging.error(f"Échec de la gestion du message d'aide ProtonDB : {e}")
+		return
+	
+	setDeadline(COMMAND_DEADLINE)
+	reply = None
+	try:
+		reply = await message.channel.send(f"🔍 Recherche en cours pour **{name}**...")
+	except Exception as e:
+		logging.error(f"Échec de l'envoi du message de recherche ProtonDB : {e}")
+	
+	if ',' in name and not await isKnownProtonDbTitle(name):
+		titles = list(dict.fromkeys([title.strip() for title in name.split(',') if title.strip()]))
+		if len(titles) > 1:
+			await _handle_batch(message, reply, titles)
+			return
+	
+	trace = traceProtonDbSearch()
+	try:
+		matches = await findProtonDbGames(name)
+	except Exception as e:
+		logging.error(f"Échec de la recherche ProtonDB pour {name} : {e}")
+		matches = []
+	
+	if not await _show_paged_results(message, reply, matches):
+		msg = f'{mention} Je n\'ai pas trouvé de jeux correspondant à **{name}**. Es-tu sûr que le jeu est disponible sur Steam ?'
+		await _showReply(message, reply, content=msg, embed=None, suppress=True)
+		return
+	recordProtonDbQuery(name, trace)
+
+async def handle_protondb_library_command(message: Message, bot):
+	profile = message.content.split(maxsplit=1)[1].strip() if len(message.content.split(maxsplit=1)) > 1 else ''
+	if not profile:
+		try:
+			await message.channel.send(
+				f"{message.author.mention} ⚠️ Utilisation: `!pdbsteam profil Steam` ou `!pdbsteam 570 730 1245620`\n"
+				f"Exemple: `!pdbsteam https://steamcommunity.com/id/gabelogannewell`",
+				suppress_embeds=True
+			)
+		except Exception as e:
+			logging.error(f"Échec de l'envoi de l'aide de la bibliothèque ProtonDB : {e}")
+		return
+	
+	setDeadline(LIBRARY_DEADLINE)
+	reply = None
+	try:
+		reply = await message.channel.send("🔍 Analyse de la bibliothèque en cours...", suppress_embeds=True)
+	except Exception as e:
+		logging.error(f"Échec de l'envoi du message de recherche ProtonDB : {e}")
+	
+	try:
+		app_ids = parseAppIds(profile)
+		if app_ids:
+			games = await getAppGames(app_ids)
+			title = f"🎮 ProtonDB - **{len(games)} jeu{'x' if len(games) > 1 else ''}**"
+		else:
+			owner, games = await fetchSteamLibrary(profile)
+			title = f"🎮 Bibliothèque Steam de {owner} - **{len(games)} jeu{'x' if len(games) > 1 else ''}**"
+	except SteamLibraryError as e:
+		await _showReply(message, reply, content=f"{message.author.mention} ❌ {e}", embed=None, suppress=True)
+		return
+	except Exception as e:
+		logging.error(f"Échec de la récupération de la bibliothèque Steam {profile} : {e}")
+		await _showReply(message, reply, content=f"{message.author.mention} ❌ Impossible de récupérer cette bibliothèque Steam pour le moment.", embed=None, suppress=True)
+		return
+	
+	if not await _show_paged_results(message, reply, games, title):
+		await _showReply(message, reply, content=f"{message.author.mention} Aucun jeu avec un rapport ProtonDB dans cette bibliothèque.", embed=None, suppress=True)
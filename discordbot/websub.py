@@ -0,0 +1,183 @@
+import hashlib
+import hmac
+import logging
+import secrets
+from datetime import datetime, timedelta
+from urllib.parse import parse_qs, urlsplit
+
+from database import db
+from database.executor import commitInSession, runInSession
+from database.helpers import ConfigurationHelper
+from database.models import YouTubeNotification, YouTubeSubscription
+from httpclient import httpPost
+
+logger = logging.getLogger('youtube-websub')
+logger.setLevel(logging.INFO)
+
+# Abonnements WebSub (PubSubHubbub) : YouTube pousse les nouvelles vidéos sur youtube_websub_callback,
+# le RSS n'est plus qu'un filet de sécurité. Sans adresse de rappel configurée, seul le RSS est utilisé.
+DEFAULT_HUB = 'https://pubsubhubbub.appspot.com/subscribe'
+TOPIC_URL = 'https://www.youtube.com/xml/feeds/videos.xml?channel_id='
+# Durée d'abonnement demandée au hub, renouvelé quand il expire dans moins de RENEW_MARGIN
+LEASE_SECONDS = 5 * 24 * 3600
+RENEW_MARGIN = timedelta(days=1)
+# Fréquence de vérification des abonnements (secondes), et délai avant de redemander un abonnement non confirmé
+RENEW_INTERVAL = 60 * 60
+RETRY_DELAY = timedelta(hours=6)
+
+
+def isWebSubEnabled() -> bool:
+	return bool(ConfigurationHelper().getValue('youtube_websub_callback'))
+
+
+def topicUrl(channel_id: str) -> str:
+	return f'{TOPIC_URL}{channel_id}'
+
+
+def channelFromTopic(topic: str) -> str:
+	values = parse_qs(urlsplit(topic or '').query).get('channel_id')
+	return values[0] if values else None
+
+
+def checkSignature(body: bytes, signature: str) -> bool:
+	# X-Hub-Signature: "sha1=<hex>" (YouTube) ; l'algorithme annoncé par le hub est accepté s'il est connu
+	secret = ConfigurationHelper().getValue('youtube_websub_secret')
+	if not secret or not signature or '=' not in signature:
+		return False
+	algorithm, digest = signature.split('=', 1)
+	if algorithm not in ('sha1', 'sha256', 'sha384', 'sha512'):
+		return False
+	expected = hmac.new(secret.encode(), body, getattr(hashlib, algorithm)).hexdigest()
+	return hmac.compare_digest(expected, digest.strip().lower())
+
+
+def confirmSubscription(mode: str, topic: str, lease_seconds: str) -> bool:
+	# vérification d'intention du hub (thread web) : on ne confirme que ce que l'on a réellement demandé
+	channel_id = channelFromTopic(topic)
+	if not channel_id or mode not in ('subscribe', 'unsubscribe'):
+		return False
+	followed = YouTubeNotification.query.filter_by(channel_id=channel_id, enable=True).first() != None
+	subscription = db.session.get(YouTubeSubscription, channel_id)
+	if mode == 'unsubscribe':
+		if followed or subscription == None:
+			return False
+		db.session.delete(subscription)
+		return True
+	# abonnement demandé par le bot depuis moins de RETRY_DELAY et pas encore confirmé
+	if not followed or subscription == None or subscription.requested_at == None:
+		return False
+	if subscription.requested_at + RETRY_DELAY < datetime.now():
+		return False
+	lease = LEASE_SECONDS
+	if lease_seconds:
+		try:
+			lease = int(lease_seconds)
+		except ValueError:
+			return False
+		# le hub peut raccourcir la durée demandée, pas l'allonger
+		if lease <= 0 or lease > LEASE_SECONDS:
+			return False
+	subscription.requested_at = None
+	subscription.lease_expires_at = datetime.now() + timedelta(seconds=lease)
+	return True
+
+
+def getActiveSubscriptions() -> set[str]:
+	# sans adresse de rappel, les abonnements encore valides ne reçoivent plus rien : toutes les chaînes repassent au RSS
+	if not isWebSubEnabled():
+		return set()
+	return {subscription.channel_id for subscription in YouTubeSubscription.query.filter(YouTubeSubscription.lease_expires_at > datetime.now()).all()}
+
+
+def _loadSubscriptionState() -> tuple[set[str], dict]:
+	channels = {notification.channel_id for notification in YouTubeNotification.query.filter_by(enable=True).all()}
+	subscriptions = {subscription.channel_id: subscription for subscription in YouTubeSubscription.query.all()}
+	return channels, subscriptions
+
+
+def _markRequested(channel_ids: list[str], requested_at: datetime):
+	for channel_id in channel_ids:
+		subscription = db.session.get(YouTubeSubscription, channel_id)
+		if subscription == None:
+			subscription = YouTubeSubscription(channel_id=channel_id)
+			db.session.add(subscription)
+		subscription.requested_at = requested_at
+
+
+def _forgetSubscriptions(channel_ids: list[str]):
+	YouTubeSubscription.query.filter(YouTubeSubscription.channel_id.in_(channel_ids)).delete()
+
+
+async def _secret() -> str:
+	secret = ConfigurationHelper().getValue('youtube_websub_secret')
+	if not secret:
+		secret = secrets.token_hex(20)
+		await commitInSession(ConfigurationHelper().createOrUpdateAll, {'youtube_websub_secret': secret})
+	return secret
+
+
+async def _callHub(mode: str, channel_id: str, callback: str, secret: str) -> bool:
+	hub = ConfigurationHelper().getValue('youtube_websub_hub') or DEFAULT_HUB
+	try:
+		response = await httpPost(hub, data={
+			'hub.mode': mode,
+			'hub.topic': topicUrl(channel_id),
+			'hub.callback': callback,
+			'hub.secret': secret,
+			'hub.lease_seconds': str(LEASE_SECONDS),
+			'hub.verify': 'async',
+		})
+	except Exception as e:
+		logger.error(f"Erreur lors de la demande WebSub {mode} pour {channel_id}: {e}")
+		return False
+	if response.status not in (202, 204):
+		logger.error(f"Le hub WebSub a refusé {mode} pour {channel_id} : HTTP {response.status} {response.text[:200]}")
+		return False
+	return True
+
+
+async def renewSubscriptions():
+	# demande (ou renouvelle) un abonnement pour chaque chaîne suivie, et résilie ceux qui ne servent plus
+	callback = ConfigurationHelper().getValue('youtube_websub_callback')
+	if not callback:
+		return
+	try:
+		channels, subscriptions = await runInSession(_loadSubscriptionState)
+		secret = await _secret()
+	except Exception as e:
+		logger.error(f"Erreur lors de la lecture des abonnements WebSub: {e}")
+		return
+	now = datetime.now()
+	pending = []
+	for channel_id in sorted(channels):
+		subscription = subscriptions.get(channel_id)
+		if subscription and subscription.lease_expires_at and subscription.lease_expires_at - RENEW_MARGIN > now:
+			continue
+		# demande (ou renouvellement) envoyée mais pas encore confirmée par le hub : on attend avant de la renvoyer
+		if subscription and subscription.requested_at and subscription.requested_at + RETRY_DELAY > now:
+			continue
+		pending.append(channel_id)
+	# la demande est enregistrée avant l'appel : le hub peut vérifier l'intention avant même de répondre
+	if pending:
+		await commitInSession(_markRequested, pending, now)
+	failed = [channel_id for channel_id in pending if not await _callHub('subscribe', channel_id, callback, secret)]
+	if failed:
+		await commitInSession(_markRequested, failed, None)
+	# chaînes qui ne sont plus suivies : un abonnement jamais confirmé ou expiré ne reçoit plus rien, il est oublié ;
+	# sinon la résiliation est demandée, puis redemandée après RETRY_DELAY au plus jusqu'à l'expiration du bail
+	expired = []
+	unsubscribing = []
+	for channel_id in sorted(set(subscriptions) - channels):
+		subscription = subscriptions[channel_id]
+		if subscription.lease_expires_at == None or subscription.lease_expires_at <= now:
+			expired.append(channel_id)
+		elif subscription.requested_at == None or subscription.requested_at + RETRY_DELAY <= now:
+			unsubscribing.append(channel_id)
+	if expired:
+		await commitInSession(_forgetSubscriptions, expired)
+	if unsubscribing:
+		await commitInSession(_markRequested, unsubscribing, now)
+	for channel_id in unsubscribing:
+		await _callHub('unsubscribe', channel_id, callback, secret)
+	if len(pending) > len(failed):
+		logger.info(f"Abonnements WebSub demandés pour {len(pending) - len(failed)} chaîne(s)")
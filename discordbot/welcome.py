@@ -1,25 +1,33 @@
 import discord
 import logging
+from database import db
+from database.executor import commitInSession
 from database.helpers import ConfigurationHelper
 from discord import Member, TextChannel
 from datetime import datetime, timezone
+from sqlalchemy import text
+from templating import renderTemplate
 
 invite_cache = {}
 
-def replaceMessageVariables(message: str, member: Member) -> str:
-	replacements = {
-		'{member.mention}': member.mention,
-		'{member.name}': member.name,
-		'{member.display_name}': member.display_name,
-		'{member.id}': str(member.id),
-		'{server.name}': member.guild.name,
-		'{server.member_count}': str(member.guild.member_count)
-	}
-	
-	for variable, value in replacements.items():
-		message = message.replace(variable, value)
-	
-	return message
+# Variables des messages de bienvenue et de départ, remplacées sans échappement des accolades ({{ reste {{)
+MEMBER_VARIABLES = ('member.mention', 'member.name', 'member.display_name', 'member.id', 'server.name', 'server.member_count')
+
+def replaceMessageVariables(key: str, message: str, member: Member) -> str:
+	return renderTemplate(('configuration', key), message, {
+		'member.mention': member.mention,
+		'member.name': member.name,
+		'member.display_name': member.display_name,
+		'member.id': member.id,
+		'server.name': member.guild.name,
+		'server.member_count': member.guild.member_count
+	}, escapes=False)
+
+def _saveMemberInvite(invite: dict):
+	db.session.execute(
+		text("INSERT INTO member_invites (user_id, guild_id, invite_code, inviter_name, join_date) VALUES (:user_id, :guild_id, :invite_code, :inviter_name, :join_date)"),
+		invite
+	)
 
 async def updateInviteCache(guild):
 	try:
@@ -66,24 +74,18 @@ async def sendWelcomeMessage(bot: discord.Client, member: Member):
 	if not welcome_message:
 		welcome_message = 'Bienvenue sur le serveur !'
 	
-	welcome_message = replaceMessageVariables(welcome_message, member)
+	welcome_message = replaceMessageVariables('welcome_message', welcome_message, member)
 	
 	invite_code, inviter_name, invite_display = await getUsedInvite(member.guild)
 	
 	try:
-		from database import db
-		from sqlalchemy import text
-		db.session.execute(
-			text("INSERT INTO member_invites (user_id, guild_id, invite_code, inviter_name, join_date) VALUES (:user_id, :guild_id, :invite_code, :inviter_name, :join_date)"),
-			{
-				'user_id': str(member.id),
-				'guild_id': str(member.guild.id),
-				'invite_code': invite_code,
-				'inviter_name': inviter_name,
-				'join_date': datetime.now(timezone.utc)
-			}
-		)
-		db.session.commit()
+		await commitInSession(_saveMemberInvite, {
+			'user_id': str(member.id),
+			'guild_id': str(member.guild.id),
+			'invite_code': invite_code,
+			'inviter_name': inviter_name,
+			'join_date': datetime.now(timezone.utc)
+		})
 	except Exception as e:
 		logging.error(f'Échec de la sauvegarde de l\'invitation : {e}')
 	
@@ -149,7 +151,7 @@ async def sendLeaveMessage(bot: discord.Client, member: Member):
 	if not leave_message:
 		leave_message = 'Un membre a quitté le serveur.'
 	
-	leave_message = replaceMessageVariables(leave_message, member)
+	leave_message = replaceMessageVariables('leave_message', leave_message, member)
 	
 	now = datetime.now(timezone.utc)
 	duration_seconds = int((now - member.joined_at).total_seconds()) if member.joined_at else 0
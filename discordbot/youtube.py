@@ -1,179 +1,436 @@
-import logging
 import asyncio
+import logging
+import random
+import time
 import xml.etree.ElementTree as ET
-import requests
+from datetime import datetime, timedelta
+from typing import NamedTuple
 
-from database import db
+from database.executor import commitInSession, runInSession
+from database.helpers import ConfigurationHelper
 from database.models import YouTubeNotification
-from webapp import webapp
+from discordbot.websub import getActiveSubscriptions
+from httpclient import CircuitOpenError, DeadlineExceededError, httpGet, setDeadline
+from templating import renderTemplate
 
 logger = logging.getLogger('youtube-notification')
 logger.setLevel(logging.INFO)
 
+# Fréquence à laquelle le bot regarde quels flux sont à vérifier (secondes)
+POLL_TICK = 60
+# Temps accordé à une vérification de toutes les chaînes (secondes)
+CHECK_DEADLINE = 4 * 60
+FEED_HOST = 'www.youtube.com'
+# Flux téléchargés en même temps (youtube_poll_concurrency) et écart minimal entre deux requêtes
+# vers YouTube (youtube_poll_spacing_ms), pour ne pas se faire limiter
+DEFAULT_CONCURRENCY = 8
+DEFAULT_SPACING_MS = 100
+# Intervalle propre à chaque flux (secondes) : court juste après une publication, il s'allonge avec
+# l'ancienneté de la dernière vidéo (ancienneté / ACTIVITY_RATIO), à ±JITTER près pour étaler les appels
+MIN_INTERVAL = 2 * 60
+MAX_INTERVAL = 60 * 60
+DEFAULT_INTERVAL = 5 * 60
+ACTIVITY_RATIO = 96
+JITTER = 0.2
+# Intervalle maximal d'un flux en erreur (secondes)
+MAX_FAILURE_INTERVAL = 6 * 60 * 60
+# Intervalle des chaînes abonnées en WebSub : le RSS ne sert plus qu'à rattraper une notification perdue
+SAFETY_NET_INTERVAL = 6 * 60 * 60
+
+# Variables des messages et des embeds de notification
+YOUTUBE_VARIABLES = ('channel_name', 'video_title', 'video_url', 'video_id', 'thumbnail', 'published_at', 'is_short')
+
+# résumé du dernier cycle de vérification
+_last_cycle = {}
+# échecs consécutifs par chaîne, remis à zéro dès que le flux répond
+_failures = {}
+# latence du dernier téléchargement et latence maximale par chaîne depuis le démarrage (ms)
+_feed_latencies = {}
+
+
+def _loadEnabledNotifications() -> list[YouTubeNotification]:
+	return YouTubeNotification.query.filter_by(enable=True).all()
+
+
+def _saveLastVideoId(notification_id: int, video_id: str):
+	YouTubeNotification.query.filter_by(id=notification_id).update({'last_video_id': video_id})
+
+
+def _saveFeedState(channel_id: str, values: dict):
+	YouTubeNotification.query.filter_by(channel_id=channel_id).update(values)
+
+
+def _nextCheck(last_published: datetime, pushed: bool = False, failures: int = 0) -> datetime:
+	if failures:
+		# flux en erreur (chaîne supprimée, YouTube en panne) : l'intervalle double à chaque échec consécutif
+		interval = min(MAX_FAILURE_INTERVAL, DEFAULT_INTERVAL * 2 ** (failures - 1))
+	elif pushed:
+		interval = SAFETY_NET_INTERVAL
+	elif last_published == None:
+		interval = DEFAULT_INTERVAL
+	else:
+		age = (datetime.now() - last_published).total_seconds()
+		interval = min(MAX_INTERVAL, max(MIN_INTERVAL, age / ACTIVITY_RATIO))
+	return datetime.now() + timedelta(seconds=interval * random.uniform(1 - JITTER, 1 + JITTER))
+
+
+def _publishedAt(published: str) -> datetime:
+	try:
+		return datetime.fromisoformat(published).astimezone().replace(tzinfo=None)
+	except (TypeError, ValueError):
+		return None
+
+
+def _knownVideoIds(watchers: list[YouTubeNotification]) -> set[str]:
+	# sans dernière vidéo connue pour l'une des notifications, le flux est lu en entier
+	video_ids = set(notification.last_video_id for notification in watchers)
+	return None if None in video_ids or '' in video_ids else video_ids
+
+
+def _sharedValue(watchers: list[YouTubeNotification], attribute: str) -> str:
+	# une notification ajoutée depuis le dernier téléchargement n'a pas d'état : le flux est alors retéléchargé en entier
+	values = set(getattr(notification, attribute) for notification in watchers)
+	return values.pop() if len(values) == 1 else None
+
 
 async def checkYouTubeVideos():
-	with webapp.app_context():
+	setDeadline(CHECK_DEADLINE)
+	start = time.perf_counter()
+	try:
+		notifications: list[YouTubeNotification] = await runInSession(_loadEnabledNotifications)
+		pushed = await runInSession(getActiveSubscriptions)
+	except Exception as e:
+		logger.error(f"Erreur lors de la vérification YouTube: {e}")
+		return
+	
+	# un même flux suivi par plusieurs notifications n'est téléchargé qu'une fois, et seulement quand il est dû
+	now = datetime.now()
+	channels = {}
+	for notification in notifications:
+		channels.setdefault(notification.channel_id, []).append(notification)
+	due = {channel_id: watchers for channel_id, watchers in channels.items()
+		if any(notification.next_check_at == None or notification.next_check_at <= now for notification in watchers)}
+	if not due:
+		return
+	
+	concurrency = ConfigurationHelper().getIntValue('youtube_poll_concurrency') or DEFAULT_CONCURRENCY
+	semaphore = asyncio.Semaphore(concurrency)
+	pacer = _HostPacer((ConfigurationHelper().getIntValue('youtube_poll_spacing_ms') or DEFAULT_SPACING_MS) / 1000)
+	results = await asyncio.gather(*[_checkChannel(channel_id, watchers, semaphore, pacer, channel_id in pushed) for channel_id, watchers in due.items()])
+	results = [result for result in results if result != None]
+	latencies = [result['latency'] for result in results]
+	slowest = max(results, key=lambda result: result['latency']) if results else None
+	
+	_last_cycle.update({
+		'checked_at': datetime.now(),
+		'duration_ms': int((time.perf_counter() - start) * 1000),
+		'notifications': len(notifications),
+		'feeds': len(channels),
+		'due': len(due),
+		'fetched': len(results),
+		'not_modified': sum(1 for result in results if result['not_modified']),
+		'bytes': sum(result['bytes'] for result in results),
+		'avg_latency_ms': int(sum(latencies) / len(latencies)) if latencies else 0,
+		'max_latency_ms': max(latencies) if latencies else 0,
+		'slowest_feed': slowest['channel_id'] if slowest else None,
+	})
+	logger.info(f"Vérification YouTube : {len(results)}/{len(due)} flux dus ({len(channels)} suivis), "
+				f"{_last_cycle['not_modified']} inchangés, {_last_cycle['bytes']} octets en {_last_cycle['duration_ms']} ms "
+				f"(latence moyenne {_last_cycle['avg_latency_ms']} ms, max {_last_cycle['max_latency_ms']} ms pour {_last_cycle['slowest_feed']})")
+
+
+def getPollStats() -> dict:
+	# dernier cycle de vérification, pour le panneau
+	return dict(_last_cycle)
+
+
+def getFeedLatencies() -> dict:
+	# par chaîne : {'last_ms', 'max_ms'}, pour repérer un flux lent depuis le panneau
+	return dict(_feed_latencies)
+
+
+def _recordLatency(channel_id: str, latency: int):
+	previous = _feed_latencies.get(channel_id)
+	_feed_latencies[channel_id] = {'last_ms': latency, 'max_ms': max(latency, previous['max_ms']) if previous else latency}
+
+
+class _HostPacer:
+	# espace d'au moins `spacing` secondes les débuts de requêtes vers un même hôte
+	def __init__(self, spacing: float):
+		self.spacing = spacing
+		self._next = {}
+
+	async def wait(self, host: str):
+		now = time.monotonic()
+		start = max(now, self._next.get(host, now))
+		self._next[host] = start + self.spacing
+		if start > now:
+			await asyncio.sleep(start - now)
+
+
+async def _rescheduleFailed(channel_id: str, failed: bool = True):
+	# sans nouvelle date, le flux serait redemandé à chaque POLL_TICK
+	failures = _failures.get(channel_id, 0)
+	if failed:
+		failures = _failures[channel_id] = failures + 1
+	try:
+		await commitInSession(_saveFeedState, channel_id, {'next_check_at': _nextCheck(None, failures=max(failures, 1))})
+	except Exception as e:
+		logger.error(f"Erreur lors de l'enregistrement du prochain passage pour {channel_id}: {e}")
+
+
+async def _checkChannel(channel_id: str, watchers: list[YouTubeNotification], semaphore: asyncio.Semaphore, pacer: _HostPacer, pushed: bool) -> dict:
+	# renvoie la chaîne, la latence (ms), la taille et l'état (304) du flux, ou None s'il n'a pas pu être récupéré
+	etag = _sharedValue(watchers, 'feed_etag')
+	last_modified = _sharedValue(watchers, 'feed_last_modified')
+	headers = {}
+	if etag:
+		headers['If-None-Match'] = etag
+	if last_modified:
+		headers['If-Modified-Since'] = last_modified
+	async with semaphore:
 		try:
-			notifications: list[YouTubeNotification] = YouTubeNotification.query.filter_by(enable=True).all()
-			
-			for notification in notifications:
-				try:
-					await _checkChannelVideos(notification)
-				except Exception as e:
-					logger.error(f"Erreur lors de la vérification de la chaîne {notification.channel_id}: {e}")
-					continue
+			await pacer.wait(FEED_HOST)
+			start = time.perf_counter()
+			response = await httpGet(f"https://{FEED_HOST}/feeds/videos.xml?channel_id={channel_id}", headers=headers)
+			latency = int((time.perf_counter() - start) * 1000)
+		except (CircuitOpenError, DeadlineExceededError) as e:
+			# le flux n'a pas été appelé : ce n'est pas un échec de plus pour la chaîne, on réessaie après le recul
+			# de ses échecs en cours (au moins l'intervalle par défaut), sans l'allonger
+			logger.warning(f"Flux YouTube {channel_id} non vérifié : {e}")
+			await _rescheduleFailed(channel_id, False)
+			return None
 		except Exception as e:
-			logger.error(f"Erreur lors de la vérification YouTube: {e}")
+			logger.error(f"Erreur lors de la récupération du RSS pour {channel_id}: {e}")
+			await _rescheduleFailed(channel_id)
+			return None
+	_recordLatency(channel_id, latency)
+	result = {'channel_id': channel_id, 'latency': latency, 'bytes': len(response.content), 'not_modified': response.status == 304}
+	
+	last_published = _sharedValue(watchers, 'last_published_at')
+	if response.status == 304:
+		_failures.pop(channel_id, None)
+		await commitInSession(_saveFeedState, channel_id, {'next_check_at': _nextCheck(last_published, pushed)})
+		return result
+	
+	if response.status != 200:
+		logger.error(f"Erreur HTTP {response.status} lors de la récupération du RSS pour {channel_id}")
+		await _rescheduleFailed(channel_id)
+		return result
+	
+	try:
+		videos = _parseFeed(response.content, _knownVideoIds(watchers))
+	except Exception as e:
+		logger.error(f"Erreur lors de la lecture du RSS pour {channel_id}: {e}")
+		await _rescheduleFailed(channel_id)
+		return result
+	_failures.pop(channel_id, None)
+	if not videos:
+		logger.warning(f"Aucune vidéo trouvée dans le RSS pour {channel_id}")
+	else:
+		last_published = _publishedAt(videos[0].published) or last_published
+	
+	for notification in watchers:
+		try:
+			await _checkChannelVideos(notification, videos)
+		except Exception as e:
+			logger.error(f"Erreur lors de la vérification de la chaîne {notification.channel_id}: {e}")
+	
+	await commitInSession(_saveFeedState, channel_id, {
+		'feed_etag': response.headers.get('ETag'),
+		'feed_last_modified': response.headers.get('Last-Modified'),
+		'last_published_at': last_published,
+		'next_check_at': _nextCheck(last_published, pushed),
+	})
+	return result
+
+
+def _loadChannelNotifications(channel_id: str) -> list[YouTubeNotification]:
+	return YouTubeNotification.query.filter_by(channel_id=channel_id, enable=True).all()
 
 
-async def _checkChannelVideos(notification: YouTubeNotification):
+async def handlePushedFeed(content: bytes):
+	# entrées Atom poussées par le hub WebSub : mêmes notifications que le RSS, sans attendre le prochain passage
 	try:
-		channel_id = notification.channel_id
-		
-		rss_url = f"https://www.youtube.com/feeds/videos.xml?channel_id={channel_id}"
-		
-		response = await asyncio.to_thread(requests.get, rss_url, timeout=10)
+		videos = _parseFeed(content)
+	except Exception as e:
+		logger.error(f"Erreur lors de la lecture d'une notification WebSub: {e}")
+		return
+	channels = {}
+	for video in videos:
+		if video.channel_id:
+			channels.setdefault(video.channel_id, []).append(video)
+	for channel_id, channel_videos in channels.items():
+		try:
+			watchers = await runInSession(_loadChannelNotifications, channel_id)
+			if not watchers:
+				continue
+			# une vidéo déjà connue peut être renvoyée quand son titre change : seules les plus récentes comptent
+			last_published = _sharedValue(watchers, 'last_published_at')
+			if last_published != None:
+				channel_videos = [video for video in channel_videos if (_publishedAt(video.published) or last_published) > last_published]
+			if not channel_videos:
+				continue
+			logger.info(f"Notification WebSub reçue pour {channel_id}: {channel_videos[0].video_id}")
+			for notification in watchers:
+				await _checkChannelVideos(notification, channel_videos)
+			await commitInSession(_saveFeedState, channel_id, {'last_published_at': _publishedAt(channel_videos[0].published) or last_published})
+		except Exception as e:
+			logger.error(f"Erreur lors du traitement WebSub pour {channel_id}: {e}")
+
+
+class FeedVideo(NamedTuple):
+	video_id: str
+	title: str
+	url: str
+	published: str
+	channel_name: str
+	thumbnail: str
+	is_short: bool
+	channel_id: str
+
+
+# taille des morceaux du flux donnés au parseur (octets)
+FEED_CHUNK = 4096
+_ATOM = '{http://www.w3.org/2005/Atom}'
+_YT = '{http://www.youtube.com/xml/schemas/2015}'
+_MEDIA = '{http://search.yahoo.com/mrss/}'
+_FEED_FIELDS = {
+	_YT + 'videoId': 'video_id',
+	_YT + 'channelId': 'channel_id',
+	_ATOM + 'title': 'title',
+	_ATOM + 'published': 'published',
+	_ATOM + 'name': 'channel_name',
+}
+
+
+def _feedEvents(content: bytes):
+	# lecture par petits morceaux : un arrêt anticipé évite aussi l'analyse du reste du document
+	parser = ET.XMLPullParser(events=('start', 'end'))
+	view = memoryview(content)
+	for offset in range(0, len(view), FEED_CHUNK):
+		parser.feed(view[offset:offset + FEED_CHUNK])
+		yield from parser.read_events()
+	parser.close()
+	yield from parser.read_events()
+
+
+def _feedVideo(fields: dict) -> FeedVideo:
+	video_id = fields['video_id']
+	title = fields.get('title') or 'Sans titre'
+	return FeedVideo(
+		video_id=video_id,
+		title=title,
+		url=fields.get('url') or f"https://www.youtube.com/watch?v={video_id}",
+		published=fields.get('published') or '',
+		channel_name=fields.get('channel_name') or 'Inconnu',
+		thumbnail=fields.get('thumbnail'),
+		is_short='#short' in title.lower(),
+		channel_id=fields.get('channel_id'),
+	)
+
+
+def _parseFeed(content: bytes, known_ids: set[str] = None) -> list[FeedVideo]:
+	# YouTube liste les vidéos de la plus récente à la plus ancienne : la lecture s'arrête dès que
+	# toutes les vidéos déjà notifiées (known_ids) ont été rencontrées, les suivantes sont plus anciennes
+	remaining = set(known_ids) if known_ids else None
+	videos = []
+	fields = None
+	for event, elem in _feedEvents(content):
+		if event == 'start':
+			if elem.tag == _ATOM + 'entry':
+				fields = {}
+			continue
+		if fields == None:
+			continue
+		tag = elem.tag
+		if tag == _ATOM + 'entry':
+			video_id = fields.get('video_id')
+			if video_id:
+				videos.append(_feedVideo(fields))
+			fields = None
+			elem.clear()
+			if remaining != None and video_id in remaining:
+				remaining.discard(video_id)
+				if not remaining:
+					break
+		elif tag in _FEED_FIELDS:
+			fields.setdefault(_FEED_FIELDS[tag], elem.text)
+		elif tag == _ATOM + 'link':
+			fields.setdefault('url', elem.get('href'))
+		elif tag == _MEDIA + 'thumbnail':
+			fields.setdefault('thumbnail', elem.get('url'))
+	return videos
+
+
+async def _checkChannelVideos(notification: YouTubeNotification, videos: list[FeedVideo]):
+	try:
+		if notification.video_type == 'short':
+			videos = [video for video in videos if video.is_short]
+		elif notification.video_type == 'video':
+			videos = [video for video in videos if not video.is_short]
+		elif notification.video_type != 'all':
+			videos = []
 		
-		if response.status_code != 200:
-			logger.error(f"Erreur HTTP {response.status_code} lors de la récupération du RSS pour {channel_id}")
+		if not videos:
 			return
 		
-		root = ET.fromstring(response.content)
-		
-		ns = {'atom': 'http://www.w3.org/2005/Atom', 'yt': 'http://www.youtube.com/xml/schemas/2015', 'media': 'http://search.yahoo.com/mrss/'}
+		if not notification.last_video_id:
+			notification.last_video_id = videos[0].video_id
+			await commitInSession(_saveLastVideoId, notification.id, videos[0].video_id)
+			return
 		
-		entries = root.findall('atom:entry', ns)
+		# toutes les vidéos publiées depuis la dernière notifiée, pour ne rien perdre d'une série de publications
+		video_ids = [video.video_id for video in videos]
+		if notification.last_video_id in video_ids:
+			new_videos = videos[:video_ids.index(notification.last_video_id)]
+		elif notification.last_published_at != None:
+			# la dernière vidéo notifiée n'est plus dans le flux (supprimée, ou flux poussé par WebSub)
+			new_videos = [video for video in videos if (_publishedAt(video.published) or notification.last_published_at) > notification.last_published_at]
+		else:
+			new_videos = videos[:1]
 		
-		if not entries:
-			logger.warning(f"Aucune vidéo trouvée dans le RSS pour {channel_id}")
-			return
+		for video in reversed(new_videos):
+			logger.info(f"Nouvelle vidéo détectée: {video.video_id} pour la chaîne {notification.channel_id}")
+			await _notifyVideo(notification, video)
 		
-		videos = []
-		for entry in entries:
-			video_id = entry.find('yt:videoId', ns)
-			if video_id is None:
-				continue
-			video_id = video_id.text
-			
-			title_elem = entry.find('atom:title', ns)
-			video_title = title_elem.text if title_elem is not None else 'Sans titre'
-			
-			link_elem = entry.find('atom:link', ns)
-			video_url = link_elem.get('href') if link_elem is not None else f"https://www.youtube.com/watch?v={video_id}"
-			
-			published_elem = entry.find('atom:published', ns)
-			published_at = published_elem.text if published_elem is not None else ''
-			
-			author_elem = entry.find('atom:author/atom:name', ns)
-			channel_name = author_elem.text if author_elem is not None else 'Inconnu'
-			
-			thumbnail = None
-			media_thumbnail = entry.find('media:group/media:thumbnail', ns)
-			if media_thumbnail is not None:
-				thumbnail = media_thumbnail.get('url')
-			
-			is_short = False
-			if video_title and ('#shorts' in video_title.lower() or '#short' in video_title.lower()):
-				is_short = True
-			
-			if notification.video_type == 'all':
-				videos.append((video_id, {
-					'title': video_title,
-					'url': video_url,
-					'published': published_at,
-					'channel_name': channel_name,
-					'thumbnail': thumbnail,
-					'is_short': is_short
-				}))
-			elif notification.video_type == 'short' and is_short:
-				videos.append((video_id, {
-					'title': video_title,
-					'url': video_url,
-					'published': published_at,
-					'channel_name': channel_name,
-					'thumbnail': thumbnail,
-					'is_short': is_short
-				}))
-			elif notification.video_type == 'video' and not is_short:
-				videos.append((video_id, {
-					'title': video_title,
-					'url': video_url,
-					'published': published_at,
-					'channel_name': channel_name,
-					'thumbnail': thumbnail,
-					'is_short': is_short
-				}))
-		
-		videos.sort(key=lambda x: x[1]['published'], reverse=True)
-		
-		if videos:
-			latest_video_id, latest_video = videos[0]
-			
-			if not notification.last_video_id:
-				notification.last_video_id = latest_video_id
-				db.session.commit()
-				return
-			
-			if latest_video_id != notification.last_video_id:
-				logger.info(f"Nouvelle vidéo détectée: {latest_video_id} pour la chaîne {notification.channel_id}")
-				await _notifyVideo(notification, latest_video, latest_video_id)
-				notification.last_video_id = latest_video_id
-				db.session.commit()
+		if videos[0].video_id != notification.last_video_id:
+			notification.last_video_id = videos[0].video_id
+			await commitInSession(_saveLastVideoId, notification.id, videos[0].video_id)
 				
 	except Exception as e:
 		logger.error(f"Erreur lors de la vérification des vidéos: {e}")
 
 
-async def _notifyVideo(notification: YouTubeNotification, video_data: dict, video_id: str):
+def _videoValues(video: FeedVideo) -> dict:
+	return {
+		'channel_name': video.channel_name,
+		'video_title': video.title,
+		'video_url': video.url,
+		'video_id': video.video_id,
+		'thumbnail': video.thumbnail or '',
+		'published_at': video.published,
+		'is_short': video.is_short,
+	}
+
+
+def _render(notification: YouTubeNotification, column: str, values: dict) -> str:
+	return renderTemplate(('youtube_notification', notification.id, column), getattr(notification, column), values)
+
+
+async def _notifyVideo(notification: YouTubeNotification, video: FeedVideo):
 	from discordbot import bot
 	try:
-		channel_name = video_data.get('channel_name', 'Inconnu')
-		video_title = video_data.get('title', 'Sans titre')
-		video_url = video_data.get('url', f"https://www.youtube.com/watch?v={video_id}")
-		thumbnail = video_data.get('thumbnail', '')
-		published_at = video_data.get('published', '')
-		is_short = video_data.get('is_short', False)
-		
-		try:
-			message = notification.message.format(
-				channel_name=channel_name or 'Inconnu',
-				video_title=video_title or 'Sans titre',
-				video_url=video_url,
-				video_id=video_id,
-				thumbnail=thumbnail or '',
-				published_at=published_at or '',
-				is_short=is_short
-			)
-		except KeyError as e:
-			logger.error(f"Variable manquante dans le message de notification: {e}")
-			message = f"🎥 Nouvelle vidéo de {channel_name}: [{video_title}]({video_url})"
-		
+		values = _videoValues(video)
+		message = _render(notification, 'message', values)
 		logger.info(f"Envoi de notification YouTube: {message}")
-		bot.loop.create_task(_sendMessage(notification, message, video_url, thumbnail, video_title, channel_name, video_id, published_at, is_short))
+		bot.loop.create_task(_sendMessage(notification, message, video, values))
 		
 	except Exception as e:
 		logger.error(f"Erreur lors de la notification: {e}")
 
 
-def _format_embed_text(text: str, channel_name: str, video_title: str, video_url: str, video_id: str, thumbnail: str, published_at: str, is_short: bool) -> str:
-	"""Formate un texte d'embed avec les variables disponibles"""
-	if not text:
-		return None
-	try:
-		return text.format(
-			channel_name=channel_name or 'Inconnu',
-			video_title=video_title or 'Sans titre',
-			video_url=video_url,
-			video_id=video_id,
-			thumbnail=thumbnail or '',
-			published_at=published_at or '',
-			is_short=is_short
-		)
-	except KeyError:
-		return text
-
-
-async def _sendMessage(notification: YouTubeNotification, message: str, video_url: str, thumbnail: str, video_title: str, channel_name: str, video_id: str, published_at: str, is_short: bool):
+async def _sendMessage(notification: YouTubeNotification, message: str, video: FeedVideo, values: dict):
 	from discordbot import bot
 	try:
 		discord_channel = bot.get_channel(notification.notify_channel)
@@ -183,8 +440,8 @@ async def _sendMessage(notification: YouTubeNotification, message: str, video_ur
 		
 		import discord
 		
-		embed_title = _format_embed_text(notification.embed_title, channel_name, video_title, video_url, video_id, thumbnail, published_at, is_short) if notification.embed_title else video_title
-		embed_description = _format_embed_text(notification.embed_description, channel_name, video_title, video_url, video_id, thumbnail, published_at, is_short) if notification.embed_description else None
+		embed_title = _render(notification, 'embed_title', values) or video.title
+		embed_description = _render(notification, 'embed_description', values)
 		
 		try:
 			embed_color = int(notification.embed_color or 'FF0000', 16)
@@ -193,25 +450,25 @@ async def _sendMessage(notification: YouTubeNotification, message: str, video_ur
 		
 		embed = discord.Embed(
 			title=embed_title,
-			url=video_url,
+			url=video.url,
 			color=embed_color
 		)
 		
 		if embed_description:
 			embed.description = embed_description
 		
-		author_name = _format_embed_text(notification.embed_author_name, channel_name, video_title, video_url, video_id, thumbnail, published_at, is_short) if notification.embed_author_name else channel_name
+		author_name = _render(notification, 'embed_author_name', values) or video.channel_name
 		author_icon = notification.embed_author_icon if notification.embed_author_icon else "https://www.youtube.com/img/desktop/yt_1200.png"
 		embed.set_author(name=author_name, icon_url=author_icon)
 		
-		if notification.embed_thumbnail and thumbnail:
-			embed.set_thumbnail(url=thumbnail)
+		if notification.embed_thumbnail and video.thumbnail:
+			embed.set_thumbnail(url=video.thumbnail)
 		
-		if notification.embed_image and thumbnail:
-			embed.set_image(url=thumbnail)
+		if notification.embed_image and video.thumbnail:
+			embed.set_image(url=video.thumbnail)
 		
 		if notification.embed_footer:
-			footer_text = _format_embed_text(notification.embed_footer, channel_name, video_title, video_url, video_id, thumbnail, published_at, is_short)
+			footer_text = _render(notification, 'embed_footer', values)
 			if footer_text:
 				embed.set_footer(text=footer_text)
 		
@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import re
+import threading
+from datetime import datetime, timedelta
+
+from database import db
+from database.executor import commitInSession
+from database.models import YouTubeHandle
+from httpclient import closeHttpSession, httpStream
+from webapp import webapp
+
+logger = logging.getLogger('youtube-handle')
+logger.setLevel(logging.INFO)
+
+# Cache persistant handle -> identifiant de chaîne, pour ne pas retélécharger la page de la chaîne à chaque
+# envoi du formulaire : un handle trouvé est gardé HANDLE_TTL, un handle inconnu de YouTube UNKNOWN_HANDLE_TTL
+HANDLE_TTL = timedelta(days=30)
+UNKNOWN_HANDLE_TTL = timedelta(hours=1)
+# La page d'une chaîne dépasse souvent le Mo : la lecture s'arrête au premier identifiant trouvé, ou après MAX_PAGE_BYTES
+MAX_PAGE_BYTES = 2 * 1024 * 1024
+_CHANNEL_ID = re.compile(rb'<link rel="canonical" href="https://www\.youtube\.com/channel/(UC[a-zA-Z0-9_-]{22})"|"(?:channelId|externalId)":"(UC[a-zA-Z0-9_-]{22})"')
+# un identifiant à cheval sur deux morceaux est retrouvé grâce à ce recouvrement (octets)
+_OVERLAP = 256
+
+# handles en cours de résolution, et ceux dont la dernière résolution a échoué (erreur réseau)
+_resolving = set()
+_failed = set()
+_lock = threading.Lock()
+
+
+class _ChannelIdScanner:
+	def __init__(self):
+		self._tail = b''
+
+	def __call__(self, chunk: bytes) -> str:
+		window = self._tail + chunk
+		match = _CHANNEL_ID.search(window)
+		if match:
+			return (match.group(1) or match.group(2)).decode()
+		self._tail = window[-_OVERLAP:]
+		return None
+
+
+def _saveHandle(handle: str, channel_id: str):
+	entry = db.session.get(YouTubeHandle, handle)
+	if entry == None:
+		entry = YouTubeHandle(handle=handle)
+		db.session.add(entry)
+	entry.channel_id = channel_id
+	entry.resolved_at = datetime.now()
+
+
+async def resolveHandle(handle: str):
+	# télécharge la page de la chaîne jusqu'au premier identifiant, puis l'enregistre dans le cache
+	try:
+		status, channel_id = await httpStream(f"https://www.youtube.com/@{handle}", _ChannelIdScanner(), MAX_PAGE_BYTES)
+		if status == 200 or status == 404:
+			await commitInSession(_saveHandle, handle, channel_id)
+			logger.info(f"Handle YouTube @{handle} résolu : {channel_id or 'chaîne introuvable'}")
+		else:
+			logger.warning(f"Résolution du handle YouTube @{handle} impossible : HTTP {status}")
+			_failed.add(handle)
+	except Exception as e:
+		logger.error(f"Erreur lors de la résolution du handle YouTube @{handle}: {e}")
+		_failed.add(handle)
+	finally:
+		with _lock:
+			_resolving.discard(handle)
+
+
+async def _resolveAndClose(handle: str):
+	try:
+		await resolveHandle(handle)
+	finally:
+		await closeHttpSession()
+
+
+def _resolveInThread(handle: str):
+	with webapp.app_context():
+		asyncio.run(_resolveAndClose(handle))
+
+
+def _startResolution(handle: str):
+	with _lock:
+		if handle in _resolving:
+			return
+		_resolving.add(handle)
+	from discordbot import bot
+	# la résolution tourne dans la boucle du bot, ou dans un thread à part s'il n'est pas connecté :
+	# le thread du panel ne l'attend jamais
+	if bot.is_ready():
+		asyncio.run_coroutine_threadsafe(resolveHandle(handle), bot.loop)
+	else:
+		threading.Thread(target=_resolveInThread, args=(handle,), name='youtube-handle', daemon=True).start()
+
+
+def lookupHandle(handle: str) -> tuple[str, str]:
+	# côté Flask : renvoie ('found', identifiant), ('unknown', None), ('error', None)
+	# ou ('pending', None) le temps que la résolution lancée en arrière-plan aboutisse
+	handle = handle.lower()
+	entry = db.session.get(YouTubeHandle, handle)
+	if entry and entry.resolved_at:
+		fresh = entry.resolved_at + (HANDLE_TTL if entry.channel_id else UNKNOWN_HANDLE_TTL) > datetime.now()
+		if entry.channel_id:
+			# un identifiant expiré reste servi pendant qu'il est vérifié en arrière-plan
+			if not fresh:
+				_startResolution(handle)
+			return 'found', entry.channel_id
+		if fresh:
+			return 'unknown', None
+	with _lock:
+		if handle in _failed:
+			_failed.discard(handle)
+			return 'error', None
+	_startResolution(handle)
+	return 'pending', None
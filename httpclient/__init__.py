@@ -0,0 +1,294 @@
+import aiohttp
+import asyncio
+import contextvars
+import json
+import logging
+import threading
+import time
+import weakref
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from database.helpers import ConfigurationHelper
+
+# Client HTTP partagé par toutes les intégrations (Humble Bundle, ProtonDB, Steam, YouTube...) :
+# les connexions sont gardées ouvertes par hôte, donc les appels répétés ne repaient ni TCP ni TLS.
+# Côté bots on utilise httpGet (asynchrone), côté Flask httpGetSync.
+
+# Délai maximal par défaut d'un appel (secondes)
+DEFAULT_TIMEOUT = 10
+# Connexions gardées ouvertes par hôte, et durée pendant laquelle une connexion inutilisée reste ouverte (secondes)
+POOL_SIZE_PER_HOST = 8
+KEEPALIVE_TIMEOUT = 60
+# Taille des morceaux lus par httpStream (octets)
+STREAM_CHUNK = 16 * 1024
+# gzip/deflate sont demandés et décompressés automatiquement par aiohttp et requests
+DEFAULT_HEADERS = {'User-Agent': 'MamieHenriette (+https://github.com/skylanix/MamieHenriette)'}
+# Disjoncteur par hôte : échecs consécutifs avant ouverture (http_breaker_threshold),
+# et durée pendant laquelle l'hôte n'est plus appelé avant un appel d'essai (http_breaker_cooldown, secondes)
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_COOLDOWN = 30
+
+class CircuitOpenError(Exception):
+	# l'hôte est en panne : on n'attend pas, l'appelant répond avec ce qu'il a en cache
+	pass
+
+class DeadlineExceededError(TimeoutError):
+	# le délai de la commande en cours est épuisé avant l'appel
+	pass
+
+class HttpResponse:
+	# Réponse lue en entier : la connexion retourne dans le pool dès la fin de l'appel
+	def __init__(self, url: str, status: int, headers, content: bytes, encoding: str = None):
+		self.url = url
+		self.status = status
+		self.headers = headers
+		self.content = content
+		self.encoding = encoding or 'utf-8'
+
+	@property
+	def text(self) -> str:
+		return self.content.decode(self.encoding, errors='replace')
+
+	def json(self):
+		return json.loads(self.content)
+
+class CircuitBreaker:
+	# fermé : les appels passent ; ouvert : ils échouent immédiatement ;
+	# semi-ouvert : après le délai de refroidissement, un seul appel d'essai décide de la suite
+	def __init__(self, host: str):
+		self.host = host
+		self.state = 'closed'
+		self.failures = 0
+		self.opened_at = 0.0
+		self._trial = False
+		self._lock = threading.Lock()
+
+	def acquire(self):
+		with self._lock:
+			if self.state == 'closed':
+				return
+			cooldown = ConfigurationHelper().getIntValue('http_breaker_cooldown') or DEFAULT_COOLDOWN
+			if self.state == 'open' and time.monotonic() - self.opened_at >= cooldown:
+				self.state = 'half_open'
+			if self.state == 'half_open' and not self._trial:
+				self._trial = True
+				return
+			raise CircuitOpenError(f'{self.host} est indisponible, nouvel essai dans moins de {cooldown} s')
+
+	def record(self, failed: bool):
+		# failed à None : appel interrompu par le délai de la commande, qui ne dit rien de l'hôte
+		with self._lock:
+			trial = self._trial
+			self._trial = False
+			if failed == None:
+				return
+			if not failed:
+				if self.state != 'closed':
+					logging.info(f'Disjoncteur {self.host} refermé')
+				self.state = 'closed'
+				self.failures = 0
+				return
+			self.failures += 1
+			threshold = ConfigurationHelper().getIntValue('http_breaker_threshold') or DEFAULT_FAILURE_THRESHOLD
+			if trial or self.failures >= threshold:
+				if self.state != 'open':
+					logging.warning(f'Disjoncteur {self.host} ouvert après {self.failures} échec(s)')
+				self.state = 'open'
+				self.opened_at = time.monotonic()
+
+_breakers = {}
+_stats = {}
+_stats_lock = threading.Lock()
+
+def getBreaker(host: str) -> CircuitBreaker:
+	with _stats_lock:
+		breaker = _breakers.get(host)
+		if breaker == None:
+			breaker = _breakers[host] = CircuitBreaker(host)
+		return breaker
+
+def recordCall(host: str, elapsed: float, error: bool = False):
+	# compte un appel vers host ; aussi utilisé par les clients qui ne passent pas par ce module (Algolia)
+	with _stats_lock:
+		stats = _stats.get(host)
+		if stats == None:
+			stats = _stats[host] = {'requests': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0}
+		elapsed_ms = elapsed * 1000
+		stats['requests'] += 1
+		stats['total_ms'] += elapsed_ms
+		stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+		if error:
+			stats['errors'] += 1
+
+def getHostStats() -> list[dict]:
+	with _stats_lock:
+		hosts = sorted(set(_stats) | set(_breakers))
+		empty = {'requests': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0}
+		return [{
+			'host': host,
+			'state': _breakers[host].state if host in _breakers else 'closed',
+			'requests': stats['requests'],
+			'errors': stats['errors'],
+			'error_ratio': round(100 * stats['errors'] / stats['requests']) if stats['requests'] else 0,
+			'avg_ms': round(stats['total_ms'] / stats['requests']) if stats['requests'] else 0,
+			'max_ms': round(stats['max_ms']),
+		} for host, stats in [(host, _stats.get(host, empty)) for host in hosts]]
+
+def _host(url: str) -> str:
+	return urlsplit(url).hostname or url
+
+# Échéance (time.monotonic) de la commande en cours, héritée par les tâches qu'elle crée ensuite
+_deadline = contextvars.ContextVar('http_deadline', default=None)
+
+def setDeadline(seconds: float):
+	# borne la durée de tous les appels sortants de la tâche en cours, quel que soit leur nombre
+	_deadline.set(time.monotonic() + seconds)
+
+def callTimeout(timeout: float = None) -> tuple[float, bool]:
+	# renvoie (délai de l'appel, True s'il est raccourci par l'échéance de la commande)
+	timeout = timeout or DEFAULT_TIMEOUT
+	deadline = _deadline.get()
+	if deadline == None:
+		return timeout, False
+	remaining = deadline - time.monotonic()
+	if remaining <= 0:
+		raise DeadlineExceededError('Délai de la commande dépassé')
+	return min(timeout, remaining), remaining < timeout
+
+def createDetachedTask(coro) -> asyncio.Task:
+	# tâche partagée entre commandes ou qui leur survit : elle ne doit pas mourir à l'échéance de celle qui l'a lancée
+	context = contextvars.copy_context()
+	context.run(_deadline.set, None)
+	return asyncio.get_running_loop().create_task(coro, context=context)
+
+async def waitWithinDeadline(task: asyncio.Future):
+	# attend une tâche partagée dans la limite de l'échéance de la commande en cours, sans l'annuler pour les autres
+	deadline = _deadline.get()
+	if deadline == None:
+		return await asyncio.shield(task)
+	remaining = deadline - time.monotonic()
+	if remaining <= 0:
+		raise DeadlineExceededError('Délai de la commande dépassé')
+	try:
+		return await asyncio.wait_for(asyncio.shield(task), remaining)
+	except TimeoutError as e:
+		if task.done():
+			raise
+		raise DeadlineExceededError('Délai de la commande dépassé') from e
+
+async def guardCall(host: str, call, timeout: float = None, failed = None):
+	# call(délai) -> awaitable ; failed(résultat) dit si une réponse reçue compte comme un échec de l'hôte
+	breaker = getBreaker(host)
+	timeout, bounded = callTimeout(timeout)
+	breaker.acquire()
+	start = time.perf_counter()
+	outcome = True
+	try:
+		result = await asyncio.wait_for(call(timeout), timeout)
+		outcome = failed(result) if failed else False
+		return result
+	except TimeoutError as e:
+		if bounded:
+			outcome = None
+			raise DeadlineExceededError('Délai de la commande dépassé') from e
+		raise
+	except asyncio.CancelledError:
+		outcome = None
+		raise
+	finally:
+		recordCall(host, time.perf_counter() - start, outcome == True)
+		breaker.record(outcome)
+
+def _guardCallSync(host: str, call, timeout: float = None, failed = None):
+	breaker = getBreaker(host)
+	timeout, bounded = callTimeout(timeout)
+	breaker.acquire()
+	start = time.perf_counter()
+	outcome = True
+	try:
+		result = call(timeout)
+		outcome = failed(result) if failed else False
+		return result
+	except requests.Timeout as e:
+		if bounded:
+			outcome = None
+			raise DeadlineExceededError('Délai de la commande dépassé') from e
+		raise
+	finally:
+		recordCall(host, time.perf_counter() - start, outcome == True)
+		breaker.record(outcome)
+
+def _isServerError(response) -> bool:
+	return response.status >= 500
+
+# une session aiohttp par boucle : ses connexions ne peuvent pas être partagées entre boucles
+_sessions = weakref.WeakKeyDictionary()
+
+def _session() -> aiohttp.ClientSession:
+	loop = asyncio.get_running_loop()
+	session = _sessions.get(loop)
+	if session == None or session.closed:
+		connector = aiohttp.TCPConnector(limit_per_host=POOL_SIZE_PER_HOST, keepalive_timeout=KEEPALIVE_TIMEOUT)
+		session = _sessions[loop] = aiohttp.ClientSession(connector=connector, headers=DEFAULT_HEADERS,
+														timeout=aiohttp.ClientTimeout(total=DEFAULT_TIMEOUT))
+	return session
+
+async def closeHttpSession():
+	# à appeler avant de fermer une boucle temporaire (asyncio.run)
+	session = _sessions.pop(asyncio.get_running_loop(), None)
+	if session != None:
+		await session.close()
+
+async def _request(method: str, url: str, headers: dict, params: dict, data, allow_redirects: bool, timeout: float) -> HttpResponse:
+	async with _session().request(method, url, headers=headers, params=params, data=data, allow_redirects=allow_redirects,
+								timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+		content = await response.read()
+		return HttpResponse(str(response.url), response.status, response.headers, content, response.charset)
+
+async def httpRequest(method: str, url: str, headers: dict = None, params: dict = None, data = None, timeout: float = None, allow_redirects: bool = True) -> HttpResponse:
+	# lève CircuitOpenError si l'hôte est en panne, DeadlineExceededError si la commande n'a plus le temps
+	return await guardCall(_host(url), lambda timeout: _request(method, url, headers, params, data, allow_redirects, timeout), timeout, _isServerError)
+
+async def httpGet(url: str, **kwargs) -> HttpResponse:
+	return await httpRequest('GET', url, **kwargs)
+
+async def httpPost(url: str, **kwargs) -> HttpResponse:
+	return await httpRequest('POST', url, **kwargs)
+
+async def _stream(url: str, headers: dict, on_chunk, max_bytes: int, timeout: float) -> tuple[int, object]:
+	async with _session().get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+		if response.status != 200:
+			return response.status, None
+		read = 0
+		async for chunk in response.content.iter_chunked(STREAM_CHUNK):
+			result = on_chunk(chunk)
+			read += len(chunk)
+			# sortir avant la fin du corps ferme la connexion au lieu de télécharger le reste
+			if result != None or read >= max_bytes:
+				return response.status, result
+		return response.status, None
+
+async def httpStream(url: str, on_chunk, max_bytes: int, headers: dict = None, timeout: float = None) -> tuple[int, object]:
+	# GET lu morceau par morceau : on_chunk(morceau) renvoie autre chose que None pour arrêter la lecture
+	# renvoie (statut HTTP, dernière valeur de on_chunk)
+	return await guardCall(_host(url), lambda timeout: _stream(url, headers, on_chunk, max_bytes, timeout), timeout,
+						lambda result: result[0] >= 500)
+
+# côté Flask (threads de waitress) : une session requests partagée, ses pools par hôte sont thread-safe
+_sync_session = requests.Session()
+_sync_session.headers.update(DEFAULT_HEADERS)
+_sync_session.mount('http://', HTTPAdapter(pool_maxsize=POOL_SIZE_PER_HOST))
+_sync_session.mount('https://', HTTPAdapter(pool_maxsize=POOL_SIZE_PER_HOST))
+
+def _requestSync(method: str, url: str, headers: dict, params: dict, data, allow_redirects: bool, timeout: float) -> HttpResponse:
+	response = _sync_session.request(method, url, headers=headers, params=params, data=data, allow_redirects=allow_redirects, timeout=timeout)
+	return HttpResponse(response.url, response.status_code, response.headers, response.content, response.encoding)
+
+def httpRequestSync(method: str, url: str, headers: dict = None, params: dict = None, data = None, timeout: float = None, allow_redirects: bool = True) -> HttpResponse:
+	return _guardCallSync(_host(url), lambda timeout: _requestSync(method, url, headers, params, data, allow_redirects, timeout), timeout, _isServerError)
+
+def httpGetSync(url: str, **kwargs) -> HttpResponse:
+	return httpRequestSync('GET', url, **kwargs)
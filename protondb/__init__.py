@@ -1,201 +1,320 @@
+import asyncio
+import contextvars
 import logging
-import requests
-import re
-import json
-from datetime import datetime, timedelta
+import time
+import weakref
+
+from algoliasearch.search.client import SearchClient, SearchConfig
+from datetime import datetime
+from functools import partial
+from sqlalchemy.dialects.sqlite import insert
 
-from algoliasearch.search.client import SearchClientSync, SearchConfig
 from database import db
+from database.executor import runInSession
+from database.models import ProtonDbQueryStat
 from database.helpers import ConfigurationHelper
-from database.models import GameAlias, AntiCheatCache, Configuration
-from sqlalchemy import desc, func
+from database.writer import databaseWriter
+from httpclient import CircuitOpenError, DeadlineExceededError, closeHttpSession, createDetachedTask, guardCall, httpGet
+from protondb.aliases import getGameAliasMatcher
+from protondb.anticheat import getAntiCheatInfos
+from protondb.game_index import isKnownGameName, normalizeGameName, rememberGames, searchLocalGames
+from protondb.query_cache import queryCache
+from protondb.summary_cache import summaryCache
+
+# Nombre d'appels simultanés au service des résumés (toutes recherches confondues) et délai maximal de chaque appel (secondes)
+SUMMARY_CONCURRENCY = 8
+SUMMARY_TIMEOUT = 5
+ALGOLIA_TIMEOUT = 5
+# Adresse du service des résumés (les tests la remplacent par un serveur local)
+SUMMARY_URL = 'http://jazzy-starlight-aeea19.netlify.app/api/v1/reports/summaries'
+# Délai maximal d'une recherche de plusieurs titres à la fois (secondes)
+BATCH_TIMEOUT = 8
 
-def _call_algoliasearch(search_name:str): 
-	config = SearchConfig(ConfigurationHelper().getValue('proton_db_api_id'), 
-						ConfigurationHelper().getValue('proton_db_api_key'))
+# un client Algolia par boucle, gardé tant que les clés API ne changent pas, pour réutiliser ses connexions
+_algolia_clients = weakref.WeakKeyDictionary()
+
+async def _algolia_client() -> SearchClient:
+	credentials = (ConfigurationHelper().getValue('proton_db_api_id'), ConfigurationHelper().getValue('proton_db_api_key'))
+	loop = asyncio.get_running_loop()
+	cached = _algolia_clients.get(loop)
+	if cached != None and cached[0] == credentials:
+		return cached[1]
+	if cached != None:
+		await cached[1].close()
+	config = SearchConfig(*credentials)
 	config.set_default_hosts()
-	client = SearchClientSync(config=config)
-	return client.search_single_index(index_name="steamdb",
-											search_params={
-												"query":search_name,
-												"facetFilters":[["appType:Game"]],
-												"hitsPerPage":50},
-											request_options= {'headers':{'Referer':'https://www.protondb.com/'}})
-
-def _call_summary(id): 
-	response = requests.get(f'http://jazzy-starlight-aeea19.netlify.app/api/v1/reports/summaries/{id}.json')
-	if (response.status_code == 200) :
-		return response.json()
-	logging.error(f'Échec de la récupération des données ProtonDB pour le jeu {id}. Code de statut HTTP : {response.status_code}')
-	return None
+	client = SearchClient(config=config)
+	_algolia_clients[loop] = (credentials, client)
+	return client
 
-def _is_name_match(name:str, search_name:str) -> bool:
-	normalized_game_name = re.sub("[^a-z0-9]", "", name.lower())
-	normalized_search_name = re.sub("[^a-z0-9]", "", search_name.lower())
-	return normalized_game_name.find(normalized_search_name) >= 0
+async def _close_algolia_client():
+	cached = _algolia_clients.pop(asyncio.get_running_loop(), None)
+	if cached != None:
+		await cached[1].close()
 
-def _apply_game_aliases(search_name:str) -> str:
-	for alias in GameAlias.query.order_by(desc(func.length(GameAlias.alias))).all():
-		search_name = re.sub(re.escape(alias.alias), alias.name, search_name, flags=re.IGNORECASE)
-	return search_name
+async def _call_algoliasearch(search_name:str): 
+	async def search(timeout:float):
+		client = await _algolia_client()
+		return await client.search_single_index(index_name="steamdb",
+												search_params={
+													"query":search_name,
+													"facetFilters":[["appType:Game"]],
+													"hitsPerPage":50},
+												request_options= {'headers':{'Referer':'https://www.protondb.com/'}})
+	# le SDK a son propre transport : on lui applique quand même le disjoncteur et l'échéance de la commande
+	return await guardCall('algolia.net', search, ALGOLIA_TIMEOUT)
 
-def _should_update_anticheat_cache() -> bool:
-	try:
-		last_update_conf = Configuration.query.filter_by(key='anticheat_last_update').first()
-		if not last_update_conf:
-			return True
+# Renvoie None si ProtonDB ne connaît pas le jeu (404, mis en cache négatif), lève une exception pour les autres erreurs
+async def _call_summary(id): 
+	response = await httpGet(f'{SUMMARY_URL}/{id}.json', timeout=SUMMARY_TIMEOUT)
+	if (response.status == 200) :
+		return response.json()
+	if (response.status == 404) :
+		return None
+	raise Exception(f'Code de statut HTTP : {response.status}')
+
+async def _fetch_summary(semaphore: asyncio.Semaphore, id:str, summaries:dict, on_summary) -> bool:
+	# renvoie False si le résumé n'a pas été demandé (service en panne ou délai de la commande épuisé)
+	async with semaphore:
 		try:
-			last_update = datetime.fromisoformat(last_update_conf.value)
-			return datetime.now() - last_update > timedelta(days=7)
-		except:
-			return True
-	except Exception as e:
-		logging.error(f'Erreur lors de la vérification du cache anti-cheat: {e}')
-		return False
+			summaries[id] = await _call_summary(id)
+			if on_summary:
+				on_summary(id, summaries[id])
+		except (CircuitOpenError, DeadlineExceededError):
+			return False
+		except asyncio.TimeoutError:
+			logging.error(f'Délai dépassé pour le résumé ProtonDB du jeu {id}')
+		except Exception as e:
+			logging.error(f'Échec de la récupération des données ProtonDB pour le jeu {id} : {e}')
+		return True
+
+# une seule limite de requêtes simultanées par boucle, partagée par toutes les recherches en cours
+_summary_semaphores = weakref.WeakKeyDictionary()
+
+def _summary_semaphore() -> asyncio.Semaphore:
+	loop = asyncio.get_running_loop()
+	semaphore = _summary_semaphores.get(loop)
+	if semaphore == None:
+		semaphore = _summary_semaphores[loop] = asyncio.Semaphore(SUMMARY_CONCURRENCY)
+	return semaphore
+
+async def _fetch_summaries(ids:list[str], on_summary = None) -> dict:
+	summaries = {}
+	semaphore = _summary_semaphore()
+	requested = await asyncio.gather(*[_fetch_summary(semaphore, id, summaries, on_summary) for id in ids])
+	if not all(requested):
+		logging.warning(f'{requested.count(False)} résumé(s) ProtonDB non demandé(s) : service indisponible ou délai dépassé')
+	return summaries
+
+# Suivi d'une recherche en cours : passe à True dès qu'elle doit interroger Algolia ou le service des résumés
+_remote_call = contextvars.ContextVar('protondb_remote_call', default=None)
 
-def _fetch_anticheat_data():
+def _mark_remote_call():
+	trace = _remote_call.get()
+	if trace != None:
+		trace['remote'] = True
+
+def traceProtonDbSearch() -> dict:
+	# à appeler au début du traitement d'une commande ; trace['remote'] indique ensuite si le cache a suffi
+	trace = {'remote': False}
+	_remote_call.set(trace)
+	return trace
+
+def _record_query(key:str, warm:bool):
+	statement = insert(ProtonDbQueryStat).values(search_name=key, searches=1, warm_hits=1 if warm else 0, last_searched=datetime.now())
+	db.session.execute(statement.on_conflict_do_update(index_elements=[ProtonDbQueryStat.search_name], set_={
+		'searches': ProtonDbQueryStat.searches + 1,
+		'warm_hits': ProtonDbQueryStat.warm_hits + statement.excluded.warm_hits,
+		'last_searched': statement.excluded.last_searched
+	}))
+
+def _log_record_error(future):
+	if future.exception():
+		logging.error(f'Erreur lors de l\'enregistrement de la fréquence des recherches ProtonDB : {future.exception()}')
+
+def recordProtonDbQuery(search_name:str, trace:dict):
+	# compte la recherche et si elle a été servie sans appel distant, sans attendre l'écriture
+	databaseWriter.submit(_record_query, _query_key(search_name), not trace['remote']).add_done_callback(_log_record_error)
+
+def _log_remember_error(future):
+	if future.exception():
+		logging.error(f'Erreur lors de l\'enregistrement des noms de jeux : {future.exception()}')
+
+async def _search_local(search_name:str):
 	try:
-		url = 'https://raw.githubusercontent.com/AreWeAntiCheatYet/AreWeAntiCheatYet/master/games.json'
-		response = requests.get(url, timeout=10)
-		if response.status_code == 200:
-			return response.json()
-		else:
-			logging.error(f'Échec de la récupération des données anti-cheat. Code HTTP: {response.status_code}')
-			return None
+		return await runInSession(searchLocalGames, search_name)
 	except Exception as e:
-		logging.error(f'Erreur lors de la récupération des données anti-cheat: {e}')
+		logging.error(f'Erreur lors de la recherche dans l\'index local des jeux : {e}')
 		return None
 
-def _update_anticheat_cache_if_needed():
-	try:
-		if not _should_update_anticheat_cache():
-			return
-		
-		logging.info('Mise à jour du cache anti-cheat...')
-		anticheat_data = _fetch_anticheat_data()
-		if not anticheat_data:
-			return
-		
-		for game in anticheat_data:
-			try:
-				steam_id = str(game.get('storeIds', {}).get('steam', ''))
-				if not steam_id or steam_id == '0':
-					continue
-				
-				cache_entry = AntiCheatCache.query.filter_by(steam_id=steam_id).first()
-				
-				status = game.get('status', 'Unknown')
-				anticheats_list = game.get('anticheats', [])
-				anticheats_str = json.dumps(anticheats_list) if anticheats_list else None
-				reference = game.get('reference', '')
-				notes_data = game.get('notes', '')
-				if isinstance(notes_data, list):
-					notes = json.dumps(notes_data)
-				else:
-					notes = str(notes_data) if notes_data else ''
-				game_name = game.get('name', '')
-				
-				if cache_entry:
-					cache_entry.game_name = game_name
-					cache_entry.status = status
-					cache_entry.anticheats = anticheats_str
-					cache_entry.reference = reference
-					cache_entry.notes = notes
-					cache_entry.updated_at = datetime.now()
-				else:
-					cache_entry = AntiCheatCache(
-						steam_id=steam_id,
-						game_name=game_name,
-						status=status,
-						anticheats=anticheats_str,
-						reference=reference,
-						notes=notes,
-						updated_at=datetime.now()
-					)
-					db.session.add(cache_entry)
-			except Exception as e:
-				logging.error(f'Erreur lors de la mise à jour du jeu {game.get("name")}: {e}')
-				continue
-		
-		last_update_conf = Configuration.query.filter_by(key='anticheat_last_update').first()
-		if last_update_conf:
-			last_update_conf.value = datetime.now().isoformat()
+async def _search_algolia(search_name:str) -> list:
+	_mark_remote_call()
+	responses = await _call_algoliasearch(search_name)
+	normalized_search_name = normalizeGameName(search_name)
+	hits = [(hit.get('object_id'), hit.get('name')) for hit in responses.model_dump().get('hits')]
+	# tous les noms renvoyés enrichissent l'index local, sans attendre l'écriture
+	databaseWriter.submit(rememberGames, hits, search_name).add_done_callback(_log_remember_error)
+	matches = []
+	for id, name in hits:
+		if name and normalized_search_name in normalizeGameName(name):
+			matches.append((id, name))
 		else:
-			last_update_conf = Configuration(key='anticheat_last_update', value=datetime.now().isoformat())
-			db.session.add(last_update_conf)
-		
-		db.session.commit()
-		logging.info('Cache anti-cheat mis à jour avec succès')
-	except Exception as e:
-		try:
-			db.session.rollback()
-		except:
-			pass
-		logging.error(f'Erreur lors de la mise à jour du cache anti-cheat: {e}')
+			logging.info(f'{name}({id}) ne contient pas {search_name}')
+	return matches
+
+def _apply_game_aliases(search_name:str) -> str:
+	return getGameAliasMatcher().apply(search_name)
+
+def _is_known_title(search_name:str) -> bool:
+	return getGameAliasMatcher().isAlias(search_name) or isKnownGameName(search_name)
 
-def _get_anticheat_info(steam_id: str) -> dict:
+async def isKnownProtonDbTitle(search_name:str) -> bool:
+	# titre complet connu de l'index local ou des alias : « Papers, Please » n'est pas une recherche de deux jeux
 	try:
-		cache_entry = AntiCheatCache.query.filter_by(steam_id=steam_id).first()
-		if not cache_entry:
-			return None
-		
-		try:
-			anticheats = json.loads(cache_entry.anticheats) if cache_entry.anticheats else []
-		except:
-			anticheats = []
-		
-		return {
-			'status': cache_entry.status,
-			'anticheats': anticheats,
-			'reference': cache_entry.reference,
-			'notes': cache_entry.notes
-		}
+		return await runInSession(_is_known_title, search_name)
 	except Exception as e:
-		logging.error(f'Erreur lors de la récupération des infos anti-cheat pour {steam_id}: {e}')
-		return None
+		logging.error(f'Erreur lors de la vérification du titre "{search_name}" dans l\'index local : {e}')
+		return False
 
-def searhProtonDb(search_name:str): 
+def _query_key(search_name:str) -> str:
+	return ' '.join(search_name.lower().split())
+
+def _elapsed_ms(start: float) -> int:
+	return int((time.perf_counter() - start) * 1000)
+
+async def findProtonDbGames(search_name:str, refresh_ahead:float = 0) -> list[tuple]: 
+	# jeux (id Steam, nom) correspondant à la recherche, sans leurs résumés ProtonDB ;
+	# refresh_ahead (secondes) relance la recherche si elle expire bientôt
+	search_name = await runInSession(_apply_game_aliases, search_name)
+	try:
+		return await queryCache.get(_query_key(search_name), lambda: _find_games(search_name), refresh_ahead)
+	except (CircuitOpenError, DeadlineExceededError) as e:
+		# Algolia ne répond pas : réponse partielle tirée de l'index local, qui n'est pas mise en cache
+		logging.warning(f'Recherche ProtonDB "{search_name}" servie par l\'index local seul : {e}')
+		return await runInSession(searchLocalGames, search_name, True) or []
+
+async def _find_games(search_name:str) -> list[tuple]: 
+	start = time.perf_counter()
+	source = 'index local'
+	matches = await _search_local(search_name)
+	if matches == None:
+		source = 'algolia'
+		matches = await _search_algolia(search_name)
+	logging.info(f'Recherche ProtonDB "{search_name}" : {len(matches)} jeu(x) en {_elapsed_ms(start)} ms ({source})')
+	return matches
+
+def _build_result(id, name:str, summary:dict, anticheat_info:dict) -> dict:
+	result = {
+		'id':id, 
+		'name' : name,
+		'tier' : summary.get('tier')
+	}
+	
+	if anticheat_info:
+		result['anticheat_status'] = anticheat_info.get('status')
+		result['anticheats'] = anticheat_info.get('anticheats', [])
+		result['anticheat_reference'] = anticheat_info.get('reference')
+		result['anticheat_notes'] = anticheat_info.get('notes')
+	return result
+
+def _build_results(matches:list, summaries:dict, anticheat_infos:dict) -> list:
 	results = []
-	search_name = _apply_game_aliases(search_name)
+	for id, name in matches:
+		summary = summaries.get(str(id))
+		if (summary != None) :
+			results.append(_build_result(id, name, summary, anticheat_infos.get(str(id))))
+	return results
+
+async def streamProtonDbResults(matches:list[tuple]):
+	# Générateur asynchrone de (résultats, terminé) : la liste partielle à chaque résumé reçu, puis la liste complète.
+	# Seuls les résumés des jeux demandés sont récupérés, ce qui permet de charger les résultats page par page.
+	start = time.perf_counter()
+	ids = [str(id) for id, name in matches]
+	anticheat_infos = await getAntiCheatInfos(ids)
 	
-	try:
-		_update_anticheat_cache_if_needed()
-	except Exception as e:
-		logging.error(f'Erreur lors de la mise à jour du cache anti-cheat: {e}')
+	received = {}
+	changed = asyncio.Event()
+	def on_summary(id:str, summary:dict):
+		if summary != None:
+			received[id] = summary
+			changed.set()
+	async def fetch(ids:list[str]) -> dict:
+		# les rafraîchissements en arrière-plan, lancés une fois la lecture du cache terminée, ne comptent pas
+		if not task.done():
+			_mark_remote_call()
+		return await _fetch_summaries(ids, on_summary)
+	# si l'appelant abandonne la lecture, la tâche continue et les résumés arrivent quand même dans le cache
+	task = asyncio.ensure_future(summaryCache.getMany(ids, fetch, on_summary))
+	while not task.done():
+		waiter = asyncio.ensure_future(changed.wait())
+		try:
+			await asyncio.wait([task, waiter], return_when=asyncio.FIRST_COMPLETED)
+		finally:
+			waiter.cancel()
+		if changed.is_set() and not task.done():
+			changed.clear()
+			yield _build_results(matches, received, anticheat_infos), False
 	
-	responses = _call_algoliasearch(search_name)
-	for hit in responses.model_dump().get('hits'): 
-		id = hit.get('object_id')
-		name:str = hit.get('name')
-		if (_is_name_match(name, search_name)) :
-			try:
-				summmary = _call_summary(id)
-				if (summmary != None) :
-					tier = summmary.get('tier')
-					
-					anticheat_info = None
-					try:
-						anticheat_info = _get_anticheat_info(str(id))
-					except Exception as e:
-						logging.error(f'Erreur lors de la récupération anti-cheat pour {name}: {e}')
-					
-					result = {
-						'id':id, 
-						'name' : name,
-						'tier' : tier
-					}
-					
-					if anticheat_info:
-						result['anticheat_status'] = anticheat_info.get('status')
-						result['anticheats'] = anticheat_info.get('anticheats', [])
-						result['anticheat_reference'] = anticheat_info.get('reference')
-						result['anticheat_notes'] = anticheat_info.get('notes')
-					
-					results.append(result)
-					logging.info(f'Trouvé {name}({id}) : {tier}' + (f' [Anti-cheat: {anticheat_info.get("status")}]' if anticheat_info else ''))
-			except Exception as e:
-				logging.error(f'Erreur lors du traitement du jeu {name} (ID: {id}) : {e}')
-		else:
-			logging.info(f'{name}({id}) ne contient pas {search_name}')
+	results = _build_results(matches, task.result(), anticheat_infos)
+	for result in results:
+		logging.info(f'Trouvé {result["name"]}({result["id"]}) : {result["tier"]}' + (f' [Anti-cheat: {result["anticheat_status"]}]' if result.get('anticheat_status') else ''))
+	logging.info(f'Résumés ProtonDB : {len(results)} résultat(s) sur {len(matches)} jeu(x) en {_elapsed_ms(start)} ms')
+	yield results, True
+
+async def getProtonDbResults(matches:list[tuple]) -> list:
+	results = []
+	async for results, done in streamProtonDbResults(matches):
+		pass
 	return results
 
+async def searchProtonDbAsync(search_name:str): 
+	return await getProtonDbResults(await findProtonDbGames(search_name))
+
+def _best_match(matches:list[tuple]) -> tuple:
+	# le nom le plus court contenant la recherche est le plus proche du titre demandé
+	return min(matches, key=lambda match: len(normalizeGameName(match[1])))
+
+async def _lookup_title(lookup:dict):
+	matches = await findProtonDbGames(lookup['title'])
+	if not matches:
+		lookup['status'] = 'not_found'
+		return
+	lookup['game'] = _best_match(matches)
+	results = await getProtonDbResults([lookup['game']])
+	lookup['result'] = results[0] if results else None
+	lookup['status'] = 'found' if results else 'no_reports'
+
+# recherches de titres qui continuent après la réponse, gardées jusqu'à leur fin
+_title_tasks = set()
+
+def _log_title_error(title:str, task:asyncio.Task):
+	_title_tasks.discard(task)
+	if not task.cancelled() and task.exception():
+		logging.error(f'Échec de la recherche ProtonDB pour {title} : {task.exception()}')
+
+async def lookupProtonDbTitles(titles:list[str], timeout:float = BATCH_TIMEOUT) -> list[dict]:
+	# Un jeu par titre, recherchés en parallèle. Les résumés partagent la limite de requêtes simultanées
+	# et un résumé demandé par plusieurs titres n'est récupéré qu'une fois. Un titre encore en cours au bout
+	# du délai reste en 'timeout' mais sa recherche continue en arrière-plan, sans l'échéance de la commande,
+	# pour remplir les caches.
+	lookups = [{'title': title, 'status': 'timeout', 'game': None, 'result': None} for title in titles]
+	tasks = [createDetachedTask(_lookup_title(lookup)) for lookup in lookups]
+	for lookup, task in zip(lookups, tasks):
+		_title_tasks.add(task)
+		task.add_done_callback(partial(_log_title_error, lookup['title']))
+	await asyncio.wait(tasks, timeout=timeout)
+	for lookup, task in zip(lookups, tasks):
+		if task.done() and not task.cancelled() and task.exception():
+			lookup['status'] = 'not_found'
+	return lookups
+
+async def _search_and_close(search_name:str):
+	# la boucle d'asyncio.run est jetée après l'appel : ses connexions aussi
+	try:
+		return await searchProtonDbAsync(search_name)
+	finally:
+		await _close_algolia_client()
+		await closeHttpSession()
+
+def searhProtonDb(search_name:str): 
+	return asyncio.run(_search_and_close(search_name))
@@ -0,0 +1,57 @@
+import re
+import threading
+
+from database.helpers import GameAliasHelper
+
+def _trie_pattern(node: dict) -> str:
+	# '' marque la fin d'un alias ; les suites plus longues sont tentées avant, ce qui donne la correspondance la plus longue
+	branches = [re.escape(char) + _trie_pattern(child) for char, child in sorted(node.items()) if char != '']
+	if not branches:
+		return ''
+	pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+	if '' in node:
+		return f'(?:{pattern})?'
+	return pattern
+
+class GameAliasMatcher:
+	# Tous les alias compilés en une seule expression (arbre de préfixes) : une passe sur la recherche,
+	# quel que soit le nombre d'alias. Insensible à la casse, l'alias le plus long l'emporte.
+	def __init__(self, aliases: list[tuple[str, str]]):
+		self._names = {}
+		trie = {}
+		for alias, name in aliases:
+			key = alias.lower()
+			if not key or key in self._names:
+				continue
+			self._names[key] = name
+			node = trie
+			for char in key:
+				node = node.setdefault(char, {})
+			node[''] = True
+		self._pattern = re.compile(_trie_pattern(trie), re.IGNORECASE) if self._names else None
+
+	def _replace(self, match: re.Match) -> str:
+		return self._names.get(match.group(0).lower(), match.group(0))
+
+	def isAlias(self, search_name: str) -> bool:
+		return search_name.strip().lower() in self._names
+
+	def apply(self, search_name: str) -> str:
+		if self._pattern == None:
+			return search_name
+		return self._pattern.sub(self._replace, search_name)
+
+_lock = threading.Lock()
+_source = None
+_matcher = GameAliasMatcher([])
+
+def getGameAliasMatcher() -> GameAliasMatcher:
+	# recompilé uniquement quand l'instantané des alias change (ajout ou suppression depuis le panel)
+	global _source, _matcher
+	aliases = GameAliasHelper().getAliases()
+	if aliases is not _source:
+		with _lock:
+			if aliases is not _source:
+				_matcher = GameAliasMatcher(aliases)
+				_source = aliases
+	return _matcher
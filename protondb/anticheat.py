@@ -0,0 +1,138 @@
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy.dialects.sqlite import insert
+
+from database import db
+from database.executor import commitInSession, runInSession
+from database.helpers import AntiCheatHelper, ConfigurationHelper, markChanged
+from database.models import AntiCheatCache
+from httpclient import httpGet
+from protondb.game_index import rememberGames
+
+ANTICHEAT_URL = 'https://raw.githubusercontent.com/AreWeAntiCheatYet/AreWeAntiCheatYet/master/games.json'
+# Le jeu de données AreWeAntiCheatYet est rafraîchi en tâche de fond, jamais pendant une recherche
+ANTICHEAT_REFRESH_DAYS = 7
+DELETE_BATCH_SIZE = 500
+
+def _should_update_anticheat_cache() -> bool:
+	last_update = ConfigurationHelper().getValue('anticheat_last_update')
+	if not last_update:
+		return True
+	try:
+		return datetime.now() - datetime.fromisoformat(last_update) > timedelta(days=ANTICHEAT_REFRESH_DAYS)
+	except:
+		return True
+
+async def _fetch_anticheat_data(etag: str):
+	# renvoie (données, etag) ; données à None si le fichier n'a pas changé depuis la dernière fois (304)
+	headers = {'If-None-Match': etag} if etag else {}
+	response = await httpGet(ANTICHEAT_URL, headers=headers)
+	if response.status == 304:
+		return None, etag
+	if response.status != 200:
+		raise Exception(f'Échec de la récupération des données anti-cheat. Code HTTP: {response.status}')
+	# le fichier fait plusieurs Mo : on le décode hors de la boucle
+	return await asyncio.to_thread(response.json), response.headers.get('ETag')
+
+# colonnes comparées pour savoir si un jeu a changé (updated_at n'en fait pas partie)
+_COMPARED_COLUMNS = ['game_name', 'status', 'anticheats', 'reference', 'notes']
+
+def _build_anticheat_rows(anticheat_data: list) -> dict:
+	rows = {}
+	for game in anticheat_data:
+		try:
+			steam_id = str(game.get('storeIds', {}).get('steam', ''))
+			if not steam_id or steam_id == '0':
+				continue
+			anticheats_list = game.get('anticheats', [])
+			notes_data = game.get('notes', '')
+			if isinstance(notes_data, list):
+				notes = json.dumps(notes_data)
+			else:
+				notes = str(notes_data) if notes_data else ''
+			rows[steam_id] = {
+				'steam_id': steam_id,
+				'game_name': game.get('name', ''),
+				'status': game.get('status', 'Unknown'),
+				'anticheats': json.dumps(anticheats_list) if anticheats_list else None,
+				'reference': game.get('reference', ''),
+				'notes': notes
+			}
+		except Exception as e:
+			logging.error(f'Erreur lors de la lecture du jeu {game.get("name")}: {e}')
+	return rows
+
+def _load_anticheat_rows() -> dict:
+	columns = [getattr(AntiCheatCache, column) for column in _COMPARED_COLUMNS]
+	return {row[0]: tuple(row[1:]) for row in db.session.query(AntiCheatCache.steam_id, *columns).all()}
+
+def _diff_anticheat_rows(rows: dict, existing: dict) -> tuple[list[dict], list[str], dict]:
+	changed = []
+	counts = {'inserted': 0, 'updated': 0, 'deleted': 0, 'unchanged': 0}
+	now = datetime.now()
+	for steam_id, row in rows.items():
+		current = existing.get(steam_id)
+		if current == tuple(row[column] for column in _COMPARED_COLUMNS):
+			counts['unchanged'] += 1
+			continue
+		counts['inserted' if current == None else 'updated'] += 1
+		changed.append({**row, 'updated_at': now})
+	deleted = [steam_id for steam_id in existing if steam_id not in rows]
+	counts['deleted'] = len(deleted)
+	return changed, deleted, counts
+
+def _apply_anticheat_diff(changed: list[dict], deleted: list[str], values: dict):
+	# une seule transaction : les recherches voient l'ancien ou le nouveau jeu de données
+	if changed:
+		statement = insert(AntiCheatCache)
+		db.session.execute(statement.on_conflict_do_update(index_elements=[AntiCheatCache.steam_id], set_={
+			column: statement.excluded[column] for column in _COMPARED_COLUMNS + ['updated_at']
+		}), changed)
+	for index in range(0, len(deleted), DELETE_BATCH_SIZE):
+		batch = deleted[index:index + DELETE_BATCH_SIZE]
+		AntiCheatCache.query.filter(AntiCheatCache.steam_id.in_(batch)).delete(synchronize_session=False)
+	if changed or deleted:
+		markChanged(db.session, AntiCheatCache)
+	rememberGames([(row['steam_id'], row['game_name']) for row in changed])
+	ConfigurationHelper().createOrUpdateAll(values)
+
+async def refreshAntiCheatIfNeeded():
+	if not _should_update_anticheat_cache():
+		return
+	logging.info('Mise à jour du cache anti-cheat...')
+	start = time.perf_counter()
+	try:
+		anticheat_data, etag = await _fetch_anticheat_data(ConfigurationHelper().getValue('anticheat_etag'))
+		changed, deleted = [], []
+		if anticheat_data == None:
+			rows = None
+			counts = {'inserted': 0, 'updated': 0, 'deleted': 0, 'unchanged': ConfigurationHelper().getIntValue('anticheat_last_rows')}
+		else:
+			rows = await asyncio.to_thread(_build_anticheat_rows, anticheat_data)
+			existing = await runInSession(_load_anticheat_rows)
+			changed, deleted, counts = _diff_anticheat_rows(rows, existing)
+		duration_ms = int((time.perf_counter() - start) * 1000)
+		values = {
+			'anticheat_last_update': datetime.now().isoformat(),
+			'anticheat_last_duration': duration_ms,
+			'anticheat_last_rows': counts['inserted'] + counts['updated'] + counts['unchanged'],
+			'anticheat_last_changes': json.dumps(counts)
+		}
+		if etag:
+			values['anticheat_etag'] = etag
+		await commitInSession(_apply_anticheat_diff, changed, deleted, values)
+		await getAntiCheatInfos([])
+		if rows == None:
+			logging.info(f'Cache anti-cheat inchangé (304) en {duration_ms} ms')
+		else:
+			logging.info(f'Cache anti-cheat mis à jour avec succès en {duration_ms} ms : {counts["inserted"]} ajouté(s), {counts["updated"]} modifié(s), {counts["deleted"]} supprimé(s), {counts["unchanged"]} inchangé(s)')
+	except Exception as e:
+		logging.error(f'Erreur lors de la mise à jour du cache anti-cheat: {e}')
+
+async def getAntiCheatInfos(steam_ids: list[str]) -> dict:
+	# le premier appel après une mise à jour recharge la table en mémoire, d'où le passage par l'exécuteur
+	return await runInSession(AntiCheatHelper().getInfos, steam_ids)
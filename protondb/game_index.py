@@ -0,0 +1,76 @@
+import re
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.dialects.sqlite import insert
+
+from database import db
+from database.models import AntiCheatCache, GameName, GameNameQuery
+
+# Nombre maximal de jeux renvoyés, comme pour Algolia (hitsPerPage)
+MAX_RESULTS = 50
+# Une recherche déjà envoyée à Algolia est servie localement pendant ce délai (jours)
+QUERY_TTL_DAYS = 7
+# En dessous de 3 caractères l'index en trigrammes ne peut rien trouver
+MIN_QUERY_LENGTH = 3
+
+def normalizeGameName(name: str) -> str:
+	return re.sub("[^a-z0-9]", "", name.lower())
+
+def _game_rows(games: list[tuple[str, str]]) -> list[dict]:
+	rows = {}
+	for steam_id, name in games:
+		if steam_id and name:
+			rows[str(steam_id)] = {'steam_id': str(steam_id), 'name': name, 'normalized': normalizeGameName(name)}
+	return list(rows.values())
+
+def _upsert_games(games: list[tuple[str, str]]):
+	rows = _game_rows(games)
+	if not rows:
+		return
+	statement = insert(GameName)
+	db.session.execute(statement.on_conflict_do_update(index_elements=[GameName.steam_id], set_={
+		'name': statement.excluded.name,
+		'normalized': statement.excluded.normalized
+	}, where=GameName.name != statement.excluded.name), rows)
+
+def rememberGames(games: list[tuple[str, str]], search_name: str = None):
+	# à appeler dans une transaction : les triggers maintiennent game_name_index à jour
+	_upsert_games(games)
+	if search_name != None:
+		statement = insert(GameNameQuery).values(search_name=normalizeGameName(search_name), searched_at=datetime.now())
+		db.session.execute(statement.on_conflict_do_update(index_elements=[GameNameQuery.search_name], set_={'searched_at': statement.excluded.searched_at}))
+
+def rebuildGameIndex() -> int:
+	# réimporte les noms connus d'AreWeAntiCheatYet puis reconstruit l'index complet depuis game_name
+	_upsert_games([(entry.steam_id, entry.game_name) for entry in AntiCheatCache.query.all()])
+	db.session.execute(text("INSERT INTO game_name_index(game_name_index) VALUES ('rebuild')"))
+	return GameName.query.count()
+
+def _is_known_query(normalized: str) -> bool:
+	known = GameNameQuery.query.filter_by(search_name=normalized).first()
+	return known != None and datetime.now() - known.searched_at < timedelta(days=QUERY_TTL_DAYS)
+
+def searchLocalGames(search_name: str, partial: bool = False) -> list[tuple[str, str]]:
+	# Renvoie None quand l'index local n'est pas assez sûr de lui : il faut alors interroger Algolia.
+	# Confiance si la recherche a déjà été faite sur Algolia, ou si un jeu porte exactement ce nom.
+	# partial : Algolia est indisponible, on renvoie ce que l'index connaît sans condition de confiance.
+	normalized = normalizeGameName(search_name)
+	if len(normalized) < MIN_QUERY_LENGTH:
+		return None
+	rows = db.session.execute(text(
+		'SELECT game_name.steam_id, game_name.name, game_name.normalized FROM game_name_index '
+		'JOIN game_name ON game_name.rowid = game_name_index.rowid '
+		'WHERE game_name_index MATCH :match '
+		'ORDER BY length(game_name.normalized), game_name.name LIMIT :limit'
+	), {'match': f'"{normalized}"', 'limit': MAX_RESULTS}).all()
+	if not partial and not any(row.normalized == normalized for row in rows) and not _is_known_query(normalized):
+		return None
+	return [(row.steam_id, row.name) for row in rows]
+
+def isKnownGameName(name: str) -> bool:
+	normalized = normalizeGameName(name)
+	return normalized != '' and GameName.query.filter_by(normalized=normalized).first() != None
+
+def getGameNames(steam_ids: list[str]) -> dict:
+	return {game.steam_id: game.name for game in GameName.query.filter(GameName.steam_id.in_(steam_ids)).all()}
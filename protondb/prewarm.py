@@ -0,0 +1,69 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+
+from database.executor import runInSession
+from database.helpers import ConfigurationHelper
+from database.models import ProtonDbQueryStat
+from protondb import _elapsed_ms, _fetch_summaries, findProtonDbGames
+from protondb.anticheat import getAntiCheatInfos
+from protondb.query_cache import QUERY_TTL
+from protondb.summary_cache import summaryCache
+
+# Intervalle entre deux préchauffages (secondes) : les entrées qui expirent avant le suivant sont rafraîchies
+PREWARM_INTERVAL = 10 * 60
+PREWARM_HORIZON = 2 * PREWARM_INTERVAL
+# Les recherches vivent moins longtemps que les résumés (QUERY_TTL) : avec PREWARM_HORIZON, chacune serait
+# relancée sur Algolia à chaque passage. Au plus la moitié de leur durée de vie : seules celles qui vont expirer le sont
+QUERY_PREWARM_HORIZON = min(PREWARM_INTERVAL + 60, QUERY_TTL / 2)
+DEFAULT_PREWARM_COUNT = 20
+# Seules les recherches récentes comptent parmi les plus demandées
+PREWARM_WINDOW_DAYS = 30
+# Nombre de jeux préchauffés par recherche : la première page affichée par !pdb
+PREWARM_GAMES = 10
+# Pause entre deux recherches, pour laisser passer les commandes des utilisateurs
+PREWARM_PAUSE = 1
+
+def _popular_queries(count: int) -> list[str]:
+	since = datetime.now() - timedelta(days=PREWARM_WINDOW_DAYS)
+	rows = ProtonDbQueryStat.query.filter(ProtonDbQueryStat.last_searched >= since) \
+		.order_by(ProtonDbQueryStat.searches.desc()).limit(count).all()
+	return [row.search_name for row in rows]
+
+def getHotQueries(count: int = 20) -> list[dict]:
+	rows = ProtonDbQueryStat.query.order_by(ProtonDbQueryStat.searches.desc()).limit(count).all()
+	return [{
+		'search_name': row.search_name,
+		'searches': row.searches,
+		'warm_hits': row.warm_hits,
+		'hit_ratio': round(100 * row.warm_hits / row.searches) if row.searches else 0,
+		'last_searched': row.last_searched
+	} for row in rows]
+
+async def prewarmPopularGames():
+	# rafraîchit d'avance les recherches les plus fréquentes, une à la fois, avant que leurs entrées n'expirent
+	# 0 désactive le préchauffage, une valeur absente vaut DEFAULT_PREWARM_COUNT
+	configuration = ConfigurationHelper()
+	count = configuration.getIntValue('proton_db_prewarm_count') if configuration.getValue('proton_db_prewarm_count') else DEFAULT_PREWARM_COUNT
+	if count <= 0:
+		return
+	start = time.perf_counter()
+	try:
+		queries = await runInSession(_popular_queries, count)
+	except Exception as e:
+		logging.error(f'Erreur lors de la lecture des recherches ProtonDB fréquentes : {e}')
+		return
+	refreshed = 0
+	for search_name in queries:
+		try:
+			matches = await findProtonDbGames(search_name, refresh_ahead=QUERY_PREWARM_HORIZON)
+			ids = [steam_id for steam_id, name in matches[:PREWARM_GAMES]]
+			if ids:
+				refreshed += await summaryCache.prewarm(ids, _fetch_summaries, PREWARM_HORIZON)
+				await getAntiCheatInfos(ids)
+		except Exception as e:
+			logging.error(f'Erreur lors du préchauffage ProtonDB pour {search_name} : {e}')
+		await asyncio.sleep(PREWARM_PAUSE)
+	if queries:
+		logging.info(f'Préchauffage ProtonDB : {len(queries)} recherches, {refreshed} résumés rafraîchis en {_elapsed_ms(start)} ms')
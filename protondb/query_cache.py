@@ -0,0 +1,101 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+
+from database.helpers import watchModel
+from database.models import GameAlias
+from httpclient import createDetachedTask, waitWithinDeadline
+
+# Durée de validité d'une recherche (secondes)
+QUERY_TTL = 15 * 60
+
+def _retrieveError(task: asyncio.Task):
+	# l'erreur est remontée aux recherches qui attendent encore : si toutes ont abandonné, personne d'autre ne la lit
+	if not task.cancelled():
+		task.exception()
+
+class QueryCache:
+	# Jeux correspondant à une recherche ProtonDB, par requête normalisée (alias appliqués).
+	# Les recherches identiques simultanées partagent un seul calcul en cours ; les résumés ont leur propre cache.
+	def __init__(self, max_entries: int = 256, ttl: int = QUERY_TTL):
+		self.max_entries = max_entries
+		self.ttl = ttl
+		self._entries = OrderedDict()
+		self._inflight = {}
+		self._generation = 0
+		self._lock = threading.Lock()
+		self.hits = 0
+		self.coalesced = 0
+		self.misses = 0
+
+	def invalidate(self):
+		# appelé depuis le thread web après une modification des alias
+		with self._lock:
+			self._generation += 1
+			self._entries.clear()
+
+	def stats(self) -> dict:
+		return {
+			'entries': len(self._entries),
+			'hits': self.hits,
+			'coalesced': self.coalesced,
+			'misses': self.misses,
+		}
+
+	def _lookup(self, key: str, refresh_ahead: float = 0):
+		with self._lock:
+			entry = self._entries.get(key)
+			if entry == None:
+				return None
+			matches, expires_at = entry
+			if expires_at < time.monotonic():
+				del self._entries[key]
+				return None
+			if expires_at - refresh_ahead < time.monotonic():
+				return None
+			self._entries.move_to_end(key)
+			return matches
+
+	def _store(self, key: str, matches: list, generation: int):
+		with self._lock:
+			# des alias ont changé pendant le calcul : le résultat n'est pas conservé
+			if generation != self._generation:
+				return
+			self._entries[key] = (matches, time.monotonic() + self.ttl)
+			self._entries.move_to_end(key)
+			while len(self._entries) > self.max_entries:
+				self._entries.popitem(last=False)
+
+	async def get(self, key: str, compute, refresh_ahead: float = 0) -> list:
+		# refresh_ahead : une entrée qui expire dans moins de refresh_ahead secondes est recalculée
+		matches = self._lookup(key, refresh_ahead)
+		if matches != None:
+			self.hits += 1
+			return matches
+
+		loop = asyncio.get_running_loop()
+		task = self._inflight.get(key)
+		if task != None and task.get_loop() is loop:
+			self.coalesced += 1
+			return await waitWithinDeadline(task)
+
+		# le calcul partagé n'a pas d'échéance : chaque recherche qui l'attend applique la sienne
+		self.misses += 1
+		task = createDetachedTask(self._compute(key, compute))
+		task.add_done_callback(_retrieveError)
+		self._inflight[key] = task
+		return await waitWithinDeadline(task)
+
+	async def _compute(self, key: str, compute) -> list:
+		generation = self._generation
+		try:
+			matches = await compute()
+			self._store(key, matches, generation)
+			return matches
+		finally:
+			if self._inflight.get(key) is asyncio.current_task():
+				del self._inflight[key]
+
+queryCache = QueryCache()
+watchModel(GameAlias, queryCache.invalidate)
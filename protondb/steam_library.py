@@ -0,0 +1,75 @@
+import logging
+import re
+import xml.etree.ElementTree as ElementTree
+
+from database.executor import runInSession
+from database.writer import databaseWriter
+from httpclient import httpGet
+from protondb.game_index import getGameNames, rememberGames
+
+# Adresse de Steam Community (les tests la remplacent par un serveur local)
+STEAM_COMMUNITY_URL = 'https://steamcommunity.com'
+STEAM_TIMEOUT = 15
+# Nombre maximal de jeux analysés par bibliothèque
+MAX_LIBRARY_GAMES = 2000
+
+class SteamLibraryError(Exception):
+	pass
+
+def _profile_path(profile: str) -> str:
+	# accepte une adresse de profil, un identifiant SteamID64 ou un nom personnalisé
+	match = re.search(r'steamcommunity\.com/(id|profiles)/([^/?#\s]+)', profile)
+	if match:
+		return f'{match.group(1)}/{match.group(2)}'
+	if re.fullmatch(r'\d{17}', profile):
+		return f'profiles/{profile}'
+	if re.fullmatch(r'[A-Za-z0-9_-]{2,32}', profile):
+		return f'id/{profile}'
+	raise SteamLibraryError(f'Profil Steam invalide : {profile}')
+
+def _parse_library(content: str) -> tuple[str, list[tuple[str, str]]]:
+	try:
+		root = ElementTree.fromstring(content)
+	except ElementTree.ParseError:
+		raise SteamLibraryError('Réponse de Steam illisible, le profil est peut-être privé')
+	error = root.findtext('error')
+	if error:
+		raise SteamLibraryError(f'Steam a refusé la demande : {error}')
+	name = root.findtext('steamID') or root.findtext('steamID64') or ''
+	games = []
+	for game in root.iter('game'):
+		app_id = game.findtext('appID')
+		if app_id:
+			games.append((app_id, game.findtext('name') or f'App {app_id}'))
+	return name, games
+
+async def _call_library(path: str) -> str:
+	url = f'{STEAM_COMMUNITY_URL}/{path}/games?tab=all&xml=1'
+	response = await httpGet(url, timeout=STEAM_TIMEOUT)
+	if response.status != 200:
+		raise SteamLibraryError(f'Steam a répondu avec le code HTTP {response.status}')
+	return response.text
+
+def parseAppIds(text: str) -> list[str]:
+	# "570 730, 1245620" -> ['570', '730', '1245620'] ; None si le texte n'est pas une liste d'identifiants
+	app_ids = [app_id for app_id in re.split(r'[\s,;]+', text.strip()) if app_id]
+	if not app_ids or not all(app_id.isdigit() for app_id in app_ids):
+		return None
+	return list(dict.fromkeys(app_ids))
+
+def _log_remember_error(future):
+	if future.exception():
+		logging.error(f'Erreur lors de l\'enregistrement des jeux de la bibliothèque Steam : {future.exception()}')
+
+async def fetchSteamLibrary(profile: str) -> tuple[str, list[tuple[str, str]]]:
+	# renvoie (nom du profil, [(id Steam, nom du jeu)]) triés par nom
+	name, games = _parse_library(await _call_library(_profile_path(profile.strip())))
+	games = sorted(games, key=lambda game: game[1].lower())[:MAX_LIBRARY_GAMES]
+	if games:
+		# les noms de la bibliothèque enrichissent l'index local des jeux
+		databaseWriter.submit(rememberGames, games).add_done_callback(_log_remember_error)
+	return name, games
+
+async def getAppGames(app_ids: list[str]) -> list[tuple[str, str]]:
+	names = await runInSession(getGameNames, app_ids[:MAX_LIBRARY_GAMES])
+	return [(app_id, names.get(app_id) or f'App {app_id}') for app_id in app_ids[:MAX_LIBRARY_GAMES]]
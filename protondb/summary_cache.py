@@ -0,0 +1,220 @@
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+from functools import partial
+
+from sqlalchemy.dialects.sqlite import insert
+
+from database import db
+from database.executor import runInSession
+from database.helpers import ConfigurationHelper
+from database.models import ProtonDbSummaryCache
+from database.writer import databaseWriter
+from httpclient import createDetachedTask
+
+# Durées de validité par défaut (heures) : résumé trouvé, et jeu inconnu de ProtonDB (404)
+DEFAULT_TTL_HOURS = 24
+DEFAULT_NEGATIVE_TTL_HOURS = 1
+
+# réponse d'un appel en échec, pour ceux qui attendaient le même résumé
+_FAILED = object()
+
+def _loadSummaries(steam_ids: list[str]) -> dict:
+	entries = {}
+	for row in ProtonDbSummaryCache.query.filter(ProtonDbSummaryCache.steam_id.in_(steam_ids)).all():
+		try:
+			summary = json.loads(row.summary) if row.summary else None
+		except Exception:
+			continue
+		entries[row.steam_id] = (summary, row.fetched_at.timestamp())
+	return entries
+
+def _saveSummaries(entries: dict):
+	rows = [{
+		'steam_id': steam_id,
+		'summary': json.dumps(summary) if summary != None else None,
+		'fetched_at': datetime.fromtimestamp(fetched_at)
+	} for steam_id, (summary, fetched_at) in entries.items()]
+	statement = insert(ProtonDbSummaryCache).values(rows)
+	db.session.execute(statement.on_conflict_do_update(index_elements=[ProtonDbSummaryCache.steam_id], set_={
+		'summary': statement.excluded.summary,
+		'fetched_at': statement.excluded.fetched_at
+	}))
+
+def _logSaveError(future):
+	if future.exception():
+		logging.error(f'Erreur lors de l\'enregistrement des résumés ProtonDB : {future.exception()}')
+
+def _notifySummary(on_summary, steam_id: str, future: asyncio.Future):
+	if future.result() is not _FAILED:
+		on_summary(steam_id, future.result())
+
+class SummaryCache:
+	# Cache des résumés ProtonDB par identifiant Steam : LRU en mémoire adossé à la table protondb_summary_cache.
+	# Une entrée expirée est servie immédiatement pendant qu'un rafraîchissement tourne en arrière-plan.
+	def __init__(self, max_entries: int = 4096):
+		self.max_entries = max_entries
+		self._entries = OrderedDict()
+		self._refreshing = set()
+		self._pending = {}
+		self._tasks = set()
+		self.hits = 0
+		self.stale_hits = 0
+		self.misses = 0
+		self.refreshes = 0
+
+	def _ttl(self, summary) -> int:
+		if summary == None:
+			return (ConfigurationHelper().getIntValue('proton_db_summary_negative_ttl') or DEFAULT_NEGATIVE_TTL_HOURS) * 3600
+		return (ConfigurationHelper().getIntValue('proton_db_summary_ttl') or DEFAULT_TTL_HOURS) * 3600
+
+	def _remember(self, steam_id: str, summary, fetched_at: float):
+		self._entries[steam_id] = (summary, fetched_at)
+		self._entries.move_to_end(steam_id)
+		while len(self._entries) > self.max_entries:
+			self._entries.popitem(last=False)
+
+	def _isFresh(self, entry: tuple) -> bool:
+		summary, fetched_at = entry
+		return time.time() - fetched_at < self._ttl(summary)
+
+	def stats(self) -> dict:
+		lookups = self.hits + self.stale_hits + self.misses
+		return {
+			'entries': len(self._entries),
+			'hits': self.hits,
+			'stale_hits': self.stale_hits,
+			'misses': self.misses,
+			'refreshes': self.refreshes,
+			'hit_ratio': round(100 * (self.hits + self.stale_hits) / lookups) if lookups else 0,
+		}
+
+	async def getMany(self, steam_ids: list[str], fetch, on_summary = None) -> dict:
+		# fetch(ids) -> {id: résumé, ou None si ProtonDB ne connaît pas le jeu} ; les ids absents sont en erreur
+		# on_summary(id, résumé) est appelé pour les résumés déjà en cache avant d'interroger ProtonDB
+		summaries = {}
+		unknown = []
+		stale = []
+		for steam_id in steam_ids:
+			entry = self._entries.get(steam_id)
+			if entry == None:
+				unknown.append(steam_id)
+				continue
+			self._entries.move_to_end(steam_id)
+			summaries[steam_id] = entry[0]
+			if self._isFresh(entry):
+				self.hits += 1
+			else:
+				self.stale_hits += 1
+				stale.append(steam_id)
+
+		if unknown:
+			try:
+				stored = await runInSession(_loadSummaries, unknown)
+			except Exception as e:
+				logging.error(f'Erreur lors de la lecture du cache des résumés ProtonDB : {e}')
+				stored = {}
+			missing = []
+			for steam_id in unknown:
+				entry = stored.get(steam_id)
+				if entry == None:
+					missing.append(steam_id)
+					continue
+				self._remember(steam_id, *entry)
+				summaries[steam_id] = entry[0]
+				if self._isFresh(entry):
+					self.hits += 1
+				else:
+					self.stale_hits += 1
+					stale.append(steam_id)
+			if missing:
+				if on_summary:
+					for steam_id, summary in summaries.items():
+						on_summary(steam_id, summary)
+				self.misses += len(missing)
+				summaries.update(await self._fetchMissing(missing, fetch, on_summary))
+
+		stale = [steam_id for steam_id in stale if steam_id not in self._refreshing]
+		if stale:
+			self._refreshing.update(stale)
+			task = createDetachedTask(self._refresh(stale, fetch))
+			self._tasks.add(task)
+			task.add_done_callback(self._tasks.discard)
+		return summaries
+
+	async def prewarm(self, steam_ids: list[str], fetch, horizon: float) -> int:
+		# rafraîchit d'avance les résumés absents ou qui expirent dans moins de horizon secondes ; renvoie le nombre demandé
+		unknown = [steam_id for steam_id in steam_ids if steam_id not in self._entries]
+		if unknown:
+			for steam_id, entry in (await runInSession(_loadSummaries, unknown)).items():
+				self._remember(steam_id, *entry)
+		now = time.time()
+		expiring = []
+		for steam_id in steam_ids:
+			if steam_id in self._refreshing or steam_id in self._pending:
+				continue
+			entry = self._entries.get(steam_id)
+			if entry == None or entry[1] + self._ttl(entry[0]) - horizon < now:
+				expiring.append(steam_id)
+		if expiring:
+			self._refreshing.update(expiring)
+			try:
+				await self._fetchAndStore(expiring, fetch)
+			finally:
+				self._refreshing.difference_update(expiring)
+		return len(expiring)
+
+	async def _fetchMissing(self, steam_ids: list[str], fetch, on_summary) -> dict:
+		# un résumé déjà demandé par une autre recherche en cours n'est pas redemandé : on attend sa réponse
+		loop = asyncio.get_running_loop()
+		pending = {}
+		for steam_id in steam_ids:
+			future = self._pending.get(steam_id)
+			if future != None and future.get_loop() is loop:
+				pending[steam_id] = future
+				if on_summary:
+					future.add_done_callback(partial(_notifySummary, on_summary, steam_id))
+		summaries = {}
+		own = [steam_id for steam_id in steam_ids if steam_id not in pending]
+		if own:
+			summaries.update(await self._fetchAndStore(own, fetch))
+		for steam_id, future in pending.items():
+			summary = await asyncio.shield(future)
+			if summary is not _FAILED:
+				summaries[steam_id] = summary
+		return summaries
+
+	async def _fetchAndStore(self, steam_ids: list[str], fetch) -> dict:
+		loop = asyncio.get_running_loop()
+		futures = {steam_id: loop.create_future() for steam_id in steam_ids}
+		self._pending.update(futures)
+		fetched = {}
+		try:
+			fetched = await fetch(steam_ids)
+		finally:
+			for steam_id, future in futures.items():
+				if self._pending.get(steam_id) is future:
+					del self._pending[steam_id]
+				future.set_result(fetched.get(steam_id, _FAILED))
+		now = time.time()
+		entries = {}
+		for steam_id, summary in fetched.items():
+			self._remember(steam_id, summary, now)
+			entries[steam_id] = (summary, now)
+		if entries:
+			databaseWriter.submit(_saveSummaries, entries).add_done_callback(_logSaveError)
+		return fetched
+
+	async def _refresh(self, steam_ids: list[str], fetch):
+		try:
+			self.refreshes += 1
+			await self._fetchAndStore(steam_ids, fetch)
+		except Exception as e:
+			logging.error(f'Erreur lors du rafraîchissement des résumés ProtonDB : {e}')
+		finally:
+			self._refreshing.difference_update(steam_ids)
+
+summaryCache = SummaryCache()
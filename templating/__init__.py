@@ -0,0 +1,93 @@
+import re
+
+# Messages personnalisables (notifications YouTube et Twitch, bienvenue et départ) : chaque texte enregistré
+# est découpé une fois en morceaux fixes et variables, puis rendu en une seule passe à chaque envoi.
+# Syntaxe : {variable} ou {variable:format} ; {{ et }} donnent des accolades.
+# Une accolade seule reste telle quelle, comme une variable inconnue d'un texte enregistré avant la vérification.
+# Sans échappement (escapes=False, messages de bienvenue et de départ, remplacés mot à mot avant), {{ et }} restent
+# tels quels et seules les accolades qui entourent une variable connue sont remplacées.
+
+_TOKEN = re.compile(r'\{\{|\}\}|\{([^{}]*)\}')
+_FIELD = re.compile(r'\{([^{}]*)\}')
+
+class MessageTemplate:
+	def __init__(self, text: str, escapes: bool = True):
+		self.text = text
+		self.escapes = escapes
+		# morceaux fixes, et pour chaque variable : (position dans les morceaux, nom, format, texte d'origine)
+		self._parts = []
+		self._fields = []
+		literal = []
+		position = 0
+		for match in (_TOKEN if escapes else _FIELD).finditer(text):
+			literal.append(text[position:match.start()])
+			token = match.group(0)
+			if token in ('{{', '}}'):
+				literal.append(token[0])
+			else:
+				self._parts.append(''.join(literal))
+				literal = []
+				name, _, spec = match.group(1).partition(':')
+				self._fields.append((len(self._parts), name.strip(), spec, token))
+				self._parts.append(token)
+			position = match.end()
+		literal.append(text[position:])
+		self._parts.append(''.join(literal))
+
+	@property
+	def fields(self) -> list[str]:
+		return [name for index, name, spec, raw in self._fields]
+
+	def unknownFields(self, variables) -> list[str]:
+		unknown = []
+		for name in self.fields:
+			if name not in variables and name not in unknown:
+				unknown.append(name)
+		return unknown
+
+	def render(self, values: dict) -> str:
+		if not self._fields:
+			return self._parts[0]
+		parts = self._parts.copy()
+		for index, name, spec, raw in self._fields:
+			value = values.get(name, raw)
+			if value is raw:
+				continue
+			if value == None:
+				parts[index] = ''
+			elif spec:
+				try:
+					parts[index] = format(value, spec)
+				except (TypeError, ValueError):
+					parts[index] = str(value)
+			else:
+				parts[index] = str(value)
+		return ''.join(parts)
+
+# textes compilés, par clé d'enregistrement (table, id, colonne) : le texte lui-même sert de version
+_compiled = {}
+
+def compileTemplate(key: tuple, text: str, escapes: bool = True) -> MessageTemplate:
+	cached = _compiled.get(key)
+	if cached == None or cached.text != text or cached.escapes != escapes:
+		cached = _compiled[key] = MessageTemplate(text, escapes)
+	return cached
+
+def renderTemplate(key: tuple, text: str, values: dict, escapes: bool = True) -> str:
+	if not text:
+		return text
+	return compileTemplate(key, text, escapes).render(values)
+
+def checkTemplate(text: str, variables, escapes: bool = True, legacy = ()) -> str:
+	# à l'enregistrement depuis le panel : renvoie le message d'erreur, ou None si le texte est valide
+	# legacy : variables acceptées pour les messages déjà enregistrés, mais plus proposées
+	if not text:
+		return None
+	unknown = MessageTemplate(text, escapes).unknownFields(tuple(variables) + tuple(legacy))
+	if not escapes:
+		# une accolade est alors du texte : seule une faute de frappe dans une variable ({member.nmae}) est signalée
+		prefixes = tuple(set(name.split('.', 1)[0] + '.' for name in variables if '.' in name))
+		unknown = [name for name in unknown if name.startswith(prefixes)]
+	if unknown:
+		return f"Variable(s) inconnue(s) : {', '.join('{' + name + '}' for name in unknown)}. Variables disponibles : {', '.join('{' + name + '}' for name in variables)}"
+	return None
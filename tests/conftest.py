@@ -0,0 +1,29 @@
+# Les tests tournent sur une base temporaire, créée au premier import de l'application
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.environ['DATABASE_PATH'] = os.path.join(tempfile.mkdtemp(prefix='mamiehenriette-'), 'database.db')
+# schema.sql est lu depuis la racine du dépôt
+os.chdir(ROOT)
+sys.path.insert(0, ROOT)
+
+from webapp import webapp
+from database import db
+from database.helpers import markChanged
+from database.models import Configuration, GameAlias
+
+
+@pytest.fixture
+def app():
+	with webapp.app_context():
+		yield webapp
+		db.session.rollback()
+		for table in reversed(db.metadata.sorted_tables):
+			db.session.execute(table.delete())
+		markChanged(db.session, Configuration)
+		markChanged(db.session, GameAlias)
+		db.session.commit()
@@ -0,0 +1,38 @@
+import asyncio
+from types import SimpleNamespace
+
+from database import db
+from database.helpers import ConfigurationHelper
+from database.models import Commande
+import discordbot
+
+class _Channel:
+	def __init__(self):
+		self.sent = []
+
+	async def send(self, content=None, **kwargs):
+		self.sent.append(content)
+
+def _dispatch(monkeypatch, content: str) -> tuple[list, list]:
+	calls = []
+	async def handler(message, bot):
+		calls.append(message.content)
+	monkeypatch.setitem(discordbot._late_commands, '!protondb', (handler, 'proton_db_enable_enable'))
+	monkeypatch.setitem(discordbot._late_commands, '!pdb', (handler, 'proton_db_enable_enable'))
+	monkeypatch.setattr(discordbot, '_prefix_commands', [('!protondb', handler, 'proton_db_enable_enable'), ('!pdb', handler, 'proton_db_enable_enable')])
+	message = SimpleNamespace(content=content, author=SimpleNamespace(mention='@joueur'), channel=_Channel())
+	asyncio.run(discordbot.on_message(message))
+	return calls, message.channel.sent
+
+def test_protondb_prefix_and_custom_command_precedence(app, monkeypatch):
+	ConfigurationHelper().createOrUpdate('proton_db_enable_enable', 'on')
+	db.session.commit()
+
+	assert _dispatch(monkeypatch, '!pdbElden Ring') == (['!pdbElden Ring'], [])
+	assert _dispatch(monkeypatch, '!protondb Hades') == (['!protondb Hades'], [])
+
+	# une commande personnalisée !pdb passe avant la commande intégrée, comme avant la table de dispatch
+	db.session.add(Commande(trigger='!pdb', response='Voir le salon #linux', discord_enable=True))
+	db.session.commit()
+	assert _dispatch(monkeypatch, '!pdb Elden Ring') == ([], ['Voir le salon #linux'])
+	assert _dispatch(monkeypatch, '!pdbElden Ring') == (['!pdbElden Ring'], [])
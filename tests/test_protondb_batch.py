@@ -0,0 +1,31 @@
+import asyncio
+import logging
+
+import protondb
+from httpclient import callTimeout, setDeadline
+
+def test_slow_titles_finish_in_the_background(monkeypatch, caplog):
+	finished = []
+	async def lookup_title(lookup):
+		await asyncio.sleep(0.2)
+		if lookup['title'] == 'cassé':
+			raise Exception('réponse illisible')
+		# la commande a dépassé son échéance, mais la recherche en arrière-plan n'en dépend pas
+		callTimeout(5)
+		lookup['status'] = 'found'
+		finished.append(lookup['title'])
+	monkeypatch.setattr(protondb, '_lookup_title', lookup_title)
+
+	async def scenario():
+		setDeadline(0.1)
+		lookups = await protondb.lookupProtonDbTitles(['Hades', 'cassé'], timeout=0.05)
+		assert [lookup['status'] for lookup in lookups] == ['timeout', 'timeout']
+		await asyncio.sleep(0.3)
+		assert finished == ['Hades']
+		assert not protondb._title_tasks
+
+	with caplog.at_level(logging.ERROR):
+		asyncio.run(scenario())
+	messages = [record.getMessage() for record in caplog.records]
+	assert 'Échec de la recherche ProtonDB pour cassé : réponse illisible' in messages
+	assert not any('never retrieved' in message for message in messages)
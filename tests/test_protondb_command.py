@@ -0,0 +1,41 @@
+import asyncio
+from types import SimpleNamespace
+
+from database import db
+from database.models import GameAlias
+import discordbot.protondb as protondb_command
+from protondb.game_index import rememberGames
+
+class _Channel:
+	def __init__(self):
+		self.sent = []
+
+	async def send(self, content=None, **kwargs):
+		self.sent.append(content)
+		return None
+
+def _search(monkeypatch, content: str) -> tuple[list, list]:
+	searches = []
+	batches = []
+	async def findProtonDbGames(search_name):
+		searches.append(search_name)
+		return []
+	async def handle_batch(message, reply, titles):
+		batches.append(titles)
+	monkeypatch.setattr(protondb_command, 'findProtonDbGames', findProtonDbGames)
+	monkeypatch.setattr(protondb_command, '_handle_batch', handle_batch)
+	message = SimpleNamespace(content=content, author=SimpleNamespace(mention='@joueur'), channel=_Channel())
+	asyncio.run(protondb_command.handle_protondb_command(message, None))
+	return searches, batches
+
+def test_comma_in_known_title_is_not_a_batch(app, monkeypatch):
+	rememberGames([('501300', 'Papers, Please'), ('2183900', 'Warhammer 40,000: Space Marine 2')])
+	db.session.add(GameAlias(alias='sm2, le jeu', name='Warhammer 40,000: Space Marine 2'))
+	db.session.commit()
+	db.session.remove()
+
+	assert _search(monkeypatch, '!pdb papers,please') == (['papers,please'], [])
+	assert _search(monkeypatch, '!pdb Warhammer 40,000: Space Marine 2') == (['Warhammer 40,000: Space Marine 2'], [])
+	assert _search(monkeypatch, '!pdb SM2, le jeu') == (['SM2, le jeu'], [])
+	# titres inconnus séparés par des virgules : recherche multiple
+	assert _search(monkeypatch, '!pdb Elden Ring, Hades') == ([], [['Elden Ring', 'Hades']])
@@ -0,0 +1,48 @@
+import asyncio
+from datetime import datetime
+
+from database import db
+from database.models import ProtonDbQueryStat
+import protondb.prewarm as prewarm
+import protondb.query_cache as query_cache
+from protondb.prewarm import PREWARM_HORIZON, PREWARM_INTERVAL
+from protondb.query_cache import QUERY_TTL, QueryCache
+
+def test_prewarm_only_refreshes_queries_about_to_expire(app, monkeypatch):
+	db.session.add(ProtonDbQueryStat(search_name='elden ring', searches=12, warm_hits=3, last_searched=datetime.now()))
+	db.session.commit()
+	db.session.remove()
+
+	now = [1000.0]
+	monkeypatch.setattr(query_cache.time, 'monotonic', lambda: now[0])
+	monkeypatch.setattr(prewarm, 'PREWARM_PAUSE', 0)
+	cache = QueryCache()
+	searches = []
+	horizons = []
+	async def compute():
+		searches.append(now[0])
+		return [('1245620', 'ELDEN RING')]
+	# findProtonDbGames sans Algolia : seul le cache des recherches est réel
+	async def findProtonDbGames(search_name, refresh_ahead=0):
+		return await cache.get(search_name, compute, refresh_ahead)
+	async def prewarm_summaries(ids, fetch, horizon):
+		horizons.append(horizon)
+		return len(ids)
+	async def getAntiCheatInfos(ids):
+		return {}
+	monkeypatch.setattr(prewarm, 'findProtonDbGames', findProtonDbGames)
+	monkeypatch.setattr(prewarm.summaryCache, 'prewarm', prewarm_summaries)
+	monkeypatch.setattr(prewarm, 'getAntiCheatInfos', getAntiCheatInfos)
+
+	asyncio.run(prewarm.prewarmPopularGames())
+	# la recherche a encore plus de la moitié de sa durée de vie : elle n'est pas relancée
+	now[0] += PREWARM_INTERVAL / 2
+	asyncio.run(prewarm.prewarmPopularGames())
+	assert len(searches) == 1
+	# au passage suivant, elle expirerait avant le prochain : elle est relancée, et n'a jamais expiré entre deux passages
+	now[0] += PREWARM_INTERVAL / 2
+	asyncio.run(prewarm.prewarmPopularGames())
+	assert len(searches) == 2
+	assert searches[1] - searches[0] < QUERY_TTL
+	# les résumés gardent leur propre horizon, plus long
+	assert horizons == [PREWARM_HORIZON] * 3
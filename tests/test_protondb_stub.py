@@ -0,0 +1,76 @@
+import asyncio
+
+from aiohttp import web
+
+from database import db
+from httpclient import closeHttpSession
+import protondb
+import protondb.steam_library as steam_library
+from protondb.steam_library import SteamLibraryError, fetchSteamLibrary
+
+LIBRARY = '''<?xml version="1.0" encoding="UTF-8"?>
+<gamesList>
+ <steamID><![CDATA[Joueur de test]]></steamID>
+ <games>
+  <game><appID>1245620</appID><name><![CDATA[ELDEN RING]]></name></game>
+  <game><appID>570</appID><name><![CDATA[Dota 2]]></name></game>
+  <game><appID>999999</appID><name><![CDATA[Jeu sans rapport]]></name></game>
+ </games>
+</gamesList>'''
+
+SUMMARIES = {'1245620': {'tier': 'gold'}, '570': {'tier': 'platinum'}}
+
+async def _startStub(requests: list) -> tuple[web.AppRunner, str]:
+	async def library(request):
+		requests.append(request.path_qs)
+		if request.match_info['name'] != 'joueur':
+			return web.Response(text='<response><error>The specified profile could not be found.</error></response>')
+		return web.Response(text=LIBRARY, content_type='text/xml')
+	async def summary(request):
+		requests.append(request.path)
+		found = SUMMARIES.get(request.match_info['id'])
+		if found == None:
+			return web.Response(status=404)
+		return web.json_response(found)
+	application = web.Application()
+	application.router.add_get('/id/{name}/games', library)
+	application.router.add_get('/summaries/{id}.json', summary)
+	runner = web.AppRunner(application)
+	await runner.setup()
+	site = web.TCPSite(runner, '127.0.0.1', 0)
+	await site.start()
+	port = site._server.sockets[0].getsockname()[1]
+	return runner, f'http://127.0.0.1:{port}'
+
+def test_library_and_summaries_against_stub(app, monkeypatch):
+	# les écritures du cache passent par le thread d'écriture : la session du test ne doit pas garder la base
+	db.session.remove()
+	requests = []
+
+	async def scenario():
+		runner, base = await _startStub(requests)
+		monkeypatch.setattr(steam_library, 'STEAM_COMMUNITY_URL', base)
+		monkeypatch.setattr(protondb, 'SUMMARY_URL', f'{base}/summaries')
+		try:
+			owner, games = await fetchSteamLibrary('https://steamcommunity.com/id/joueur/')
+			assert owner == 'Joueur de test'
+			assert games == [('570', 'Dota 2'), ('1245620', 'ELDEN RING'), ('999999', 'Jeu sans rapport')]
+			assert requests[0] == '/id/joueur/games?tab=all&xml=1'
+
+			summaries = await protondb._fetch_summaries([id for id, name in games])
+			assert summaries == {'570': {'tier': 'platinum'}, '1245620': {'tier': 'gold'}, '999999': None}
+
+			# le jeu sans rapport n'apparaît pas dans les résultats
+			results = await protondb.getProtonDbResults(games)
+			assert [(result['id'], result['tier']) for result in results] == [('570', 'platinum'), ('1245620', 'gold')]
+
+			try:
+				await fetchSteamLibrary('inconnu')
+				assert False, 'un profil refusé par Steam doit lever SteamLibraryError'
+			except SteamLibraryError as e:
+				assert 'could not be found' in str(e)
+		finally:
+			await closeHttpSession()
+			await runner.cleanup()
+
+	asyncio.run(scenario())
@@ -0,0 +1,30 @@
+import asyncio
+
+import pytest
+
+from httpclient import DeadlineExceededError, callTimeout, setDeadline
+from protondb.query_cache import QueryCache
+
+def test_shared_search_outlives_the_first_command_deadline():
+	cache = QueryCache()
+	timeouts = []
+	async def compute():
+		await asyncio.sleep(0.3)
+		# le calcul partagé ne porte pas l'échéance de la commande qui l'a lancé
+		timeouts.append(callTimeout(10))
+		return [('1245620', 'ELDEN RING')]
+	async def search(deadline: float):
+		setDeadline(deadline)
+		return await cache.get('elden ring', compute)
+
+	async def scenario():
+		first = asyncio.ensure_future(search(0.1))
+		await asyncio.sleep(0)
+		second = asyncio.ensure_future(search(5))
+		with pytest.raises(DeadlineExceededError):
+			await first
+		assert await second == [('1245620', 'ELDEN RING')]
+		assert timeouts == [(10, False)]
+		assert cache.stats()['coalesced'] == 1
+
+	asyncio.run(scenario())
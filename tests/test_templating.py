@@ -0,0 +1,24 @@
+from types import SimpleNamespace
+
+from discordbot.welcome import MEMBER_VARIABLES
+from templating import MessageTemplate, checkTemplate
+from twitchbot.live_alert import STREAM_LEGACY_VARIABLES, STREAM_VARIABLES
+
+MEMBER = {'member.mention': '<@42>', 'member.name': 'alice', 'server.name': 'Linux'}
+
+def test_welcome_messages_keep_their_braces():
+	# remplacement mot à mot, comme avant le moteur de messages
+	template = MessageTemplate('{{member.name}} {{ {ici} {member.mention} sur {server.name} }}', escapes=False)
+	assert template.render(MEMBER) == '{alice} {{ {ici} <@42> sur Linux }}'
+	assert checkTemplate('Salut {member.mention} {ici} {{', MEMBER_VARIABLES, escapes=False) == None
+	assert '{member.nmae}' in checkTemplate('Salut {member.nmae}', MEMBER_VARIABLES, escapes=False)
+
+def test_legacy_stream_placeholders_are_accepted():
+	stream = SimpleNamespace(user_name='Mamie', title='Linux')
+	values = {'0.user_name': 'Mamie', '': stream, '0': stream}
+	assert MessageTemplate('{0.user_name} : {} / {0}').render(values) == f'Mamie : {stream} / {stream}'
+	assert checkTemplate('{0.user_name} est en live : {}', STREAM_VARIABLES, legacy=STREAM_LEGACY_VARIABLES) == None
+	error = checkTemplate('{0.user}', STREAM_VARIABLES, legacy=STREAM_LEGACY_VARIABLES)
+	assert '{0.user}' in error and '{}' not in error
+	# les autres messages gardent l'échappement de str.format
+	assert MessageTemplate('{{0.user_name}}').render(values) == '{0.user_name}'
@@ -0,0 +1,155 @@
+import asyncio
+import hashlib
+import hmac
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from aiohttp import web
+
+from database import db
+from database.helpers import ConfigurationHelper
+from database.models import YouTubeNotification, YouTubeSubscription
+import discordbot.websub as websub
+import discordbot.youtube as youtube
+import webapp.youtube as youtube_routes
+
+CHANNEL = 'UC' + 'a' * 22
+OTHER_CHANNEL = 'UC' + 'b' * 22
+
+def _push(video_id: str) -> bytes:
+	return f'''<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns:yt="http://www.youtube.com/xml/schemas/2015" xmlns="http://www.w3.org/2005/Atom">
+ <entry>
+  <id>yt:video:{video_id}</id>
+  <yt:videoId>{video_id}</yt:videoId>
+  <yt:channelId>{CHANNEL}</yt:channelId>
+  <title>Nouvelle vidéo</title>
+  <link rel="alternate" href="https://www.youtube.com/watch?v={video_id}"/>
+  <author><name>Chaîne de test</name></author>
+  <published>2026-10-18T10:00:00+00:00</published>
+ </entry>
+</feed>'''.encode()
+
+def _follow(channel_id: str):
+	db.session.add(YouTubeNotification(channel_id=channel_id, notify_channel=1, message='{video_url}', video_type='all',
+									enable=True, last_video_id='ancienne', last_published_at=youtube._publishedAt('2026-01-01T00:00:00+00:00')))
+	db.session.commit()
+
+async def _startHub(requests: list) -> tuple[web.AppRunner, str]:
+	async def subscribe(request):
+		requests.append(dict(await request.post()))
+		return web.Response(status=202)
+	application = web.Application()
+	application.router.add_post('/hub', subscribe)
+	runner = web.AppRunner(application)
+	await runner.setup()
+	site = web.TCPSite(runner, '127.0.0.1', 0)
+	await site.start()
+	port = site._server.sockets[0].getsockname()[1]
+	return runner, f'http://127.0.0.1:{port}/hub'
+
+def _verify(client, topic: str, challenge: str = 'defi', lease_seconds: str = '432000'):
+	return client.get('/youtube/websub', query_string={'hub.mode': 'subscribe', 'hub.topic': topic,
+													'hub.challenge': challenge, 'hub.lease_seconds': lease_seconds})
+
+async def _waitFor(condition, timeout: float = 5):
+	for _ in range(int(timeout / 0.05)):
+		if condition():
+			return
+		await asyncio.sleep(0.05)
+
+def test_websub_against_stub_hub(app, monkeypatch):
+	notified = []
+	async def notify(notification, video):
+		notified.append(video.video_id)
+	monkeypatch.setattr(youtube, '_notifyVideo', notify)
+	client = app.test_client()
+
+	async def scenario():
+		requests = []
+		runner, hub_url = await _startHub(requests)
+		try:
+			_follow(CHANNEL)
+			ConfigurationHelper().createOrUpdateAll({'youtube_websub_callback': 'http://panel.test/youtube/websub', 'youtube_websub_hub': hub_url})
+			db.session.commit()
+
+			await websub.renewSubscriptions()
+			assert [request['hub.mode'] for request in requests] == ['subscribe']
+			topic = requests[0]['hub.topic']
+			secret = requests[0]['hub.secret']
+			assert topic == websub.topicUrl(CHANNEL)
+
+			# vérification d'intention : seule la demande en attente est confirmée, une seule fois
+			assert _verify(client, topic, lease_seconds=str(30 * 24 * 3600)).status_code == 404
+			response = _verify(client, topic)
+			assert response.status_code == 200 and response.data == b'defi'
+			assert _verify(client, topic).status_code == 404
+			_follow(OTHER_CHANNEL)
+			assert _verify(client, websub.topicUrl(OTHER_CHANNEL)).status_code == 404
+			db.session.remove()
+			assert websub.getActiveSubscriptions() == {CHANNEL}
+
+			monkeypatch.setattr(youtube_routes, 'bot', SimpleNamespace(is_ready=lambda: True, loop=asyncio.get_running_loop()))
+			body = _push('MAUVAISE')
+			response = await asyncio.to_thread(client.post, '/youtube/websub', data=body, headers={'X-Hub-Signature': 'sha1=' + '0' * 40})
+			assert response.status_code == 202
+
+			body = _push('NOUVELLE')
+			signature = 'sha1=' + hmac.new(secret.encode(), body, hashlib.sha1).hexdigest()
+			response = await asyncio.to_thread(client.post, '/youtube/websub', data=body, headers={'X-Hub-Signature': signature})
+			assert response.status_code == 202
+			await _waitFor(lambda: notified)
+			assert notified == ['NOUVELLE']
+		finally:
+			await runner.cleanup()
+
+	asyncio.run(scenario())
+
+def test_websub_disabled_when_callback_cleared(app):
+	_follow(CHANNEL)
+	db.session.add(YouTubeSubscription(channel_id=CHANNEL, lease_expires_at=youtube._publishedAt('2099-01-01T00:00:00+00:00')))
+	ConfigurationHelper().createOrUpdateAll({'youtube_websub_callback': 'http://panel.test/youtube/websub'})
+	db.session.commit()
+	assert websub.getActiveSubscriptions() == {CHANNEL}
+
+	client = app.test_client()
+	client.post('/configurations/update', data={'youtube_websub_callback': '', 'youtube_websub_hub': ''}, headers={'Referer': 'http://panel.test/youtube'})
+	assert not websub.isWebSubEnabled()
+	assert websub.getActiveSubscriptions() == set()
+
+def _subscribe(channel_id: str, lease_expires_at: datetime):
+	db.session.add(YouTubeSubscription(channel_id=channel_id, lease_expires_at=lease_expires_at))
+	db.session.commit()
+
+def test_renewals_and_unsubscribes_are_throttled(app):
+	_follow(CHANNEL)
+	_subscribe(CHANNEL, datetime.now() + timedelta(hours=12))
+	_subscribe(OTHER_CHANNEL, datetime.now() + timedelta(days=3))
+
+	async def scenario():
+		requests = []
+		runner, hub_url = await _startHub(requests)
+		try:
+			ConfigurationHelper().createOrUpdateAll({'youtube_websub_callback': 'http://panel.test/youtube/websub', 'youtube_websub_hub': hub_url})
+			db.session.commit()
+			db.session.remove()
+
+			# renouvellement de l'abonnement qui expire, résiliation de la chaîne qui n'est plus suivie
+			await websub.renewSubscriptions()
+			assert sorted((request['hub.mode'], request['hub.topic']) for request in requests) == \
+				[('subscribe', websub.topicUrl(CHANNEL)), ('unsubscribe', websub.topicUrl(OTHER_CHANNEL))]
+			# sans réponse du hub, rien n'est redemandé avant RETRY_DELAY
+			await websub.renewSubscriptions()
+			assert len(requests) == 2
+
+			# une fois le bail expiré, l'abonnement de la chaîne qui n'est plus suivie est simplement oublié
+			YouTubeSubscription.query.filter_by(channel_id=OTHER_CHANNEL).update({'requested_at': None, 'lease_expires_at': datetime.now() - timedelta(minutes=1)})
+			db.session.commit()
+			db.session.remove()
+			await websub.renewSubscriptions()
+			assert len(requests) == 2
+			assert db.session.get(YouTubeSubscription, OTHER_CHANNEL) == None
+		finally:
+			await runner.cleanup()
+
+	asyncio.run(scenario())
@@ -0,0 +1,80 @@
+import asyncio
+from datetime import datetime
+
+from database import db
+from database.models import YouTubeNotification
+from httpclient import CircuitOpenError, HttpResponse
+import discordbot.youtube as youtube
+
+CHANNEL = 'UC' + 'c' * 22
+
+def _nextCheck() -> datetime:
+	db.session.remove()
+	return YouTubeNotification.query.filter_by(channel_id=CHANNEL).first().next_check_at
+
+def _check(monkeypatch, get) -> datetime:
+	monkeypatch.setattr(youtube, 'httpGet', get)
+	watchers = YouTubeNotification.query.filter_by(channel_id=CHANNEL).all()
+	db.session.remove()
+	asyncio.run(youtube._checkChannel(CHANNEL, watchers, asyncio.Semaphore(1), youtube._HostPacer(0), False))
+	return _nextCheck()
+
+def test_failing_feed_backs_off(app, monkeypatch):
+	db.session.add(YouTubeNotification(channel_id=CHANNEL, notify_channel=1, message='', video_type='all', enable=True))
+	db.session.commit()
+	youtube._failures.pop(CHANNEL, None)
+
+	async def notFound(url, **kwargs):
+		return HttpResponse(url, 404, {}, b'')
+	async def unavailable(url, **kwargs):
+		raise CircuitOpenError('www.youtube.com est indisponible')
+
+	intervals = []
+	for _ in range(3):
+		intervals.append((_check(monkeypatch, notFound) - datetime.now()).total_seconds())
+	jitter = 1 + youtube.JITTER
+	assert intervals[0] >= youtube.DEFAULT_INTERVAL * (1 - youtube.JITTER) - 1
+	assert intervals[0] <= youtube.DEFAULT_INTERVAL * jitter
+	assert intervals[2] >= 4 * youtube.DEFAULT_INTERVAL * (1 - youtube.JITTER) - 1
+
+	# un disjoncteur ouvert n'est pas compté comme un échec du flux, mais le passage est quand même replanifié
+	interval = (_check(monkeypatch, unavailable) - datetime.now()).total_seconds()
+	assert youtube._failures[CHANNEL] == 3
+	assert interval >= 4 * youtube.DEFAULT_INTERVAL * (1 - youtube.JITTER) - 1
+	youtube._failures.pop(CHANNEL, None)
+
+def test_latency_is_kept_per_feed(app, monkeypatch):
+	db.session.add(YouTubeNotification(channel_id=CHANNEL, notify_channel=1, message='', video_type='all', enable=True))
+	db.session.commit()
+	youtube._feed_latencies.pop(CHANNEL, None)
+
+	def notModified(delay: float):
+		async def get(url, **kwargs):
+			await asyncio.sleep(delay)
+			return HttpResponse(url, 304, {}, b'')
+		return get
+
+	_check(monkeypatch, notModified(0.2))
+	_check(monkeypatch, notModified(0))
+	latency = youtube.getFeedLatencies()[CHANNEL]
+	assert latency['max_ms'] >= 200
+	assert latency['last_ms'] < latency['max_ms']
+
+def test_conditional_get_reuses_validators(app, monkeypatch):
+	db.session.add(YouTubeNotification(channel_id=CHANNEL, notify_channel=1, message='', video_type='all', enable=True))
+	db.session.commit()
+	sent = []
+
+	async def fresh(url, headers=None, **kwargs):
+		sent.append(headers)
+		return HttpResponse(url, 200, {'ETag': '"v1"', 'Last-Modified': 'Sun, 18 Oct 2026 10:00:00 GMT'}, b'<feed xmlns="http://www.w3.org/2005/Atom"/>')
+	async def unchanged(url, headers=None, **kwargs):
+		sent.append(headers)
+		return HttpResponse(url, 304, {}, b'')
+
+	_check(monkeypatch, fresh)
+	_check(monkeypatch, unchanged)
+	assert sent == [{}, {'If-None-Match': '"v1"', 'If-Modified-Since': 'Sun, 18 Oct 2026 10:00:00 GMT'}]
+	# sans vidéo connue, l'intervalle reste celui par défaut
+	interval = (_nextCheck() - datetime.now()).total_seconds()
+	assert interval <= youtube.DEFAULT_INTERVAL * (1 + youtube.JITTER)
@@ -3,34 +3,52 @@ import logging
 from twitchAPI.twitch import Twitch
 from twitchAPI.object.api import Stream
 
-from database import db
+from database.executor import commitInSession, runInSession
 from database.models import LiveAlert
 from discordbot import bot
-from webapp import webapp
+from templating import renderTemplate
 
 logger = logging.getLogger('live-alert')
 logger.setLevel(logging.INFO)
 
+# Champs du stream utilisables dans le message, sous la forme {0.champ}
+STREAM_FIELDS = ('user_login', 'user_name', 'game_name', 'title', 'language', 'viewer_count', 'started_at', 'thumbnail_url', 'type', 'id', 'user_id', 'game_id', 'is_mature')
+STREAM_VARIABLES = tuple(f'0.{field}' for field in STREAM_FIELDS)
+# {} et {0} (le stream entier) étaient acceptés par str.format : les messages existants qui les utilisent restent valides
+STREAM_LEGACY_VARIABLES = ('', '0')
+
+
+def _loadAlerts() -> list[LiveAlert]:
+	return LiveAlert.query.all()
+
+def _saveOnlineStatus(online_by_id: dict):
+	for id, online in online_by_id.items():
+		LiveAlert.query.filter_by(id=id).update({'online': online})
 
 async def checkOnlineStreamer(twitch: Twitch) :
-	with webapp.app_context() : 
-		alerts : list[LiveAlert] = LiveAlert.query.all()
-		streams = await _retreiveStreams(twitch, alerts)
-		for alert in alerts : 
-			stream = next((s for s in streams if s.user_login == alert.login), None)
-			if stream : 
-				logger.info(f'Streamer en ligne : {alert.login}')
-				if not alert.online and alert.enable :
-					logger.info(f'N\'etait pas en ligne auparavant : {alert.login}')
-					await _notifyAlert(alert, stream)
-				alert.online = True
-			else :
-				logger.info(f'Streamer hors ligne : {alert.login}')
-				alert.online = False
-		db.session.commit()
+	alerts : list[LiveAlert] = await runInSession(_loadAlerts)
+	streams = await _retreiveStreams(twitch, alerts)
+	changes = {}
+	for alert in alerts : 
+		stream = next((s for s in streams if s.user_login == alert.login), None)
+		if stream : 
+			logger.info(f'Streamer en ligne : {alert.login}')
+			if not alert.online and alert.enable :
+				logger.info(f'N\'etait pas en ligne auparavant : {alert.login}')
+				await _notifyAlert(alert, stream)
+			online = True
+		else :
+			logger.info(f'Streamer hors ligne : {alert.login}')
+			online = False
+		if alert.online != online :
+			changes[alert.id] = online
+	if changes :
+		await commitInSession(_saveOnlineStatus, changes)
 
 async def _notifyAlert(alert : LiveAlert, stream : Stream):
-	message : str = alert.message.format(stream)
+	values = {f'0.{field}': getattr(stream, field, None) for field in STREAM_FIELDS}
+	values.update({name: stream for name in STREAM_LEGACY_VARIABLES})
+	message : str = renderTemplate(('live_alert', alert.id, 'message'), alert.message, values)
 	logger.info(f'Message de notification : {message}')
 	bot.loop.create_task(_sendMessage(alert.notify_channel, message))
 
@@ -1,8 +1,11 @@
+from urllib.parse import urlencode, urlsplit, urlunsplit
 from flask import render_template, request, redirect, url_for
 from webapp import webapp
 from database import db
 from database.helpers import ConfigurationHelper
 from discordbot import bot
+from discordbot.welcome import MEMBER_VARIABLES
+from templating import checkTemplate, compileTemplate
 
 @webapp.route("/configurations")
 def openConfigurations():
@@ -20,23 +23,36 @@ def updateConfiguration():
 		'leave_enable': 'leave_channel_id'
 	}
 	
+	for key in ('welcome_message', 'leave_message'):
+		error = checkTemplate(request.form.get(key), MEMBER_VARIABLES, escapes=False)
+		if error:
+			referrer = urlsplit(request.referrer or url_for("openConfigurations"))
+			return redirect(urlunsplit(referrer._replace(query=urlencode({'msg': error, 'type': 'error'}))))
+	
+	# clés qu'un champ vide doit effacer : sans adresse de rappel, WebSub est désactivé
+	clearable = ('youtube_websub_callback', 'youtube_websub_hub')
+	
+	values = {}
 	staff_roles = request.form.getlist('moderation_staff_role_ids')
-	if staff_roles:
-		ConfigurationHelper().createOrUpdate('moderation_staff_role_ids', ','.join(staff_roles))
-	else:
-		ConfigurationHelper().createOrUpdate('moderation_staff_role_ids', '')
+	values['moderation_staff_role_ids'] = ','.join(staff_roles)
 	
 	for key in request.form:
 		if key == 'moderation_staff_role_ids':
 			continue
 		value = request.form.get(key)
 		if value and value.strip():
-			ConfigurationHelper().createOrUpdate(key, value)
+			values[key] = value
+		elif key in clearable:
+			values[key] = ''
 	
 	for checkbox, reference_field in checkboxes.items():
 		if request.form.get(reference_field) is not None and request.form.get(checkbox) is None:
-			ConfigurationHelper().createOrUpdate(checkbox, False)
+			values[checkbox] = False
 	
+	ConfigurationHelper().createOrUpdateAll(values)
 	db.session.commit()
+	for key in ('welcome_message', 'leave_message'):
+		if values.get(key):
+			compileTemplate(('configuration', key), values[key], escapes=False)
 	return redirect(request.referrer)
 
@@ -1,6 +1,8 @@
 from flask import render_template
 from webapp import webapp
+from database.helpers import ConfigurationHelper
 from database.models import ModerationEvent
+from httpclient import DEFAULT_COOLDOWN, DEFAULT_FAILURE_THRESHOLD, getHostStats
 
 @webapp.route("/")
 def index():
@@ -13,4 +15,8 @@ def index():
 		sanctions_count=sanctions_count,
 		twitch_connected=status["twitch_connected"],
 		twitch_channel_name=status["twitch_channel_name"],
+		host_stats=getHostStats(),
+		configuration=ConfigurationHelper(),
+		default_breaker_threshold=DEFAULT_FAILURE_THRESHOLD,
+		default_breaker_cooldown=DEFAULT_COOLDOWN,
 	)
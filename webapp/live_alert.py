@@ -1,9 +1,12 @@
+from urllib.parse import urlencode
 from flask import render_template, request, redirect, url_for
 
 from webapp import webapp
 from database import db
 from database.models import LiveAlert
 from discordbot import bot
+from templating import checkTemplate, compileTemplate
+from twitchbot.live_alert import STREAM_LEGACY_VARIABLES, STREAM_VARIABLES
 
 
 @webapp.route("/live-alert")
@@ -16,11 +19,21 @@ def openLiveAlert():
 				alert.notify_channel_name = channel.name
 	return render_template("live-alert.html", alerts = alerts, channels = channels)
 
+def _check_message(redirect_url: str):
+	error = checkTemplate(request.form.get('message'), STREAM_VARIABLES, legacy=STREAM_LEGACY_VARIABLES)
+	if error:
+		return redirect(redirect_url + "?" + urlencode({'msg': error, 'type': 'error'}))
+	return None
+
 @webapp.route("/live-alert/add",  methods=['POST'])
 def addLiveAlert():
+	invalid = _check_message(url_for("openLiveAlert"))
+	if invalid:
+		return invalid
 	alert = LiveAlert(enable = True, login = request.form.get('login'), notify_channel = request.form.get('notify_channel'), message = request.form.get('message'))
 	db.session.add(alert)
 	db.session.commit()
+	compileTemplate(('live_alert', alert.id, 'message'), alert.message)
 	return redirect(url_for("openLiveAlert"))
 
 @webapp.route("/live-alert/toggle/<int:id>")
@@ -39,10 +52,14 @@ def openEditLiveAlert(id):
 @webapp.route("/live-alert/edit/<int:id>",  methods=['POST'])
 def submitEditLiveAlert(id):
 	alert : LiveAlert = LiveAlert.query.get_or_404(id)
+	invalid = _check_message(url_for("openEditLiveAlert", id=id))
+	if invalid:
+		return invalid
 	alert.login = request.form.get('login')
 	alert.notify_channel = request.form.get('notify_channel')
 	alert.message = request.form.get('message')
 	db.session.commit()
+	compileTemplate(('live_alert', alert.id, 'message'), alert.message)
 	return redirect(url_for("openLiveAlert"))
 
 
@@ -1,13 +1,20 @@
+import json
+
 from flask import render_template, request, redirect, url_for
 from webapp import webapp
 from database import db
-from database.models import GameAlias
-from database.helpers import ConfigurationHelper
+from database.models import GameAlias, GameName
+from database.helpers import ConfigurationHelper, markChanged
+from protondb.game_index import rebuildGameIndex
+from protondb.prewarm import getHotQueries
+from protondb.summary_cache import summaryCache
 
 @webapp.route("/protondb")
 def openProtonDB():
 	aliases = GameAlias.query.all()
-	return render_template("protondb.html", aliases = aliases, configuration = ConfigurationHelper())
+	changes = ConfigurationHelper().getValue('anticheat_last_changes')
+	anticheat_changes = json.loads(changes) if changes else None
+	return render_template("protondb.html", aliases = aliases, configuration = ConfigurationHelper(), summary_stats = summaryCache.stats(), anticheat_changes = anticheat_changes, indexed_games = GameName.query.count(), hot_queries = getHotQueries())
 
 @webapp.route("/protondb/gamealias/add", methods=['POST'])
 def addGameAlias():
@@ -19,6 +26,13 @@ def addGameAlias():
 @webapp.route('/protondb/gamealias/del/<int:id>')
 def delGameAlias(id : int):
 	GameAlias.query.filter_by(id=id).delete()
+	markChanged(db.session, GameAlias)
 	db.session.commit()
 	return redirect(url_for('openProtonDB'))
 
+
+@webapp.route('/protondb/index/rebuild', methods=['POST'])
+def rebuildProtonDBIndex():
+	rebuildGameIndex()
+	db.session.commit()
+	return redirect(url_for('openProtonDB'))
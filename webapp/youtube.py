@@ -1,88 +1,118 @@
+import asyncio
+import logging
 import re
-import requests
 from urllib.parse import urlencode
-from flask import render_template, request, redirect, url_for
+from flask import render_template, request, redirect, url_for, Response
 
 from webapp import webapp
 from database import db
-from database.models import YouTubeNotification
+from database.models import YouTubeNotification, YouTubeSubscription
+from database.helpers import ConfigurationHelper
 from discordbot import bot
+from discordbot.websub import DEFAULT_HUB, channelFromTopic, checkSignature, confirmSubscription, getActiveSubscriptions
+from discordbot.youtube_handles import lookupHandle
+from discordbot.youtube import DEFAULT_CONCURRENCY, DEFAULT_SPACING_MS, YOUTUBE_VARIABLES, getFeedLatencies, getPollStats, handlePushedFeed
+from templating import checkTemplate, compileTemplate
 
+# colonnes de youtube_notification qui acceptent les variables de la vidéo
+TEMPLATE_COLUMNS = ('message', 'embed_title', 'embed_description', 'embed_footer', 'embed_author_name')
 
-def extract_channel_id(channel_input: str) -> str:
-	"""Extrait l'ID de la chaîne YouTube depuis différents formats"""
+
+def extract_channel_id(channel_input: str) -> tuple[str, str]:
+	"""Extrait l'ID de la chaîne YouTube depuis différents formats : renvoie (ID, None) ou (None, handle)"""
 	if not channel_input:
-		return None
+		return None, None
 	
 	channel_input = channel_input.strip()
 	
 	if channel_input.startswith('UC') and len(channel_input) == 24:
-		return channel_input
+		return channel_input, None
 	
 	if '/channel/' in channel_input:
 		match = re.search(r'/channel/([a-zA-Z0-9_-]{24})', channel_input)
 		if match:
-			return match.group(1)
+			return match.group(1), None
 	
 	if '/c/' in channel_input or '/user/' in channel_input:
 		parts = channel_input.split('/')
 		for i, part in enumerate(parts):
 			if part in ['c', 'user'] and i + 1 < len(parts):
 				handle = parts[i + 1].split('?')[0].split('&')[0]
-				channel_id = _get_channel_id_from_handle(handle)
-				if channel_id:
-					return channel_id
+				if handle:
+					return None, handle
 	
 	if '@' in channel_input:
-		handle = re.search(r'@([a-zA-Z0-9_-]+)', channel_input)
+		handle = re.search(r'@([a-zA-Z0-9_.-]+)', channel_input)
 		if handle:
-			channel_id = _get_channel_id_from_handle(handle.group(1))
-			if channel_id:
-				return channel_id
+			return None, handle.group(1)
 	
+	return None, None
+
+
+def _resolve_channel(channel_input: str) -> tuple[str, str]:
+	"""Renvoie (état, ID) sans jamais attendre YouTube : un handle absent du cache est résolu en arrière-plan"""
+	channel_id, handle = extract_channel_id(channel_input)
+	if channel_id:
+		return 'found', channel_id
+	if not handle:
+		return 'unknown', None
+	return lookupHandle(handle)
+
+
+def _channel_error(status: str, channel_input: str) -> str:
+	if status == 'pending':
+		return f"Recherche de la chaîne {channel_input} en cours, veuillez réessayer dans quelques secondes."
+	if status == 'error':
+		return f"YouTube n'a pas répondu pour {channel_input}, veuillez réessayer."
+	return f"Impossible d'extraire l'ID de la chaîne depuis : {channel_input}. Veuillez vérifier le lien."
+
+
+def _check_templates() -> str:
+	for column in TEMPLATE_COLUMNS:
+		error = checkTemplate(request.form.get(column), YOUTUBE_VARIABLES)
+		if error:
+			return error
 	return None
 
 
-def _get_channel_id_from_handle(handle: str) -> str:
-	"""Récupère l'ID de la chaîne depuis un handle en utilisant le flux RSS"""
-	try:
-		url = f"https://www.youtube.com/@{handle}"
-		response = requests.get(url, timeout=10, allow_redirects=True)
-		
-		if response.status_code == 200:
-			channel_id_match = re.search(r'"channelId":"([^"]{24})"', response.text)
-			if channel_id_match:
-				return channel_id_match.group(1)
-			
-			canonical_match = re.search(r'<link rel="canonical" href="https://www\.youtube\.com/channel/([^"]{24})"', response.text)
-			if canonical_match:
-				return canonical_match.group(1)
-		
-		return None
-	except Exception:
-		return None
+def _compile_templates(notification: YouTubeNotification):
+	for column in TEMPLATE_COLUMNS:
+		if getattr(notification, column):
+			compileTemplate(('youtube_notification', notification.id, column), getattr(notification, column))
 
 
 @webapp.route("/youtube")
 def openYouTube():
 	notifications: list[YouTubeNotification] = YouTubeNotification.query.all()
 	channels = bot.getAllTextChannel()
+	latencies = getFeedLatencies()
 	for notification in notifications:
+		notification.feed_latency = latencies.get(notification.channel_id)
 		for channel in channels:
 			if notification.notify_channel == channel.id:
 				notification.notify_channel_name = channel.name
 	msg = request.args.get('msg')
 	msg_type = request.args.get('type', 'info')
-	return render_template("youtube.html", notifications=notifications, channels=channels, msg=msg, msg_type=msg_type)
+	return render_template("youtube.html", notifications=notifications, channels=channels, msg=msg, msg_type=msg_type,
+						poll_stats=getPollStats(), configuration=ConfigurationHelper(),
+						default_poll_concurrency=DEFAULT_CONCURRENCY, default_poll_spacing_ms=DEFAULT_SPACING_MS,
+						default_websub_hub=DEFAULT_HUB, websub_subscriptions=len(getActiveSubscriptions()))
+
+
+@webapp.route("/youtube/resolve")
+def resolveYouTubeChannel():
+	# appelée par le formulaire pendant la saisie, jusqu'à ce que l'état ne soit plus 'pending'
+	status, channel_id = _resolve_channel(request.args.get('channel', ''))
+	return {'status': status, 'channel_id': channel_id}
 
 
 @webapp.route("/youtube/add", methods=['POST'])
 def addYouTube():
 	channel_input = request.form.get('channel_id', '').strip()
-	channel_id = extract_channel_id(channel_input)
+	status, channel_id = _resolve_channel(channel_input)
 	
 	if not channel_id:
-		return redirect(url_for("openYouTube") + "?" + urlencode({'msg': f"Impossible d'extraire l'ID de la chaîne depuis : {channel_input}. Veuillez vérifier le lien.", 'type': 'error'}))
+		return redirect(url_for("openYouTube") + "?" + urlencode({'msg': _channel_error(status, channel_input), 'type': 'error'}))
 	
 	notify_channel_str = request.form.get('notify_channel')
 	if not notify_channel_str:
@@ -93,6 +123,10 @@ def addYouTube():
 	except ValueError:
 		return redirect(url_for("openYouTube") + "?" + urlencode({'msg': "Canal Discord invalide.", 'type': 'error'}))
 	
+	template_error = _check_templates()
+	if template_error:
+		return redirect(url_for("openYouTube") + "?" + urlencode({'msg': template_error, 'type': 'error'}))
+	
 	embed_color = request.form.get('embed_color', 'FF0000').strip().lstrip('#')
 	if len(embed_color) != 6:
 		embed_color = 'FF0000'
@@ -114,6 +148,7 @@ def addYouTube():
 	)
 	db.session.add(notification)
 	db.session.commit()
+	_compile_templates(notification)
 	return redirect(url_for("openYouTube") + "?" + urlencode({'msg': f"Notification ajoutée avec succès pour la chaîne {channel_id}", 'type': 'success'}))
 
 
@@ -139,10 +174,10 @@ def submitEditYouTube(id):
 	notification: YouTubeNotification = YouTubeNotification.query.get_or_404(id)
 	
 	channel_input = request.form.get('channel_id', '').strip()
-	channel_id = extract_channel_id(channel_input)
+	status, channel_id = _resolve_channel(channel_input)
 	
 	if not channel_id:
-		return redirect(url_for("openEditYouTube", id=id) + "?" + urlencode({'msg': f"Impossible d'extraire l'ID de la chaîne depuis : {channel_input}. Veuillez vérifier le lien.", 'type': 'error'}))
+		return redirect(url_for("openEditYouTube", id=id) + "?" + urlencode({'msg': _channel_error(status, channel_input), 'type': 'error'}))
 	
 	notify_channel_str = request.form.get('notify_channel')
 	if not notify_channel_str:
@@ -153,10 +188,20 @@ def submitEditYouTube(id):
 	except ValueError:
 		return redirect(url_for("openEditYouTube", id=id) + "?" + urlencode({'msg': "Canal Discord invalide.", 'type': 'error'}))
 	
+	template_error = _check_templates()
+	if template_error:
+		return redirect(url_for("openEditYouTube", id=id) + "?" + urlencode({'msg': template_error, 'type': 'error'}))
+	
 	embed_color = request.form.get('embed_color', 'FF0000').strip().lstrip('#')
 	if len(embed_color) != 6:
 		embed_color = 'FF0000'
 	
+	if notification.channel_id != channel_id:
+		notification.last_video_id = None
+		notification.feed_etag = None
+		notification.feed_last_modified = None
+		notification.last_published_at = None
+		notification.next_check_at = None
 	notification.channel_id = channel_id
 	notification.notify_channel = notify_channel
 	notification.message = request.form.get('message')
@@ -170,6 +215,7 @@ def submitEditYouTube(id):
 	notification.embed_thumbnail = request.form.get('embed_thumbnail') == 'on'
 	notification.embed_image = request.form.get('embed_image') == 'on'
 	db.session.commit()
+	_compile_templates(notification)
 	return redirect(url_for("openYouTube") + "?" + urlencode({'msg': "Notification modifiée avec succès", 'type': 'success'}))
 
 
@@ -179,3 +225,26 @@ def delYouTube(id):
 	db.session.delete(notification)
 	db.session.commit()
 	return redirect(url_for("openYouTube"))
+
+
+@webapp.route("/youtube/websub", methods=['GET'])
+def verifyYouTubeWebSub():
+	# vérification d'intention du hub WebSub : on renvoie hub.challenge si l'abonnement a bien été demandé
+	if not confirmSubscription(request.args.get('hub.mode'), request.args.get('hub.topic'), request.args.get('hub.lease_seconds')):
+		return Response(status=404)
+	db.session.commit()
+	logging.info(f"Abonnement WebSub {request.args.get('hub.mode')} confirmé pour {channelFromTopic(request.args.get('hub.topic'))}")
+	return Response(request.args.get('hub.challenge', ''), status=200, mimetype='text/plain')
+
+
+@webapp.route("/youtube/websub", methods=['POST'])
+def receiveYouTubeWebSub():
+	body = request.get_data()
+	# une signature invalide est ignorée, mais le hub doit quand même recevoir un 2xx
+	if not checkSignature(body, request.headers.get('X-Hub-Signature')):
+		logging.warning("Notification WebSub ignorée : signature invalide")
+		return Response(status=202)
+	# bot pas encore connecté : la vidéo sera rattrapée par le RSS
+	if bot.is_ready():
+		asyncio.run_coroutine_threadsafe(handlePushedFeed(body), bot.loop)
+	return Response(status=202)